@@ -0,0 +1,59 @@
+from asgiref.sync import sync_to_async
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts import serializers, views
+from accounts.models import User
+from accounts.otp_store import get_otp_store
+from utils.async_views import AsyncAPIView, schema_of
+from utils.db_routing import abind_user
+from utils.send_otp import send_otp
+
+
+class OTPRequestView(AsyncAPIView):
+    serializer_class = serializers.OTPRequestSerializer
+
+    @schema_of(views.OTPRequestView.post)
+    async def post(self, request: Request):
+        serializer = self.serializer_class(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        email = serializer.validated_data['email']
+        otp_request, created = await get_otp_store().aissue(email)
+        # Delivery is queued on commit, which has to run on the thread that owns the connection.
+        await sync_to_async(send_otp)(otp_request)
+
+        response_serializer = serializers.OTPResponseSerializer(data={
+            'message': 'OTP sent successfully',
+            'email': email,
+        })
+        response_serializer.is_valid(raise_exception=True)
+        return Response(
+            response_serializer.data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+class OTPVerifyView(AsyncAPIView):
+    serializer_class = serializers.VerifyOTPRequestSerializer
+
+    @schema_of(views.OTPVerifyView.post)
+    async def post(self, request: Request):
+        serializer = self.serializer_class(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        if not await get_otp_store().averify(data['email'], data['password']):
+            return Response(status=status.HTTP_401_UNAUTHORIZED)
+
+        user, created = await User.objects.aget_or_create(email=data['email'])
+        await abind_user(user.id)
+        refresh = RefreshToken.for_user(user)
+        return Response(data={
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+            'created': created
+        }, status=status.HTTP_200_OK)
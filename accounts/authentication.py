@@ -0,0 +1,120 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from utils.db_routing import bind_user, abind_user
+
+DEFAULTS = {
+    'MAX_SIZE': 10000,
+    'TIMEOUT': 60,
+}
+
+
+class UserCache:
+    def __init__(self):
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        return {**DEFAULTS, **getattr(settings, 'JWT_USER_CACHE', {})}
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= time.monotonic():
+                del self._users[user_id]
+                return None
+            self._users.move_to_end(user_id)
+        return copy.copy(user)
+
+    def set(self, user_id, user):
+        config = self.config
+        with self._lock:
+            self._users[user_id] = (time.monotonic() + config['TIMEOUT'], copy.copy(user))
+            self._users.move_to_end(user_id)
+            while len(self._users) > config['MAX_SIZE']:
+                self._users.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._users)
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user_id = self._get_user_id(validated_token)
+        bind_user(user_id)
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+        else:
+            self._check_revoked(user, validated_token)
+        return user
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self._get_user_id(validated_token)
+        await abind_user(user_id)
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found')
+            if not user.is_active:
+                raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+            user_cache.set(user_id, user)
+        self._check_revoked(user, validated_token)
+        return user
+
+    @staticmethod
+    def _get_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+    @staticmethod
+    def _check_revoked(user, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)
+        ):
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    target_class = CachedJWTAuthentication
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts.otp_store import get_otp_store
+
+
+class Command(BaseCommand):
+    help = 'Delete expired one-time passwords in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows deleted per statement.')
+
+    def handle(self, *args, batch_size, **options):
+        pruned = get_otp_store().prune(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f'Pruned {pruned} expired one-time passwords'))
@@ -0,0 +1,36 @@
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_emails(apps, schema_editor):
+    OTPRequest = apps.get_model('accounts', 'OTPRequest')
+    latest = (
+        OTPRequest.objects
+        .values('email')
+        .annotate(latest=Max('pk'))
+        .values_list('latest', flat=True)
+    )
+    OTPRequest.objects.exclude(pk__in=latest).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_otp_delivery_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_emails, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='otprequest',
+            name='email',
+            field=models.EmailField(max_length=254, unique=True),
+        ),
+        migrations.AddField(
+            model_name='otprequest',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False),
+            preserve_default=False,
+        ),
+    ]
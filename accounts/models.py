@@ -1,6 +1,5 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from django.utils import timezone
 
 from utils.generate_otp import generate_otp
 
@@ -17,25 +16,19 @@ class User(AbstractUser):
 
 
 class OTPRequest(models.Model):
-    email = models.EmailField()
+    class DeliveryStatus(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENT = 'sent', 'Sent'
+        FAILED = 'failed', 'Failed'
+
+    email = models.EmailField(unique=True)
     password = models.CharField(max_length=6, default=generate_otp)
     created_at = models.DateTimeField(auto_now=True, editable=False)
+    expires_at = models.DateTimeField(db_index=True, editable=False)
+    delivery_status = models.CharField(
+        max_length=10, choices=DeliveryStatus.choices, default=DeliveryStatus.PENDING, editable=False
+    )
+    delivery_attempts = models.PositiveSmallIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.email
-
-    def is_valid(self, data):
-        current_time = timezone.now()
-        return OTPRequest.objects.filter(
-            email=data['email'],
-            password=data['password'],
-            created_at__lt=current_time,
-            created_at__gt=current_time - timezone.timedelta(seconds=120)
-        ).exists()
-
-    def refresh(self, data):
-        otp = OTPRequest.objects.filter(email=data['email']).first()
-        if otp:
-            otp.password = generate_otp()
-            otp.created_at = timezone.now()
-            otp.save()
@@ -0,0 +1,167 @@
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from django.utils.module_loading import import_string
+
+from accounts.models import OTPRequest
+from utils.generate_otp import generate_otp
+
+
+class OTPStore:
+    def __init__(self):
+        self.ttl = timedelta(seconds=settings.OTP_TTL)
+
+    def issue(self, email):
+        raise NotImplementedError
+
+    def verify(self, email, password):
+        raise NotImplementedError
+
+    def prune(self, batch_size=1000):
+        return 0
+
+    def record_delivery(self, otp, status, attempts):
+        raise NotImplementedError
+
+    async def aissue(self, email):
+        return await sync_to_async(self.issue)(email)
+
+    async def averify(self, email, password):
+        return await sync_to_async(self.verify)(email, password)
+
+
+class DatabaseOTPStore(OTPStore):
+    def issue(self, email):
+        return OTPRequest.objects.update_or_create(email=email, defaults=self._defaults())
+
+    def verify(self, email, password):
+        deleted, _ = self._matching(email, password).delete()
+        return deleted > 0
+
+    async def aissue(self, email):
+        return await OTPRequest.objects.aupdate_or_create(email=email, defaults=self._defaults())
+
+    async def averify(self, email, password):
+        deleted, _ = await self._matching(email, password).adelete()
+        return deleted > 0
+
+    def _defaults(self):
+        return {
+            'password': generate_otp(),
+            'expires_at': timezone.now() + self.ttl,
+            'delivery_status': OTPRequest.DeliveryStatus.PENDING,
+            'delivery_attempts': 0,
+        }
+
+    def record_delivery(self, otp, status, attempts):
+        # Filtering on the password keeps a late result for a replaced code off the new one.
+        OTPRequest.objects.filter(pk=otp.pk, password=otp.password).update(
+            delivery_status=status, delivery_attempts=attempts
+        )
+
+    @staticmethod
+    def _matching(email, password):
+        return OTPRequest.objects.filter(email=email, password=password, expires_at__gt=timezone.now())
+
+    def prune(self, batch_size=1000):
+        now = timezone.now()
+        expired = OTPRequest.objects.filter(expires_at__lte=now)
+        pruned = 0
+        while pks := list(expired.values_list('pk', flat=True)[:batch_size]):
+            # issue() reuses the row of an email, so a code re-issued since the select keeps its row.
+            deleted, _ = expired.filter(pk__in=pks).delete()
+            pruned += deleted
+        return pruned
+
+
+class CacheOTPStore(OTPStore):
+    # Each code has its own key, so verify() consumes it with a single delete and a re-issued code can't be consumed
+    # by a request that checked the old one. The email key only points at the current code.
+    def __init__(self):
+        super().__init__()
+        self.cache = caches[getattr(settings, 'OTP_CACHE_ALIAS', 'default')]
+
+    @staticmethod
+    def _key(email):
+        return f'otp:{email}'
+
+    @staticmethod
+    def _code_key(digest):
+        return f'otp:code:{digest}'
+
+    @staticmethod
+    def _delivery_key(digest):
+        return f'otp:delivery:{digest}'
+
+    @staticmethod
+    def _digest(email, password):
+        return salted_hmac('otp', f'{email}:{password}').hexdigest()
+
+    def _new_code(self, email):
+        otp = OTPRequest(email=email, password=generate_otp(), expires_at=timezone.now() + self.ttl)
+        digest = self._digest(email, otp.password)
+        values = {
+            self._code_key(digest): True,
+            self._delivery_key(digest): {'delivery_status': otp.delivery_status, 'delivery_attempts': 0},
+        }
+        return otp, digest, values
+
+    def issue(self, email):
+        otp, digest, values = self._new_code(email)
+        timeout = self.ttl.total_seconds()
+        self.cache.set_many(values, timeout)
+        created = self.cache.add(self._key(email), digest, timeout)
+        if not created:
+            previous = self.cache.get(self._key(email))
+            self.cache.set(self._key(email), digest, timeout)
+            if previous is not None:
+                self.cache.delete(self._code_key(previous))
+        return otp, created
+
+    def verify(self, email, password):
+        digest = self._digest(email, password)
+        if not self.cache.delete(self._code_key(digest)):
+            return False
+        if self.cache.get(self._key(email)) == digest:
+            self.cache.delete(self._key(email))
+        return True
+
+    async def aissue(self, email):
+        otp, digest, values = self._new_code(email)
+        timeout = self.ttl.total_seconds()
+        await self.cache.aset_many(values, timeout)
+        created = await self.cache.aadd(self._key(email), digest, timeout)
+        if not created:
+            previous = await self.cache.aget(self._key(email))
+            await self.cache.aset(self._key(email), digest, timeout)
+            if previous is not None:
+                await self.cache.adelete(self._code_key(previous))
+        return otp, created
+
+    async def averify(self, email, password):
+        digest = self._digest(email, password)
+        if not await self.cache.adelete(self._code_key(digest)):
+            return False
+        if await self.cache.aget(self._key(email)) == digest:
+            await self.cache.adelete(self._key(email))
+        return True
+
+    def record_delivery(self, otp, status, attempts):
+        timeout = (otp.expires_at - timezone.now()).total_seconds()
+        if timeout > 0:
+            self.cache.set(
+                self._delivery_key(self._digest(otp.email, otp.password)),
+                {'delivery_status': status, 'delivery_attempts': attempts},
+                timeout,
+            )
+
+    def delivery(self, email, password):
+        return self.cache.get(self._delivery_key(self._digest(email, password)))
+
+
+def get_otp_store():
+    return import_string(settings.OTP_STORE)()
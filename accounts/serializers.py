@@ -7,6 +7,7 @@ class OTPRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model = OTPRequest
         fields = ('email',)
+        extra_kwargs = {'email': {'validators': []}}
 
 
 class OTPResponseSerializer(serializers.Serializer):
@@ -1,3 +1,290 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts import async_views
+from accounts.authentication import user_cache
+from accounts.models import OTPRequest, User
+from accounts.otp_store import CacheOTPStore, DatabaseOTPStore
+from utils.email_queue import email_queue
+
+
+@override_settings(EMAIL_QUEUE={'WORKERS': 0, 'MAX_ATTEMPTS': 3, 'RETRY_BACKOFF': 0})
+class OTPDeliveryTests(APITestCase):
+    def tearDown(self):
+        email_queue.drain()
+
+    def request_otp(self, email='user@example.com'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('request'), {'email': email})
+
+    def test_request_returns_before_sending(self):
+        response = self.request_otp()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(len(email_queue), 1)
+        self.assertEqual(OTPRequest.objects.get().delivery_status, OTPRequest.DeliveryStatus.PENDING)
+
+    def test_queued_email_is_delivered(self):
+        self.request_otp()
+        email_queue.drain()
+
+        otp = OTPRequest.objects.get()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user@example.com'])
+        self.assertEqual(mail.outbox[0].body, otp.password)
+        self.assertEqual(otp.delivery_status, OTPRequest.DeliveryStatus.SENT)
+        self.assertEqual(otp.delivery_attempts, 1)
+
+    def test_batch_reuses_one_connection(self):
+        for i in range(3):
+            self.request_otp(f'user{i}@example.com')
+
+        with mock.patch('utils.email_queue.get_connection', wraps=mail.get_connection) as get_connection:
+            email_queue.drain()
+
+        get_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failed_delivery_is_retried(self):
+        self.request_otp()
+
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=[OSError('SMTP down'), 1]), \
+                self.assertLogs('utils.email_queue', 'WARNING'):
+            email_queue.drain()
+
+        otp = OTPRequest.objects.get()
+        self.assertEqual(otp.delivery_status, OTPRequest.DeliveryStatus.SENT)
+        self.assertEqual(otp.delivery_attempts, 2)
+
+    def test_delivery_gives_up_after_max_attempts(self):
+        self.request_otp()
+
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=OSError('SMTP down')) as send_messages, \
+                self.assertLogs('utils.email_queue', 'WARNING'):
+            email_queue.drain()
+
+        otp = OTPRequest.objects.get()
+        self.assertEqual(send_messages.call_count, 3)
+        self.assertEqual(otp.delivery_status, OTPRequest.DeliveryStatus.FAILED)
+        self.assertEqual(otp.delivery_attempts, 3)
+
+    def test_stale_delivery_does_not_overwrite_new_code(self):
+        self.request_otp()
+        self.request_otp()
+        email_queue.drain()
+
+        otp = OTPRequest.objects.get()
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[-1].body, otp.password)
+        self.assertEqual(otp.delivery_status, OTPRequest.DeliveryStatus.SENT)
+
+
+@override_settings(EMAIL_QUEUE={'WORKERS': 0})
+class OTPVerifyTests(APITestCase):
+    def tearDown(self):
+        email_queue.drain()
+
+    def request_otp(self, email='user@example.com'):
+        response = self.client.post(reverse('request'), {'email': email})
+        return response, OTPRequest.objects.get(email=email)
+
+    def verify(self, password, email='user@example.com'):
+        return self.client.post(reverse('token_obtain_pair'), {'email': email, 'password': password})
+
+    def test_code_is_consumed_on_login(self):
+        _, otp = self.request_otp()
+
+        with self.assertNumQueries(1):
+            store_accepted = DatabaseOTPStore().verify(otp.email, 'wrong!')
+        self.assertFalse(store_accepted)
+
+        response = self.verify(otp.password)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.data)
+
+        self.assertEqual(self.verify(otp.password).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_pins_the_user_to_the_primary(self):
+        _, otp = self.request_otp()
+        cache.clear()
+
+        self.verify(otp.password)
+
+        self.assertTrue(cache.get(f'db-primary-pin:{User.objects.get(email=otp.email).id}'))
+
+    def test_requesting_again_replaces_the_code(self):
+        first, old = self.request_otp()
+        second, new = self.request_otp()
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(OTPRequest.objects.count(), 1)
+        if old.password != new.password:
+            self.assertEqual(self.verify(old.password).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.verify(new.password).status_code, status.HTTP_200_OK)
+
+    def test_expired_code_is_rejected(self):
+        _, otp = self.request_otp()
+        OTPRequest.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(self.verify(otp.password).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_prune_deletes_expired_codes(self):
+        for i in range(5):
+            self.request_otp(f'user{i}@example.com')
+        OTPRequest.objects.filter(email__in=['user0@example.com', 'user1@example.com', 'user2@example.com']).update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        out = StringIO()
+        call_command('prune_otps', '--batch-size', '2', stdout=out)
+
+        self.assertIn('Pruned 3', out.getvalue())
+        self.assertEqual(
+            set(OTPRequest.objects.values_list('email', flat=True)), {'user3@example.com', 'user4@example.com'}
+        )
+
+
+@override_settings(OTP_STORE='accounts.otp_store.CacheOTPStore', EMAIL_QUEUE={'WORKERS': 0})
+class CacheOTPStoreTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_issue_and_verify(self):
+        store = CacheOTPStore()
+        otp, created = store.issue('user@example.com')
+        _, created_again = store.issue('user@example.com')
+
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertFalse(store.verify('user@example.com', otp.password))
+
+    def test_verify_consumes_only_current_code(self):
+        store = CacheOTPStore()
+        store.issue('user@example.com')
+        otp, _ = store.issue('user@example.com')
+
+        self.assertTrue(store.verify('user@example.com', otp.password))
+        self.assertFalse(store.verify('user@example.com', otp.password))
+        _, created = store.issue('user@example.com')
+        self.assertTrue(created)
+
+    def test_delivery_is_recorded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('request'), {'email': 'user@example.com'})
+        email_queue.drain()
+        password = mail.outbox[0].body
+
+        self.assertEqual(
+            CacheOTPStore().delivery('user@example.com', password),
+            {'delivery_status': OTPRequest.DeliveryStatus.SENT, 'delivery_attempts': 1},
+        )
+
+    def test_login_flow(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('request'), {'email': 'user@example.com'})
+        email_queue.drain()
+        password = mail.outbox[0].body
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(OTPRequest.objects.exists())
+        response = self.client.post(reverse('token_obtain_pair'), {'email': 'user@example.com', 'password': password})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(reverse('token_obtain_pair'), {'email': 'user@example.com', 'password': password})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = User.objects.create(email='user@example.com', username='user')
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def get_lists(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('list_create'))
+        return response, [query['sql'] for query in queries if 'accounts_user' in query['sql']]
+
+    def test_user_is_resolved_once(self):
+        response, user_queries = self.get_lists()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(user_queries), 1)
+
+        response, user_queries = self.get_lists()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(user_queries, [])
+
+    def test_deactivation_evicts_cached_user(self):
+        self.get_lists()
+        self.user.is_active = False
+        self.user.save()
+
+        response, _ = self.get_lists()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(JWT_USER_CACHE={'MAX_SIZE': 2, 'TIMEOUT': 60})
+    def test_cache_is_bounded(self):
+        for i in range(3):
+            user_cache.set(i, User(pk=i))
+
+        self.assertEqual(len(user_cache), 2)
+        self.assertIsNone(user_cache.get(0))
+        self.assertEqual(user_cache.get(2).pk, 2)
+
+    @override_settings(JWT_USER_CACHE={'TIMEOUT': 0})
+    def test_entries_expire(self):
+        user_cache.set(self.user.pk, self.user)
+
+        self.assertIsNone(user_cache.get(self.user.pk))
+
+
+@override_settings(EMAIL_QUEUE={'WORKERS': 0})
+class AsyncOTPViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        email_queue.drain()
+
+    def post(self, view, data):
+        request = AsyncRequestFactory().post('/', data, content_type='application/json')
+        return async_to_sync(view.as_view())(request).render()
+
+    def test_login_flow(self):
+        response = self.post(async_views.OTPRequestView, {'email': 'user@example.com'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        otp = OTPRequest.objects.get(email='user@example.com')
+
+        response = self.post(async_views.OTPVerifyView, {'email': 'user@example.com', 'password': 'wrong!'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.post(async_views.OTPVerifyView, {'email': 'user@example.com', 'password': otp.password})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['created'])
+        self.assertIn('access', response.data)
+        self.assertFalse(OTPRequest.objects.exists())
+
+    def test_async_store_methods(self):
+        for store in (DatabaseOTPStore(), CacheOTPStore()):
+            otp, created = async_to_sync(store.aissue)('user@example.com')
+            _, created_again = async_to_sync(store.aissue)('user@example.com')
+
+            self.assertTrue(created)
+            self.assertFalse(created_again)
+            self.assertFalse(async_to_sync(store.averify)('user@example.com', otp.password))
@@ -1,10 +1,20 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
 
 from accounts import views
 
+if settings.ASYNC_API:
+    from accounts import async_views
+
+    otp_request = async_views.OTPRequestView.as_view()
+    otp_verify = async_views.OTPVerifyView.as_view()
+else:
+    otp_request = views.OTPRequestView.as_view()
+    otp_verify = views.OTPVerifyView.as_view()
+
 urlpatterns = [
-    path('request/', views.OTPRequestView.as_view(), name='request'),
-    path('verify/', views.OTPVerifyView.as_view(), name='token_obtain_pair'),
+    path('request/', otp_request, name='request'),
+    path('verify/', otp_verify, name='token_obtain_pair'),
     path('refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 ]
@@ -6,7 +6,9 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from accounts import serializers
-from accounts.models import OTPRequest, User
+from accounts.models import User
+from accounts.otp_store import get_otp_store
+from utils.db_routing import bind_user
 from utils.send_otp import send_otp
 
 
@@ -28,10 +30,8 @@ class OTPRequestView(APIView):
 
         if serializer.is_valid():
             data = serializer.validated_data
-            otp_request, created = OTPRequest.objects.get_or_create(email=data['email'])
-
-            otp_request.refresh(data) if not created else None
-            send_otp(data['email'])
+            otp_request, created = get_otp_store().issue(data['email'])
+            send_otp(otp_request)
 
             response_data = {
                 "message": "OTP sent successfully",
@@ -62,12 +62,10 @@ class OTPVerifyView(APIView):
     )
     def post(self, request: Request):
         serializer = self.serializer_class(data=request.data)
-        otp_request = OTPRequest()
 
         if serializer.is_valid():
             data = serializer.validated_data
-            if otp_request and otp_request.is_valid(data):
-                otp_request.refresh(data)
+            if get_otp_store().verify(data['email'], data['password']):
                 return Response(data=self._handle_login(data), status=status.HTTP_200_OK)
             else:
                 return Response(status=status.HTTP_401_UNAUTHORIZED)
@@ -77,6 +75,7 @@ class OTPVerifyView(APIView):
 
     def _handle_login(self, data):
         user, created = User.objects.get_or_create(email=data['email'])
+        bind_user(user.id)
         refresh = RefreshToken.for_user(user)
 
         return {
@@ -11,11 +11,13 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 from datetime import timedelta
 from pathlib import Path
-from decouple import Config, RepositoryEnv
+from decouple import Config, RepositoryEnv, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+config = Config(RepositoryEnv('secrets.env'))
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
@@ -36,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'accounts.apps.AccountsConfig',
     'lists.apps.ListsConfig',
@@ -47,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'utils.request_timing.RequestTimingMiddleware',
+    'utils.db_routing.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,10 +80,23 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Connections come from a per-process psycopg pool (see utils/db_pool.py for its metrics). The pool pings a
+# connection before handing it out and drops connections returned broken; requests that wait TIMEOUT seconds
+# for a free connection fail. Size MAX_SIZE so that workers * MAX_SIZE stays below Postgres' max_connections.
+DATABASE_POOL = {
+    'ENABLED': config('DB_POOL', default=True, cast=bool),
+    'MIN_SIZE': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+    'MAX_SIZE': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+    'TIMEOUT': config('DB_POOL_TIMEOUT', default=10.0, cast=float),
+    'MAX_IDLE': 300,
+    'MAX_LIFETIME': 1800,
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -87,9 +105,52 @@ DATABASES = {
         'PASSWORD': 'postgres',
         'HOST': 'postgres',
         'PORT': '5432',
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'min_size': DATABASE_POOL['MIN_SIZE'],
+                'max_size': DATABASE_POOL['MAX_SIZE'],
+                'timeout': DATABASE_POOL['TIMEOUT'],
+                'max_idle': DATABASE_POOL['MAX_IDLE'],
+                'max_lifetime': DATABASE_POOL['MAX_LIFETIME'],
+            },
+        } if DATABASE_POOL['ENABLED'] else {},
     }
 }
 
+# Read replicas of 'default', one per host in DB_REPLICA_HOSTS. utils.db_routing sends the reads of GET requests
+# to a replica, except for users who wrote in the last STICKY_SECONDS; pins live in the 'default' cache, so
+# deployments running more than one process need a shared backend for it.
+DATABASE_REPLICAS = {
+    'ALIASES': [],
+    'STICKY_SECONDS': config('DB_STICKY_SECONDS', default=5, cast=int),
+}
+
+for index, host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), 1):
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS['ALIASES'].append(f'replica{index}')
+
+DATABASE_ROUTERS = ['utils.db_routing.PrimaryReplicaRouter']
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Shopping list responses are cached per user and invalidated on writes. Deployments running more than one
+# process need a shared backend (Redis, Memcached) for the 'responses' alias so invalidations reach every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -131,7 +192,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
@@ -149,12 +210,86 @@ SIMPLE_JWT = {
 
 AUTH_USER_MODEL = 'accounts.User'
 
-# EmailConfig
-config = Config(RepositoryEnv('secrets.env'))
+# In-process cache of users resolved from access tokens (see accounts/authentication.py).
+# Saving or deleting a user evicts it; other processes pick the change up after TIMEOUT seconds.
+JWT_USER_CACHE = {
+    'MAX_SIZE': 10000,
+    'TIMEOUT': 60,
+}
 
+# Item name autocomplete (see lists.models.ItemName): the weight of a use halves every HALF_LIFE_DAYS.
+AUTOCOMPLETE = {
+    'HALF_LIFE_DAYS': 30,
+    'MAX_RESULTS': 20,
+}
+
+# EmailConfig
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
+EMAIL_TIMEOUT = 10
+
+# One-time passwords
+OTP_STORE = 'accounts.otp_store.DatabaseOTPStore'
+OTP_TTL = 120
+
+# Background delivery of OTP emails (see utils/email_queue.py)
+EMAIL_QUEUE = {
+    'WORKERS': 2,
+    'BATCH_SIZE': 50,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF': 2.0,
+    'IDLE_TIMEOUT': 30.0,
+}
+
+# Serve the read endpoints and the OTP views from native async views (see lists/async_views.py). config/asgi.py
+# turns this on; under WSGI the sync views avoid the per-request event loop.
+ASYNC_API = config('ASYNC_API', default=False, cast=bool)
+
+# Server-sent list and item change events (see lists/events.py), streamed from events/ under ASGI. The in-process
+# broker only reaches streams of the same process.
+LIST_EVENTS = {
+    'BACKEND': 'lists.events.InProcessEventBroker',
+    'OPTIONS': {'max_queued': 100},
+    'HEARTBEAT': 15,
+    'RETRY_MS': 3000,
+}
+
+# Per-request SQL and timing instrumentation (see utils/request_timing.py)
+REQUEST_TIMING = {
+    'ENABLED': True,
+    'HEADER': config('REQUEST_TIMING_HEADER', default=DEBUG, cast=bool),
+    'SLOW_REQUEST_MS': 500,
+    'SLOW_QUERIES': 5,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'require_debug_true': {'()': 'django.utils.log.RequireDebugTrue'},
+        'require_debug_false': {'()': 'django.utils.log.RequireDebugFalse'},
+    },
+    'handlers': {
+        'console_debug': {
+            'level': 'INFO',
+            'filters': ['require_debug_true'],
+            'class': 'logging.StreamHandler',
+        },
+        'console': {
+            'level': 'WARNING',
+            'filters': ['require_debug_false'],
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'utils.request_timing': {
+            'handlers': ['console_debug', 'console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -1,6 +1,114 @@
+from collections import defaultdict
+
 from django.contrib import admin
-from lists import models
+from django.db import transaction
+
+from lists import models, serializers
+from lists.caching import invalidate_list_count, invalidate_user_responses
+from lists.events import publish_change
+
+
+# Admin writes go through the same steps as the API: the change counter is stamped first, stored totals, search
+# documents and versions are updated, and renames and deletes leave tombstones for synced clients.
+@admin.register(models.ShoppingList)
+class ShoppingListAdmin(admin.ModelAdmin):
+    def get_readonly_fields(self, request, obj=None):
+        # Slugs are unique per user, so a list is not moved between users.
+        return ('user',) if obj is not None else ()
+
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        stamp = models.ChangeCounter.objects.stamp(obj.user_id)
+        old_slug = obj.slug
+        for field, value in stamp.items():
+            setattr(obj, field, value)
+        super().save_model(request, obj, form, change)
+        models.ShoppingList.objects.filter(pk=obj.pk).update_search_document()
+
+        data = serializers.ListSerializer(obj).data
+        if not change:
+            invalidate_list_count(obj.user_id)
+            publish_change(obj.user_id, 'list.created', obj.slug, data=data)
+        else:
+            if obj.slug != old_slug:
+                models.Tombstone.objects.record(obj.user_id, models.Tombstone.Kind.LIST, [old_slug], stamp)
+                models.Item.objects.filter(list=obj).update(**stamp)
+            publish_change(obj.user_id, 'list.updated', old_slug, data=data)
+        invalidate_user_responses(obj.user_id)
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        stamp = models.ChangeCounter.objects.stamp(obj.user_id)
+        super().delete_model(request, obj)
+        models.Tombstone.objects.record(obj.user_id, models.Tombstone.Kind.LIST, [obj.slug], stamp)
+        invalidate_list_count(obj.user_id)
+        invalidate_user_responses(obj.user_id)
+        publish_change(obj.user_id, 'list.deleted', obj.slug)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        slugs = defaultdict(list)
+        for user_id, slug in queryset.values_list('user_id', 'slug'):
+            slugs[user_id].append(slug)
+        stamps = {user_id: models.ChangeCounter.objects.stamp(user_id) for user_id in sorted(slugs)}
+        super().delete_queryset(request, queryset)
+        for user_id, user_slugs in slugs.items():
+            models.Tombstone.objects.record(user_id, models.Tombstone.Kind.LIST, user_slugs, stamps[user_id])
+            invalidate_list_count(user_id)
+            invalidate_user_responses(user_id)
+            for slug in user_slugs:
+                publish_change(user_id, 'list.deleted', slug)
+
+
+@admin.register(models.Item)
+class ItemAdmin(admin.ModelAdmin):
+    def get_readonly_fields(self, request, obj=None):
+        # Stored totals and slugs belong to the list, so an item is not moved between lists.
+        return ('list',) if obj is not None else ()
+
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        user_id = obj.list.user_id
+        stamp = models.ChangeCounter.objects.stamp(user_id)
+        removed, old_slug = None, obj.slug
+        if change:
+            stored = models.Item.objects.select_for_update().get(pk=obj.pk)
+            removed, old_slug = stored.totals(), stored.slug
+        for field, value in stamp.items():
+            setattr(obj, field, value)
+        super().save_model(request, obj, form, change)
+
+        shopping_list = models.ShoppingList.objects.filter(pk=obj.list_id)
+        shopping_list.adjust_totals(added=obj.totals(), removed=removed, **stamp)
+        if not change or 'name' in form.changed_data:
+            shopping_list.update_search_document()
+            models.ItemName.objects.record(user_id, [obj.name])
+        if change and obj.slug != old_slug:
+            models.Tombstone.objects.record(user_id, models.Tombstone.Kind.ITEM, [old_slug], stamp, obj.list.slug)
+        invalidate_user_responses(user_id)
+        event = 'item.updated' if change else 'item.created'
+        publish_change(user_id, event, obj.list.slug, items=[serializers.ItemSerializer(obj).data])
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, models.Item.objects.filter(pk=obj.pk))
 
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        user_ids = sorted(set(queryset.values_list('list__user_id', flat=True)))
+        stamps = {user_id: models.ChangeCounter.objects.stamp(user_id) for user_id in user_ids}
+        by_list = defaultdict(list)
+        for item in queryset.select_related('list').select_for_update(of=('self',)).order_by():
+            by_list[item.list].append(item)
+        super().delete_queryset(request, queryset)
 
-admin.site.register(models.ShoppingList)
-admin.site.register(models.Item)
+        for shopping_list, items in by_list.items():
+            user_id, slugs = shopping_list.user_id, [item.slug for item in items]
+            lists = models.ShoppingList.objects.filter(pk=shopping_list.pk)
+            lists.adjust_totals(removed=models.Item.sum_totals(items), **stamps[user_id])
+            lists.update_search_document()
+            models.Tombstone.objects.record(
+                user_id, models.Tombstone.Kind.ITEM, slugs, stamps[user_id], shopping_list.slug
+            )
+            publish_change(user_id, 'item.deleted', shopping_list.slug, items=[{'slug': slug} for slug in slugs])
+        for user_id in user_ids:
+            invalidate_user_responses(user_id)
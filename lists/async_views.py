@@ -0,0 +1,212 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from drf_spectacular.utils import extend_schema
+from rest_framework import permissions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from lists import serializers, views
+from lists.caching import cache_response
+from lists.events import get_event_broker
+from lists.models import ShoppingList, Item, ItemName
+from lists.renderers import EventStreamRenderer
+from utils.async_views import AsyncAPIView, sync_action, schema_of
+
+
+def with_etag(response, etag):
+    if etag is not None:
+        response.headers.setdefault('ETag', etag)
+    return response
+
+
+def cursor_page(request, queryset, values):
+    paginator = views.ListCursorPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    return paginator.get_paginated_response(serializers.list_payloads(page, values))
+
+
+async def event_stream(user_id):
+    config = settings.LIST_EVENTS
+    subscription = get_event_broker().subscribe(user_id)
+    try:
+        yield f'retry: {config["RETRY_MS"]}\n\n'
+        while True:
+            try:
+                event, data = await asyncio.wait_for(subscription.get(), config['HEARTBEAT'])
+            except TimeoutError:
+                yield ': keepalive\n\n'
+            else:
+                yield f'event: {event}\ndata: {data}\n\n'
+    finally:
+        subscription.close()
+
+
+# The ETag state, the row count and the list row are read in one query each instead of concurrently: the async ORM
+# runs every query of a request on one connection thread, so separate queries would only add round trips.
+class ListIndexView(AsyncAPIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = views.ListPagination
+
+    @schema_of(views.ListViewSet.list)
+    @cache_response('lists')
+    async def get(self, request: Request):
+        queryset = ShoppingList.objects.filter(user_id=request.user.id)
+        state = await queryset.aaggregate(**views.LIST_INDEX_STATE)
+        etag = views.LIST_INDEX_ETAG.format(**state)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return with_etag(not_modified, etag)
+
+        params = serializers.ListFieldsQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return with_etag(Response(params.errors, status=status.HTTP_400_BAD_REQUEST), etag)
+        values = params.validated_data['values']
+        queryset = values.values(queryset, 'id')
+
+        if request.query_params.get('pagination') == 'cursor':
+            return with_etag(await sync_to_async(cursor_page)(request, queryset, values), etag)
+
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(queryset, request, state['count'])
+        response = paginator.get_paginated_response(await serializers.alist_payloads(page, values))
+        return with_etag(response, etag)
+
+    post = sync_action(views.ListViewSet, 'create')
+
+
+class ListDetailView(AsyncAPIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @schema_of(views.ListViewSet.retrieve)
+    @cache_response('list_detail')
+    async def get(self, request: Request, slug=None):
+        params = serializers.ListFieldsQuerySerializer(data=request.query_params)
+        valid = params.is_valid()
+        queryset = ShoppingList.objects.filter(user_id=request.user.id, slug=slug)
+        if valid:
+            values = params.validated_data['values']
+            queryset = values.values(queryset, 'id', 'version')
+        else:
+            queryset = queryset.values('id', 'version')
+
+        row = await queryset.afirst()
+        etag = views.LIST_DETAIL_ETAG.format(row['id'], row['version']) if row else None
+        if etag is not None:
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return with_etag(not_modified, etag)
+
+        if not valid:
+            return with_etag(Response(params.errors, status=status.HTTP_400_BAD_REQUEST), etag)
+        if row is None:
+            raise Http404
+        return with_etag(Response((await serializers.alist_payloads([row], values))[0]), etag)
+
+    patch = sync_action(views.ListViewSet, 'partial_update')
+    delete = sync_action(views.ListViewSet, 'destroy')
+
+
+class ListItemsView(AsyncAPIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = views.ItemPagination
+
+    @schema_of(views.ItemViewSet.list)
+    @cache_response('items')
+    async def get(self, request: Request, slug=None):
+        shopping_list = await (
+            ShoppingList.objects
+            .filter(user_id=request.user.id, slug=slug)
+            .values('id', 'version', 'item_count', 'purchased_count')
+            .afirst()
+        )
+        etag = views.LIST_DETAIL_ETAG.format(shopping_list['id'], shopping_list['version']) if shopping_list else None
+        if etag is not None:
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return with_etag(not_modified, etag)
+
+        params = serializers.ItemFilterSerializer(data=request.query_params)
+        if not params.is_valid():
+            return with_etag(Response(params.errors, status=status.HTTP_400_BAD_REQUEST), etag)
+        if shopping_list is None:
+            raise Http404
+
+        # The list keeps its item counts up to date, so the page needs no COUNT query.
+        queryset = Item.objects.filter(list_id=shopping_list['id'])
+        count = shopping_list['item_count']
+        is_purchased = params.validated_data['is_purchased']
+        if is_purchased is not None:
+            queryset = queryset.filter(is_purchased=is_purchased)
+            count = shopping_list['purchased_count'] if is_purchased else count - shopping_list['purchased_count']
+
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(serializers.item_values.values(queryset), request, count)
+        response = paginator.get_paginated_response([serializers.item_values.to_representation(row) for row in page])
+        return with_etag(response, etag)
+
+    post = sync_action(views.ItemViewSet, 'create')
+    patch = sync_action(views.ItemViewSet, 'bulk_partial_update')
+
+
+class SearchView(AsyncAPIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @schema_of(views.SearchView.get)
+    @cache_response('search')
+    async def get(self, request: Request):
+        serializer = serializers.SearchQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        search_term = serializer.validated_data['search']
+        limit = serializer.validated_data['limit']
+        offset = serializer.validated_data['offset']
+        if not search_term:
+            return Response([])
+
+        queryset = views.search_queryset(request.user.id, search_term)
+        return Response([row async for row in queryset[offset:offset + limit]])
+
+
+class AutocompleteView(AsyncAPIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @schema_of(views.AutocompleteView.get)
+    @cache_response('autocomplete')
+    async def get(self, request: Request):
+        serializer = serializers.AutocompleteQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        return Response([name async for name in ItemName.objects.complete(request.user.id, data['q'], data['limit'])])
+
+
+class ListEventsView(AsyncAPIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    renderer_classes = (JSONRenderer, EventStreamRenderer)
+
+    @extend_schema(
+        operation_id='streamListEvents',
+        request=None,
+        responses={
+            200: 'text/event-stream of list.created, list.updated, list.deleted, item.created, item.updated, '
+                 'item.deleted and reset events',
+            401: 'Unauthorized - User is not authenticated',
+        },
+        summary='Stream shopping list changes',
+        description='Server-sent events for every change to the lists and items of the authenticated user, sent '
+                    'after the change is committed. Each event carries the list slug and the changed list or items '
+                    'as returned by the write endpoint. `reset` means events were dropped and the client should '
+                    'reload. Only served under ASGI.'
+    )
+    async def get(self, request: Request):
+        response = StreamingHttpResponse(event_stream(request.user.id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
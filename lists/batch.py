@@ -0,0 +1,214 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from rest_framework import status
+
+from lists import serializers
+from lists.events import publish_change
+from lists.models import ShoppingList, Item, ItemName, ChangeCounter, Tombstone, TOTAL_FIELDS
+
+NOT_APPLIED = {'status': status.HTTP_424_FAILED_DEPENDENCY}
+
+
+class OperationFailed(Exception):
+    def __init__(self, status_code, errors):
+        super().__init__(status_code, errors)
+        self.status_code = status_code
+        self.errors = errors
+
+
+class BatchRunner:
+    """
+    Applies an ordered batch of list and item operations in one transaction. The lists and items the batch refers
+    to are loaded once up front and kept up to date in memory, so each operation only runs its own writes. Search
+    documents and item name usage are updated once at the end.
+
+    In atomic mode the first failure rolls the whole batch back; every other operation is reported as not applied.
+    Otherwise each operation runs in a savepoint and failed ones are skipped.
+    """
+
+    def __init__(self, user_id, operations, atomic=True):
+        self.user_id = user_id
+        self.operations = operations
+        self.atomic = atomic
+        self.lists = {}
+        self.lists_by_id = {}
+        self.items = {}
+        self.touched = set()
+        self.names = []
+        self.lists_changed = False
+
+    def run(self):
+        results = []
+        with transaction.atomic():
+            self.stamp = ChangeCounter.objects.stamp(self.user_id)
+            self._resolve()
+            for index, operation in enumerate(self.operations):
+                try:
+                    if self.atomic:
+                        results.append(self._apply(operation))
+                    else:
+                        with transaction.atomic():
+                            results.append(self._apply(operation))
+                except OperationFailed as failure:
+                    results.append({'status': failure.status_code, 'errors': failure.errors})
+                except IntegrityError:
+                    results.append({
+                        'status': status.HTTP_409_CONFLICT,
+                        'errors': {'detail': 'Conflicts with an existing list or item.'},
+                    })
+                else:
+                    continue
+
+                if self.atomic:
+                    transaction.set_rollback(True)
+                    remaining = len(self.operations) - index - 1
+                    return False, [NOT_APPLIED] * index + [results[-1]] + [NOT_APPLIED] * remaining
+
+            touched = self.touched & set(self.lists_by_id)
+            if touched:
+                ShoppingList.objects.filter(pk__in=touched).update_search_document()
+            ItemName.objects.record(self.user_id, self.names)
+        return True, results
+
+    def _resolve(self):
+        item_keys = set()
+        list_slugs = set()
+        for operation in self.operations:
+            if operation['type'] == 'item':
+                list_slugs.add(operation['list'])
+                if operation['op'] != 'create':
+                    item_keys.add((operation['list'], operation['slug']))
+            elif operation['op'] != 'create':
+                list_slugs.add(operation['slug'])
+
+        if list_slugs:
+            for shopping_list in ShoppingList.objects.filter(user_id=self.user_id, slug__in=list_slugs).order_by():
+                self._add_list(shopping_list)
+        if item_keys:
+            matches = Q()
+            for list_slug, slug in item_keys:
+                if list_slug in self.lists:
+                    matches |= Q(list_id=self.lists[list_slug].pk, slug=slug)
+            if matches:
+                for item in Item.objects.select_for_update().filter(matches).order_by():
+                    self.items[self.lists_by_id[item.list_id].slug, item.slug] = item
+
+    def _apply(self, operation):
+        return getattr(self, f'_{operation["op"]}_{operation["type"]}')(operation)
+
+    def _add_list(self, shopping_list):
+        self.lists[shopping_list.slug] = shopping_list
+        self.lists_by_id[shopping_list.pk] = shopping_list
+
+    def _get_list(self, slug):
+        try:
+            return self.lists[slug]
+        except KeyError:
+            raise OperationFailed(status.HTTP_404_NOT_FOUND, {'detail': 'Shopping list not found.'})
+
+    def _get_item(self, list_slug, slug):
+        try:
+            return self.items[list_slug, slug]
+        except KeyError:
+            raise OperationFailed(status.HTTP_404_NOT_FOUND, {'detail': 'Item not found.'})
+
+    @staticmethod
+    def _validate(serializer):
+        if not serializer.is_valid():
+            raise OperationFailed(status.HTTP_400_BAD_REQUEST, serializer.errors)
+
+    def _adjust_totals(self, shopping_list, added=None, removed=None):
+        ShoppingList.objects.filter(pk=shopping_list.pk).adjust_totals(added=added, removed=removed, **self.stamp)
+        for field in TOTAL_FIELDS:
+            delta = (added or {}).get(field, 0) - (removed or {}).get(field, 0)
+            setattr(shopping_list, field, getattr(shopping_list, field) + delta)
+
+    def _create_list(self, operation):
+        serializer = serializers.ListSerializer(data=operation['data'])
+        self._validate(serializer)
+        shopping_list = serializer.save(user_id=self.user_id, **self.stamp)
+
+        self._add_list(shopping_list)
+        self.touched.add(shopping_list.pk)
+        self.lists_changed = True
+        publish_change(self.user_id, 'list.created', shopping_list.slug, data=serializer.data)
+        return {'status': status.HTTP_201_CREATED, 'data': serializer.data}
+
+    def _patch_list(self, operation):
+        slug = operation['slug']
+        shopping_list = self._get_list(slug)
+        serializer = serializers.ListSerializer(shopping_list, data=operation['data'], partial=True)
+        self._validate(serializer)
+        serializer.save(**self.stamp)
+        if shopping_list.slug != slug:
+            Tombstone.objects.record(self.user_id, Tombstone.Kind.LIST, [slug], self.stamp)
+            Item.objects.filter(list=shopping_list).update(**self.stamp)
+            del self.lists[slug]
+            self._add_list(shopping_list)
+            self.items = {
+                (self.lists_by_id[item.list_id].slug, item.slug): item for item in self.items.values()
+            }
+
+        self.touched.add(shopping_list.pk)
+        publish_change(self.user_id, 'list.updated', slug, data=serializer.data)
+        return {'status': status.HTTP_200_OK, 'data': serializer.data}
+
+    def _delete_list(self, operation):
+        slug = operation['slug']
+        shopping_list = self._get_list(slug)
+        pk = shopping_list.pk
+        shopping_list.delete()
+        Tombstone.objects.record(self.user_id, Tombstone.Kind.LIST, [slug], self.stamp)
+
+        del self.lists[slug], self.lists_by_id[pk]
+        self.items = {key: item for key, item in self.items.items() if item.list_id != pk}
+        self.lists_changed = True
+        publish_change(self.user_id, 'list.deleted', slug)
+        return {'status': status.HTTP_204_NO_CONTENT}
+
+    def _create_item(self, operation):
+        shopping_list = self._get_list(operation['list'])
+        serializer = serializers.ItemSerializer(data=operation['data'])
+        self._validate(serializer)
+        item = serializer.save(list=shopping_list, **self.stamp)
+        self._adjust_totals(shopping_list, added=item.totals())
+
+        self.items[shopping_list.slug, item.slug] = item
+        self.touched.add(shopping_list.pk)
+        self.names.append(item.name)
+        publish_change(self.user_id, 'item.created', shopping_list.slug, items=[serializer.data])
+        return {'status': status.HTTP_201_CREATED, 'data': serializer.data}
+
+    def _patch_item(self, operation):
+        slug = operation['slug']
+        item = self._get_item(operation['list'], slug)
+        shopping_list = self.lists_by_id[item.list_id]
+        removed = item.totals()
+        old_name = item.name
+        serializer = serializers.ItemSerializer(item, data=operation['data'], partial=True)
+        self._validate(serializer)
+        serializer.save(**self.stamp)
+        self._adjust_totals(shopping_list, added=item.totals(), removed=removed)
+        if item.slug != slug:
+            Tombstone.objects.record(self.user_id, Tombstone.Kind.ITEM, [slug], self.stamp, shopping_list.slug)
+            del self.items[shopping_list.slug, slug]
+            self.items[shopping_list.slug, item.slug] = item
+
+        if item.name != old_name:
+            self.touched.add(shopping_list.pk)
+            self.names.append(item.name)
+        publish_change(self.user_id, 'item.updated', shopping_list.slug, items=[serializer.data])
+        return {'status': status.HTTP_200_OK, 'data': serializer.data}
+
+    def _delete_item(self, operation):
+        slug = operation['slug']
+        item = self._get_item(operation['list'], slug)
+        shopping_list = self.lists_by_id[item.list_id]
+        self._adjust_totals(shopping_list, removed=item.totals())
+        item.delete()
+        Tombstone.objects.record(self.user_id, Tombstone.Kind.ITEM, [slug], self.stamp, shopping_list.slug)
+
+        del self.items[shopping_list.slug, slug]
+        self.touched.add(shopping_list.pk)
+        publish_change(self.user_id, 'item.deleted', shopping_list.slug, items=[{'slug': slug}])
+        return {'status': status.HTTP_204_NO_CONTENT}
@@ -0,0 +1,133 @@
+import hashlib
+import threading
+import uuid
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+RESPONSE_CACHE_ALIAS = 'responses'
+
+
+class CacheStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+response_cache_stats = CacheStats()
+
+
+def _generation_key(user_id):
+    return f'lists:generation:{user_id}'
+
+
+def _get_generation(cache, user_id):
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        generation = cache.get(key)
+    return generation
+
+
+async def _aget_generation(cache, user_id):
+    key = _generation_key(user_id)
+    generation = await cache.aget(key)
+    if generation is None:
+        await cache.aadd(key, uuid.uuid4().hex, None)
+        generation = await cache.aget(key)
+    return generation
+
+
+def list_count_cache_key(user_id):
+    return f'lists:count:{user_id}'
+
+
+# Dropped after commit, since a read between the delete and the commit would cache the old count again.
+def invalidate_list_count(user_id):
+    transaction.on_commit(lambda: cache.delete(list_count_cache_key(user_id)))
+
+
+def invalidate_user_responses(user_id):
+    def bump():
+        caches[RESPONSE_CACHE_ALIAS].set(_generation_key(user_id), uuid.uuid4().hex, None)
+
+    # Bumping again after commit drops anything a concurrent read cached from the pre-commit state.
+    bump()
+    transaction.on_commit(bump)
+
+
+def _etag_matches(etag, if_none_match):
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag.removeprefix('W/') in {tag.removeprefix('W/') for tag in etags}
+
+
+def _response_key(endpoint, request, user_id, generation, kwargs):
+    params = repr((request.get_host(), sorted(request.query_params.lists()), sorted(kwargs.items())))
+    digest = hashlib.sha256(params.encode()).hexdigest()
+    return f'lists:response:{user_id}:{generation}:{endpoint}:{digest}'
+
+
+def _cached_response(request, cached):
+    data, etag = cached
+    headers = {'ETag': etag} if etag else None
+    if etag and _etag_matches(etag, request.META.get('HTTP_IF_NONE_MATCH', '')):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(data, headers=headers)
+
+
+def cache_response(endpoint):
+    def decorator(view_method):
+        if iscoroutinefunction(view_method):
+            @wraps(view_method)
+            async def async_wrapper(view, request, *args, **kwargs):
+                cache = caches[RESPONSE_CACHE_ALIAS]
+                user_id = request.user.id
+                key = _response_key(endpoint, request, user_id, await _aget_generation(cache, user_id), kwargs)
+
+                cached = await cache.aget(key)
+                response_cache_stats.record(hit=cached is not None)
+                if cached is None:
+                    response = await view_method(view, request, *args, **kwargs)
+                    if response.status_code == status.HTTP_200_OK:
+                        await cache.aset(key, (response.data, response.get('ETag')))
+                    return response
+                return _cached_response(request, cached)
+
+            return async_wrapper
+
+        @wraps(view_method)
+        def wrapper(view, request, *args, **kwargs):
+            cache = caches[RESPONSE_CACHE_ALIAS]
+            user_id = request.user.id
+            key = _response_key(endpoint, request, user_id, _get_generation(cache, user_id), kwargs)
+
+            cached = cache.get(key)
+            response_cache_stats.record(hit=cached is not None)
+            if cached is None:
+                response = view_method(view, request, *args, **kwargs)
+                if response.status_code == status.HTTP_200_OK:
+                    cache.set(key, (response.data, response.get('ETag')))
+                return response
+            return _cached_response(request, cached)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+# Sent instead of the backlog to a subscriber that fell too far behind; the client reloads its lists.
+RESET = ('reset', '{}')
+
+
+class EventBroker:
+    """
+    Fans change events out to the streams of a user. `publish` is called from request threads after commit and
+    must not block; `subscribe` is called on the event loop of the stream and returns a `Subscription`.
+    """
+
+    def publish(self, user_id, event, data):
+        raise NotImplementedError
+
+    def subscribe(self, user_id):
+        raise NotImplementedError
+
+
+class Subscription:
+    def __init__(self, on_close, max_queued):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(max_queued)
+        self.on_close = on_close
+
+    def deliver(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The loop of the stream is gone.
+            self.close()
+
+    def _put(self, message):
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            message = RESET
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.on_close(self)
+
+
+# Reaches the streams served by this process only; run a single ASGI worker or plug in a broker backed by a shared
+# pub/sub channel before scaling out.
+class InProcessEventBroker(EventBroker):
+    def __init__(self, max_queued=100):
+        self.max_queued = max_queued
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def publish(self, user_id, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.deliver((event, data))
+
+    def subscribe(self, user_id):
+        subscription = Subscription(lambda s: self._unsubscribe(user_id, s), self.max_queued)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def _unsubscribe(self, user_id, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def subscriber_count(self, user_id):
+        with self._lock:
+            return len(self._subscribers.get(user_id, ()))
+
+
+@lru_cache
+def _load_broker(backend, options):
+    return import_string(backend)(**dict(options))
+
+
+def get_event_broker():
+    config = settings.LIST_EVENTS
+    return _load_broker(config['BACKEND'], tuple(sorted(config.get('OPTIONS', {}).items())))
+
+
+def publish_change(user_id, event, list_slug, **payload):
+    data = json.dumps({'list': list_slug, **payload}, cls=JSONEncoder)
+    transaction.on_commit(lambda: get_event_broker().publish(user_id, event, data))
@@ -0,0 +1,86 @@
+import csv
+
+from asgiref.sync import sync_to_async
+from django.db.models import F
+from rest_framework.utils.encoders import JSONEncoder
+
+from lists.models import ShoppingList, Item
+from lists.serializers import list_values, item_values
+
+EXPORT_CHUNK_SIZE = 2000
+
+CSV_COLUMNS = (
+    ('list_name', F('name')),
+    ('list_slug', F('slug')),
+    ('list_description', F('description')),
+    ('item_name', F('items__name')),
+    ('item_slug', F('items__slug')),
+    ('price', F('items__price')),
+    ('quantity', F('items__quantity')),
+    ('total_price', F('items__price') * F('items__quantity')),
+    ('is_purchased', F('items__is_purchased')),
+)
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def _buffered(lines, size):
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def export_ndjson(user_id, chunk_size=EXPORT_CHUNK_SIZE):
+    encoder = JSONEncoder(ensure_ascii=False)
+    list_export = list_values.only([name for name in list_values.field_names if name != 'items'])
+
+    def lines():
+        lists = list_export.values(ShoppingList.objects.filter(user_id=user_id).order_by('id'))
+        for row in lists.iterator(chunk_size=chunk_size):
+            yield encoder.encode({'type': 'list', **list_export.to_representation(row)}) + '\n'
+
+        items = Item.objects.filter(list__user_id=user_id).order_by('list_id', 'id')
+        for row in item_values.values(items, 'list__slug').iterator(chunk_size=chunk_size):
+            item = item_values.to_representation(row)
+            yield encoder.encode({'type': 'item', 'list': row['list__slug'], **item}) + '\n'
+
+    return _buffered(lines(), chunk_size)
+
+
+def export_csv(user_id, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow([name for name, _ in CSV_COLUMNS])
+        rows = (
+            ShoppingList.objects
+            .filter(user_id=user_id)
+            .order_by('id', 'items__id')
+            .values_list(*[expression for _, expression in CSV_COLUMNS])
+        )
+        for row in rows.iterator(chunk_size=chunk_size):
+            yield writer.writerow(row)
+
+    return _buffered(lines(), chunk_size)
+
+
+# Under ASGI, Django collects a synchronous streaming iterator into a list before sending the first byte. This fetches
+# one chunk at a time on the request's sync thread instead, where the export's database cursors live.
+async def aiter_chunks(chunks):
+    fetch = sync_to_async(next)
+    while (chunk := await fetch(chunks, None)) is not None:
+        yield chunk
+
+
+EXPORTERS = {
+    'ndjson': export_ndjson,
+    'csv': export_csv,
+}
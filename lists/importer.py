@@ -0,0 +1,263 @@
+import csv
+import itertools
+import json
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils.text import slugify
+
+from lists.models import ShoppingList, Item, ItemName, ChangeCounter, allocate_slugs
+
+IMPORT_CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+TRUE_VALUES = {'true', '1', 'yes', 't', 'y'}
+FALSE_VALUES = {'false', '0', 'no', 'f', 'n', ''}
+
+ITEM_NAME_MAX_LENGTH = Item._meta.get_field('name').max_length
+LIST_NAME_MAX_LENGTH = ShoppingList._meta.get_field('name').max_length
+PRICE_FIELD = Item._meta.get_field('price')
+MAX_PRICE = Decimal(10) ** (PRICE_FIELD.max_digits - PRICE_FIELD.decimal_places)
+PRICE_EXPONENT = Decimal(1).scaleb(-PRICE_FIELD.decimal_places)
+MIN_QUANTITY, MAX_QUANTITY = -2 ** 31, 2 ** 31 - 1
+
+INVALID_STRING = 'Not a valid string.'
+
+
+def read_ndjson(lines):
+    for row, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield row, None, {'non_field_errors': ['Invalid JSON.']}
+            continue
+        if not isinstance(record, dict):
+            yield row, None, {'non_field_errors': ['Expected an object.']}
+            continue
+        if record.get('type') == 'list':
+            kind, field = 'list', 'slug' if record.get('slug') else 'name'
+        else:
+            kind, field = 'item', 'list'
+        list_key = record.get(field)
+        if list_key is not None and not isinstance(list_key, str):
+            yield row, None, {field: [INVALID_STRING]}
+            continue
+        yield row, (kind, list_key, record), None
+
+
+def read_csv(lines):
+    for row, values in enumerate(csv.DictReader(lines), start=1):
+        list_key = values.get('list_slug') or values.get('list_name')
+        list_record = {'name': values.get('list_name'), 'description': values.get('list_description')}
+        yield row, ('list', list_key, list_record), None
+        if values.get('item_name'):
+            yield row, ('item', list_key, {
+                'name': values['item_name'],
+                'price': values.get('price'),
+                'quantity': values.get('quantity'),
+                'is_purchased': values.get('is_purchased'),
+            }), None
+
+
+READERS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+def _validate_string(value, field, errors):
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        errors[field] = [INVALID_STRING]
+        return None
+    if '\x00' in value:
+        errors[field] = ['Null characters are not allowed.']
+        return None
+    return value
+
+
+def _validate_name(value, max_length, errors):
+    name = _validate_string(value, 'name', errors)
+    if 'name' in errors:
+        return ''
+    name = (name or '').strip()
+    if not name:
+        errors['name'] = ['This field is required.']
+    elif len(name) > max_length:
+        errors['name'] = [f'Ensure this field has no more than {max_length} characters.']
+    elif not slugify(name):
+        errors['name'] = ['Name must contain at least one letter or digit.']
+    return name
+
+
+def validate_list(record):
+    errors = {}
+    name = _validate_name(record.get('name'), LIST_NAME_MAX_LENGTH, errors)
+    description = _validate_string(record.get('description'), 'description', errors) or None
+    return {'name': name, 'description': description}, errors
+
+
+def validate_item(record):
+    errors = {}
+    name = _validate_name(record.get('name'), ITEM_NAME_MAX_LENGTH, errors)
+
+    try:
+        price = Decimal(str(record.get('price')).strip())
+        if not price.is_finite() or abs(price) >= MAX_PRICE or price != price.quantize(PRICE_EXPONENT):
+            raise InvalidOperation
+    except (InvalidOperation, ValueError):
+        errors['price'] = ['A valid price with at most two decimal places is required.']
+        price = None
+
+    quantity = record.get('quantity')
+    try:
+        quantity = int(str(quantity).strip())
+        if not MIN_QUANTITY <= quantity <= MAX_QUANTITY:
+            raise ValueError
+    except ValueError:
+        errors['quantity'] = ['A valid integer is required.']
+
+    is_purchased = record.get('is_purchased', False)
+    if not isinstance(is_purchased, bool):
+        value = str(is_purchased if is_purchased is not None else '').strip().lower()
+        if value in TRUE_VALUES:
+            is_purchased = True
+        elif value in FALSE_VALUES:
+            is_purchased = False
+        else:
+            errors['is_purchased'] = ['Must be a valid boolean.']
+
+    return {'name': name, 'price': price, 'quantity': quantity, 'is_purchased': is_purchased}, errors
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.lists_created = 0
+        self.items_created = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, row, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'lists_created': self.lists_created,
+            'items_created': self.items_created,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+
+class ListImporter:
+    def __init__(self, user_id, chunk_size=IMPORT_CHUNK_SIZE, on_progress=None):
+        self.user_id = user_id
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+        self.report = ImportReport()
+        self.list_ids = {}
+
+    def run(self, lines, file_format):
+        records = READERS[file_format](lines)
+        while chunk := list(itertools.islice(records, self.chunk_size)):
+            self.import_chunk(chunk)
+            if self.on_progress is not None:
+                self.on_progress(self.report)
+        return self.report
+
+    def import_chunk(self, chunk):
+        new_lists = {}
+        items = []
+        for row, record, errors in chunk:
+            self.report.rows = row
+            if errors:
+                self.report.add_error(row, errors)
+                continue
+
+            kind, list_key, data = record
+            if kind == 'list':
+                if list_key not in self.list_ids and list_key not in new_lists:
+                    attrs, errors = validate_list(data)
+                    if errors:
+                        self.report.add_error(row, errors)
+                    else:
+                        new_lists[list_key] = attrs
+                continue
+
+            attrs, errors = validate_item(data)
+            if list_key not in self.list_ids and list_key not in new_lists:
+                errors['list'] = ['Unknown list.']
+            if errors:
+                self.report.add_error(row, errors)
+            else:
+                items.append((list_key, attrs))
+
+        if not new_lists and not items:
+            return
+        with transaction.atomic():
+            stamp = ChangeCounter.objects.stamp(self.user_id)
+            touched = self._create_lists(new_lists, stamp) | self._create_items(items, stamp)
+            if touched:
+                ShoppingList.objects.filter(pk__in=touched).update_search_document(**stamp)
+
+    def _create_lists(self, new_lists, stamp):
+        if not new_lists:
+            return set()
+
+        existing = dict(
+            ShoppingList.objects
+            .filter(user_id=self.user_id, name__in=[attrs['name'] for attrs in new_lists.values()])
+            .order_by('id')
+            .values_list('name', 'id')
+        )
+        to_create = {}
+        for key, attrs in new_lists.items():
+            if attrs['name'] in existing:
+                self.list_ids[key] = existing[attrs['name']]
+            else:
+                to_create[key] = attrs
+
+        siblings = ShoppingList.objects.filter(user_id=self.user_id)
+        slugs = allocate_slugs(siblings, [attrs['name'] for attrs in to_create.values()])
+        created = ShoppingList.objects.bulk_create(
+            ShoppingList(user_id=self.user_id, slug=slug, **attrs, **stamp)
+            for slug, attrs in zip(slugs, to_create.values())
+        )
+        for key, shopping_list in zip(to_create, created):
+            self.list_ids[key] = shopping_list.pk
+        self.report.lists_created += len(created)
+        return {shopping_list.pk for shopping_list in created}
+
+    def _create_items(self, items, stamp):
+        if not items:
+            return set()
+
+        names = defaultdict(list)
+        for list_key, attrs in items:
+            names[self.list_ids[list_key]].append(attrs['name'])
+        slugs = {
+            list_id: iter(allocate_slugs(Item.objects.filter(list_id=list_id), list_names))
+            for list_id, list_names in names.items()
+        }
+        created = Item.objects.bulk_create(
+            Item(list_id=self.list_ids[list_key], slug=next(slugs[self.list_ids[list_key]]), **attrs, **stamp)
+            for list_key, attrs in items
+        )
+
+        by_list = defaultdict(list)
+        for item in created:
+            by_list[item.list_id].append(item)
+        for list_id, list_items in by_list.items():
+            ShoppingList.objects.filter(pk=list_id).adjust_totals(added=Item.sum_totals(list_items))
+        ItemName.objects.record(self.user_id, [item.name for item in created])
+        self.report.items_created += len(created)
+        return set(by_list)
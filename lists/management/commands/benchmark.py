@@ -0,0 +1,207 @@
+import json
+from decimal import Decimal
+from urllib.parse import urlsplit
+
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User
+from accounts.otp_store import get_otp_store
+from lists.caching import RESPONSE_CACHE_ALIAS
+from lists.models import ShoppingList, Item, ItemName, ChangeCounter
+from utils.benchmark import measure
+
+# Event streams stay open until the client leaves, so they have no request latency to measure.
+UNBENCHMARKED_URLS = {'list_events'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every lists and accounts endpoint through the test client and print latency percentiles, '
+        'SQL query count and SQL time per endpoint as JSON. All writes are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default='bench0@example.com',
+                            help='User to benchmark as, created by seed_benchmark_data.')
+        parser.add_argument('--iterations', type=int, default=100, help='Requests sent to each endpoint.')
+        parser.add_argument('--search', default='milk', help='Search term for the search endpoint.')
+        parser.add_argument('--warm-cache', action='store_true',
+                            help='Keep the response cache between requests instead of clearing it before each one.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def handle(self, *args, email, iterations, search, warm_cache, output, **options):
+        try:
+            user = User.objects.get(email=email)
+        except User.DoesNotExist:
+            raise CommandError(f'User {email} does not exist, run seed_benchmark_data first')
+
+        shopping_list = ShoppingList.objects.filter(user=user).order_by('-item_count').first()
+        if shopping_list is None:
+            raise CommandError(f'User {email} has no lists')
+
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.response_cache = None if warm_cache else caches[RESPONSE_CACHE_ALIAS]
+        self.user = user
+        self.shopping_list = shopping_list
+        self.iterations = iterations
+        self.benchmarked_urls = set()
+
+        with transaction.atomic():
+            User.objects.filter(pk=user.pk).update(is_staff=True)
+            user.is_staff = True
+            results = self._run_all(search)
+            transaction.set_rollback(True)
+        user.is_staff = False
+
+        report = json.dumps({'user': email, 'iterations': iterations, 'endpoints': results}, indent=2)
+        if output:
+            with open(output, 'w') as f:
+                f.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def _run_all(self, search):
+        slug = self.shopping_list.slug
+        item_slugs = list(self.shopping_list.items.values_list('slug', flat=True))
+        refresh = str(RefreshToken.for_user(self.user))
+        keys = list(ItemName.objects.filter(user=self.user).values_list('key', flat=True)[:50]) or ['milk']
+        prefixes = [key[:length] for key in keys for length in (1, 2, 3)]
+        seq = ChangeCounter.objects.current(self.user.id)
+        # Item slugs are unique per list only; the item/<slug>/ routes need one that no other list uses.
+        legacy_item = self._create_item('benchmark legacy item').slug
+
+        return {
+            'GET lists/': self._bench('get', lambda i: (reverse('list_create'), None)),
+            'GET lists/?pagination=cursor': self._bench(
+                'get', lambda i: (reverse('list_create') + '?pagination=cursor', None)
+            ),
+            'GET lists/?fields=name,slug,total_items': self._bench(
+                'get', lambda i: (reverse('list_create') + '?fields=name,slug,total_items', None)
+            ),
+            'POST lists/': self._bench(
+                'post', lambda i: (reverse('list_create'), {'name': f'benchmark list {i}'}), expected=201
+            ),
+            'GET list/<slug>/': self._bench('get', lambda i: (reverse('list_detail', args=[slug]), None)),
+            'PATCH list/<slug>/': self._bench(
+                'patch', lambda i: (reverse('list_detail', args=[slug]), {'description': f'benchmark {i}'})
+            ),
+            'DELETE list/<slug>/': self._bench('delete', self._prepare_list_delete, expected=204),
+            'GET list/<slug>/items/': self._bench('get', lambda i: (reverse('items', args=[slug]), None)),
+            'POST list/<slug>/items/': self._bench(
+                'post',
+                lambda i: (
+                    reverse('items', args=[slug]),
+                    {'name': f'benchmark item {i}', 'quantity': 1, 'price': '1.00'},
+                ),
+                expected=201,
+            ),
+            'PATCH list/<slug>/items/': self._bench(
+                'patch',
+                lambda i: (
+                    reverse('items', args=[slug]),
+                    [{'slug': item, 'is_purchased': i % 2 == 0} for item in item_slugs[:10]],
+                ),
+            ),
+            'PATCH list/<slug>/items/<slug>/': self._bench(
+                'patch',
+                lambda i: (reverse('list_item_detail', args=[slug, item_slugs[0]]), {'quantity': i % 5 + 1}),
+            ),
+            'PUT list/<slug>/items/<slug>/purchase/': self._bench(
+                'put',
+                lambda i: (reverse('list_item_purchase', args=[slug, item_slugs[0]]), {'is_purchased': i % 2 == 0}),
+            ),
+            'DELETE list/<slug>/items/<slug>/': self._bench('delete', self._prepare_item_delete, expected=204),
+            'PATCH item/<slug>/': self._bench(
+                'patch', lambda i: (reverse('item_detail', args=[legacy_item]), {'quantity': i % 5 + 1})
+            ),
+            'PUT item/<slug>/purchase/': self._bench(
+                'put', lambda i: (reverse('item_purchase', args=[legacy_item]), {'is_purchased': i % 2 == 0})
+            ),
+            'DELETE item/<slug>/': self._bench('delete', self._prepare_legacy_item_delete, expected=204),
+            'GET changes/?since=0': self._bench('get', lambda i: (reverse('changes') + '?since=0', None)),
+            'GET changes/?since=<seq>': self._bench('get', lambda i: (reverse('changes') + f'?since={seq}', None)),
+            'POST batch/': self._bench(
+                'post',
+                lambda i: (reverse('batch'), {'operations': [
+                    {'op': 'patch', 'type': 'item', 'list': slug, 'slug': item_slugs[0],
+                     'data': {'quantity': i % 5 + 1}},
+                    {'op': 'create', 'type': 'item', 'list': slug,
+                     'data': {'name': f'benchmark batch item {i}', 'quantity': 1, 'price': '1.00'}},
+                ]}),
+            ),
+            'POST import/': self._bench('post', self._prepare_import, format='multipart'),
+            'GET search/': self._bench('get', lambda i: (reverse('search') + f'?search={search}', None)),
+            'GET autocomplete/': self._bench(
+                'get', lambda i: (reverse('autocomplete') + f'?q={prefixes[i % len(prefixes)]}', None)
+            ),
+            'GET export/?format=ndjson': self._bench('get', lambda i: (reverse('export') + '?format=ndjson', None)),
+            'GET export/?format=csv': self._bench('get', lambda i: (reverse('export') + '?format=csv', None)),
+            'GET cache-stats/': self._bench('get', lambda i: (reverse('cache_stats'), None)),
+            'GET db-pool-stats/': self._bench('get', lambda i: (reverse('db_pool_stats'), None)),
+            'POST request/': self._bench(
+                'post', lambda i: (reverse('request'), {'email': f'otp-benchmark{i}@example.invalid'}), expected=201
+            ),
+            'POST verify/': self._bench('post', self._prepare_verify, authenticated=False),
+            'POST refresh/': self._bench(
+                'post', lambda i: (reverse('token_refresh'), {'refresh': refresh}), authenticated=False
+            ),
+        }
+
+    def _bench(self, method, prepare, expected=200, authenticated=True, format='json'):
+        client = self.client if authenticated else APIClient()
+
+        def prepared(i):
+            path, data = prepare(i)
+            self.benchmarked_urls.add(resolve(urlsplit(path).path).url_name)
+            if self.response_cache is not None:
+                self.response_cache.clear()
+            return path, data
+
+        def request(path, data):
+            response = getattr(client, method)(path, data, format=format)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            if response.status_code != expected:
+                raise CommandError(f'{method.upper()} {path} returned {response.status_code}: {response.data}')
+
+        return measure(request, self.iterations, prepare=prepared)
+
+    def _prepare_list_delete(self, i):
+        shopping_list = ShoppingList.objects.create(name=f'benchmark delete {i}', user=self.user)
+        return reverse('list_detail', args=[shopping_list.slug]), None
+
+    def _create_item(self, name):
+        item = Item.objects.create(name=name, quantity=1, price=Decimal('1.00'), list=self.shopping_list)
+        ShoppingList.objects.filter(pk=self.shopping_list.pk).adjust_totals(added=item.totals())
+        return item
+
+    def _prepare_item_delete(self, i):
+        item = self._create_item(f'benchmark delete item {i}')
+        return reverse('list_item_detail', args=[self.shopping_list.slug, item.slug]), None
+
+    def _prepare_legacy_item_delete(self, i):
+        item = self._create_item(f'benchmark legacy delete item {i}')
+        return reverse('item_detail', args=[item.slug]), None
+
+    def _prepare_import(self, i):
+        lines = [{'type': 'list', 'name': f'benchmark import {i}'}] + [
+            {'type': 'item', 'list': f'benchmark import {i}', 'name': f'imported item {n}', 'price': '1.00',
+             'quantity': 1}
+            for n in range(10)
+        ]
+        content = '\n'.join(json.dumps(line) for line in lines).encode()
+        return reverse('import'), {'file': SimpleUploadedFile('import.ndjson', content)}
+
+    def _prepare_verify(self, i):
+        email = f'otp-benchmark{i}@example.invalid'
+        otp, _ = get_otp_store().issue(email)
+        return reverse('token_obtain_pair'), {'email': email, 'password': otp.password}
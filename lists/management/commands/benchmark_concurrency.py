@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from lists.models import ShoppingList
+from utils.benchmark import run_threaded, summarize
+
+MODES = ('wsgi', 'asgi')
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare WSGI and ASGI throughput of the read endpoints under concurrent load. Each mode runs in its own '
+        'process, ASGI with ASYNC_API enabled as config/asgi.py does, and the JSON report has requests per second '
+        'and latency percentiles for both.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default='bench0@example.com',
+                            help='User to benchmark as, created by seed_benchmark_data.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests sent in each mode.')
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='Requests in flight at once: worker threads under WSGI, tasks under ASGI.')
+        parser.add_argument('--search', default='milk', help='Search term for the search endpoint.')
+        parser.add_argument('--warm-cache', action='store_true',
+                            help='Serve repeated reads from the response cache instead of disabling it.')
+        parser.add_argument('--mode', choices=MODES, help='Run a single mode in this process.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+    def handle(self, *args, mode, output, **options):
+        if mode:
+            report = self.run_mode(mode, **options)
+        else:
+            report = {mode: self.run_subprocess(mode, **options) for mode in MODES}
+            report['asgi_speedup'] = round(
+                report['asgi']['requests_per_second'] / report['wsgi']['requests_per_second'], 2
+            )
+
+        report = json.dumps(report, indent=2)
+        if output:
+            with open(output, 'w') as f:
+                f.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def run_subprocess(self, mode, email, requests, concurrency, search, warm_cache, **options):
+        command = [
+            sys.executable, '-m', 'django', 'benchmark_concurrency', '--mode', mode, '--email', email,
+            '--requests', str(requests), '--concurrency', str(concurrency), '--search', search,
+        ]
+        if warm_cache:
+            command.append('--warm-cache')
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),
+            'ASYNC_API': str(mode == 'asgi'),
+        }
+        completed = subprocess.run(command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if completed.returncode:
+            raise CommandError(f'{mode} benchmark failed:\n{completed.stderr}')
+        return json.loads(completed.stdout)
+
+    def run_mode(self, mode, email, requests, concurrency, search, warm_cache, **options):
+        try:
+            user = User.objects.get(email=email)
+        except User.DoesNotExist:
+            raise CommandError(f'User {email} does not exist, run seed_benchmark_data first')
+        shopping_list = ShoppingList.objects.filter(user=user).order_by('-item_count').first()
+        if shopping_list is None:
+            raise CommandError(f'User {email} has no lists')
+
+        endpoints = [
+            reverse('list_create'),
+            reverse('list_detail', args=[shopping_list.slug]),
+            reverse('items', args=[shopping_list.slug]),
+            reverse('search') + f'?search={search}',
+        ]
+        paths = [endpoints[i % len(endpoints)] for i in range(requests)]
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        # Every request opens and closes its own connection, as with the default CONN_MAX_AGE = 0.
+        connection.close()
+
+        caches = settings.CACHES
+        if not warm_cache:
+            caches = {**caches, 'responses': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver'], CACHES=caches):
+            start = time.perf_counter()
+            if mode == 'wsgi':
+                results = self.run_wsgi(paths, headers, concurrency)
+            else:
+                results = asyncio.run(self.run_asgi(paths, headers, concurrency))
+            elapsed = time.perf_counter() - start
+
+        latencies = [latency for latency, _ in results]
+        return {
+            'async_views': settings.ASYNC_API,
+            'requests': requests,
+            'concurrency': concurrency,
+            'errors': sum(status_code != 200 for _, status_code in results),
+            'seconds': round(elapsed, 3),
+            'requests_per_second': round(requests / elapsed, 1),
+            **summarize(latencies),
+        }
+
+    def run_wsgi(self, paths, headers, concurrency):
+        local = threading.local()
+
+        def send(path):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            return local.client.get(path, headers=headers).status_code
+
+        return run_threaded(send, paths, concurrency)
+
+    async def run_asgi(self, paths, headers, concurrency):
+        pending = iter(paths)
+        results = []
+
+        async def worker():
+            client = AsyncClient()
+            for path in pending:
+                start = time.perf_counter()
+                # ASGIHandler gives each request its own thread for sync code; the test client does not.
+                async with ThreadSensitiveContext():
+                    try:
+                        response = await client.get(path, headers=headers)
+                    finally:
+                        await sync_to_async(connections.close_all)()
+                results.append(((time.perf_counter() - start) * 1000, response.status_code))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return results
@@ -0,0 +1,119 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from lists.models import ShoppingList, Item
+from utils.benchmark import run_threaded, summarize
+from utils.db_pool import pool_stats
+
+SETTINGS = ('off', 'on')
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare a new database connection per request with the connection pool on short requests: item purchase '
+        'toggles and small list reads under concurrent load. Each setting runs in its own process; toggled items '
+        'are restored afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default='bench0@example.com',
+                            help='User to benchmark as, created by seed_benchmark_data.')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests sent with each setting.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Worker threads sending requests.')
+        parser.add_argument('--pool', choices=SETTINGS, help='Run a single setting in this process.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+    def handle(self, *args, pool, output, **options):
+        if pool:
+            report = self.run_setting(pool == 'on', **options)
+        else:
+            report = {f'pool_{setting}': self.run_subprocess(setting, **options) for setting in SETTINGS}
+            report['pool_speedup'] = round(
+                report['pool_on']['requests_per_second'] / report['pool_off']['requests_per_second'], 2
+            )
+
+        report = json.dumps(report, indent=2)
+        if output:
+            with open(output, 'w') as f:
+                f.write(report + '\n')
+        else:
+            self.stdout.write(report)
+
+    def run_subprocess(self, setting, email, requests, concurrency, **options):
+        command = [
+            sys.executable, '-m', 'django', 'benchmark_db_pool', '--pool', setting, '--email', email,
+            '--requests', str(requests), '--concurrency', str(concurrency),
+        ]
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),
+            'DB_POOL': str(setting == 'on'),
+        }
+        completed = subprocess.run(command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if completed.returncode:
+            raise CommandError(f'Benchmark with the pool {setting} failed:\n{completed.stderr}')
+        return json.loads(completed.stdout)
+
+    def run_setting(self, pooled, email, requests, concurrency, **options):
+        if pooled != settings.DATABASE_POOL['ENABLED']:
+            raise CommandError(f'Set DB_POOL={pooled} to benchmark this setting')
+        try:
+            user = User.objects.get(email=email)
+        except User.DoesNotExist:
+            raise CommandError(f'User {email} does not exist, run seed_benchmark_data first')
+        shopping_list = ShoppingList.objects.filter(user=user).order_by('-item_count').first()
+        if shopping_list is None or not shopping_list.item_count:
+            raise CommandError(f'User {email} has no items')
+
+        items = list(Item.objects.filter(list=shopping_list).values_list('slug', 'is_purchased')[:20])
+        detail = reverse('list_detail', args=[shopping_list.slug]) + '?fields=name,total_items,purchased_items'
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+        local = threading.local()
+
+        def send(i):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            if i % 2:
+                return local.client.get(detail, headers=headers).status_code
+            slug, _ = items[i // 2 % len(items)]
+            response = local.client.put(
+                reverse('list_item_purchase', args=[shopping_list.slug, slug]), {'is_purchased': i // 2 % 2 == 0},
+                content_type='application/json', headers=headers,
+            )
+            return response.status_code
+
+        caches = {**settings.CACHES, 'responses': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        try:
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver'], CACHES=caches):
+                start = time.perf_counter()
+                results = run_threaded(send, range(requests), concurrency)
+                elapsed = time.perf_counter() - start
+        finally:
+            for slug, is_purchased in items:
+                Item.objects.set_purchased(slug, user.id, is_purchased, shopping_list.slug)
+
+        latencies = [latency for latency, _ in results]
+        report = {
+            'pool': pooled,
+            'requests': requests,
+            'concurrency': concurrency,
+            'errors': sum(status_code != 200 for _, status_code in results),
+            'seconds': round(elapsed, 3),
+            'requests_per_second': round(requests / elapsed, 1),
+            **summarize(latencies),
+        }
+        if pooled:
+            report['pool_stats'] = pool_stats().get('default')
+        return report
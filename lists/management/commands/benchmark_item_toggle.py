@@ -0,0 +1,64 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from lists.models import ShoppingList, Item
+
+
+class Command(BaseCommand):
+    help = 'Compare the item purchase-state endpoint with the generic item PATCH. All data is rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='Requests sent to each endpoint.')
+        parser.add_argument('--items', type=int, default=50, help='Number of items in the benchmark list.')
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def handle(self, *args, iterations, items, **options):
+        with transaction.atomic():
+            user = User.objects.create(email='toggle-benchmark@example.invalid', username='toggle-benchmark')
+            shopping_list = ShoppingList.objects.create(name='toggle benchmark', user=user)
+            Item.objects.bulk_create(
+                Item(name=f'toggle benchmark item {i}', slug=f'toggle-benchmark-item-{i}', quantity=1,
+                     price=Decimal('1.00'), list=shopping_list)
+                for i in range(items)
+            )
+            detail = reverse('list_item_detail', args=[shopping_list.slug, f'toggle-benchmark-item-{items // 2}'])
+
+            client = APIClient()
+            client.force_authenticate(user)
+            results = {
+                'PATCH list/<slug>/items/<slug>/': self._measure(
+                    lambda state: client.patch(detail, {'is_purchased': state}), iterations
+                ),
+                'PUT list/<slug>/items/<slug>/purchase/': self._measure(
+                    lambda state: client.put(detail + 'purchase/', {'is_purchased': state}), iterations
+                ),
+            }
+            transaction.set_rollback(True)
+
+        for name, (timings, queries) in results.items():
+            self.stdout.write(
+                f'{name:<40} mean {statistics.mean(timings):7.3f} ms  '
+                f'p50 {statistics.median(timings):7.3f} ms  '
+                f'p95 {statistics.quantiles(timings, n=20)[-1]:7.3f} ms  '
+                f'{queries} queries/request'
+            )
+
+    @staticmethod
+    def _measure(request, iterations):
+        timings = []
+        with CaptureQueriesContext(connection) as captured:
+            for i in range(iterations):
+                start = time.perf_counter()
+                response = request(i % 2 == 0)
+                timings.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(f'Unexpected response {response.status_code}: {response.data}')
+        return timings, len(captured) // iterations
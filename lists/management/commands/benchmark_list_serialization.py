@@ -0,0 +1,55 @@
+import json
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import User
+from lists import serializers
+from lists.models import ShoppingList, Item
+from utils.benchmark import measure
+
+
+class Command(BaseCommand):
+    help = 'Compare the values-based list payloads with ListSerializer. All data is rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='Serializations per implementation.')
+        parser.add_argument('--lists', type=int, default=5, help='Number of lists serialized per iteration.')
+        parser.add_argument('--items', type=int, default=100, help='Number of items in each list.')
+
+    def handle(self, *args, iterations, lists, items, **options):
+        renderer = JSONRenderer()
+        with transaction.atomic():
+            user = User.objects.create(
+                email='serialization-benchmark@example.invalid', username='serialization-benchmark'
+            )
+            for i in range(lists):
+                shopping_list = ShoppingList.objects.create(name=f'serialization benchmark {i}', user=user)
+                created = Item.objects.bulk_create(
+                    Item(name=f'serialization benchmark {i} item {j}', slug=f'serialization-benchmark-{i}-item-{j}',
+                         quantity=j % 4 + 1, price=Decimal(j % 500 + 1) / 100, is_purchased=j % 3 == 0,
+                         list=shopping_list)
+                    for j in range(items)
+                )
+                ShoppingList.objects.filter(pk=shopping_list.pk).adjust_totals(added=Item.sum_totals(created))
+
+            queryset = ShoppingList.objects.filter(user=user).defer('search_document')
+            results = {
+                'ListSerializer': measure(
+                    lambda i: renderer.render(
+                        serializers.ListSerializer(queryset.prefetch_related('items'), many=True).data
+                    ),
+                    iterations,
+                ),
+                'list_payloads': measure(
+                    lambda i: renderer.render(
+                        serializers.list_payloads(list(serializers.list_values.values(queryset, 'id')))
+                    ),
+                    iterations,
+                ),
+            }
+            transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps({'lists': lists, 'items': items, 'results': results}, indent=2))
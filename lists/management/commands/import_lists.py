@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from lists.caching import invalidate_list_count, invalidate_user_responses
+from lists.importer import IMPORT_CHUNK_SIZE, ListImporter, READERS
+
+
+class Command(BaseCommand):
+    help = 'Import shopping lists and items for a user from an NDJSON or CSV file in the export format.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--email', required=True, help='Owner of the imported lists.')
+        parser.add_argument('--format', choices=list(READERS), help='Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='Rows per transaction.')
+
+    def handle(self, *args, path, email, format, chunk_size, **options):
+        try:
+            user = User.objects.get(email=email)
+        except User.DoesNotExist:
+            raise CommandError(f'User {email} does not exist')
+
+        file_format = format or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+
+        def progress(report):
+            self.stdout.write(
+                f'{report.rows} rows: {report.lists_created} lists, {report.items_created} items, '
+                f'{report.error_count} errors'
+            )
+
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            report = ListImporter(user.pk, chunk_size=chunk_size, on_progress=progress).run(f, file_format)
+
+        invalidate_list_count(user.pk)
+        invalidate_user_responses(user.pk)
+        self.stdout.write(json.dumps(report.as_dict(), indent=2))
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from lists.models import ShoppingList, TOTAL_FIELDS
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored shopping list totals from their items and fix any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of lists checked per batch.')
+        parser.add_argument('--dry-run', action='store_true', help='Report drifted lists without fixing them.')
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        checked = fixed = 0
+        last_pk = 0
+
+        while batch := list(self._totals().filter(pk__gt=last_pk)[:batch_size]):
+            last_pk = batch[-1].pk
+            checked += len(batch)
+            drifted = [shopping_list.pk for shopping_list in batch if self._has_drift(shopping_list)]
+
+            if drifted and not dry_run:
+                fixed += self._fix(drifted)
+            elif drifted:
+                fixed += len(drifted)
+                for pk in drifted:
+                    self.stdout.write(f'List {pk} has drifted totals')
+
+        action = 'Found' if dry_run else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(f'{action} {fixed} drifted of {checked} lists'))
+
+    @staticmethod
+    def _totals():
+        return ShoppingList.objects.with_totals().order_by('pk')
+
+    @staticmethod
+    def _has_drift(shopping_list):
+        return (
+            shopping_list.item_count != shopping_list.items_total
+            or shopping_list.purchased_count != shopping_list.items_purchased
+            or shopping_list.total_cost != shopping_list.price_total
+            or shopping_list.purchased_cost != shopping_list.price_purchased
+        )
+
+    @transaction.atomic
+    def _fix(self, pks):
+        # Item writes update the list row after touching the item, so holding the list
+        # rows while recounting keeps concurrent deltas from being overwritten.
+        list(ShoppingList.objects.select_for_update().filter(pk__in=pks).values_list('pk', flat=True))
+
+        batch = [shopping_list for shopping_list in self._totals().filter(pk__in=pks) if self._has_drift(shopping_list)]
+        for shopping_list in batch:
+            shopping_list.item_count = shopping_list.items_total
+            shopping_list.purchased_count = shopping_list.items_purchased
+            shopping_list.total_cost = shopping_list.price_total
+            shopping_list.purchased_cost = shopping_list.price_purchased
+
+        ShoppingList.objects.bulk_update(batch, TOTAL_FIELDS)
+        return len(batch)
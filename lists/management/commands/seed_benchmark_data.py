@@ -0,0 +1,115 @@
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import User
+from lists.models import ShoppingList, Item, ItemName, ChangeCounter, allocate_slugs
+
+LIST_NAMES = (
+    'Weekly groceries', 'Weekend BBQ', 'Birthday party', 'Camping trip', 'Pharmacy', 'Hardware store',
+    'Breakfast', 'Taco night', 'Holiday dinner', 'Baby supplies', 'Office snacks', 'Pet supplies',
+    'Cleaning', 'Garden', 'Back to school', 'Lunch boxes', 'Pantry restock', 'Farmers market',
+)
+DESCRIPTIONS = (
+    None, None, 'Pick up after work', 'Check the discounts first', 'For the whole family', 'Ask about organic options',
+    'Split with roommates', 'Use the loyalty card',
+)
+# Ordered roughly by how often they appear on real lists; picks follow a Zipf-like distribution.
+ITEM_NAMES = (
+    'Milk', 'Bread', 'Eggs', 'Bananas', 'Butter', 'Cheese', 'Chicken breast', 'Tomatoes', 'Onions', 'Apples',
+    'Rice', 'Pasta', 'Coffee', 'Yogurt', 'Potatoes', 'Carrots', 'Orange juice', 'Lettuce', 'Ground beef',
+    'Cereal', 'Garlic', 'Olive oil', 'Toilet paper', 'Sugar', 'Flour', 'Avocados', 'Strawberries', 'Salmon',
+    'Spinach', 'Bell peppers', 'Tortillas', 'Peanut butter', 'Honey', 'Tea', 'Cucumbers', 'Lemons', 'Bacon',
+    'Sausages', 'Mushrooms', 'Broccoli', 'Dish soap', 'Laundry detergent', 'Shampoo', 'Toothpaste',
+    'Paper towels', 'Frozen peas', 'Ice cream', 'Chocolate', 'Crackers', 'Chips', 'Sparkling water', 'Beer',
+    'Wine', 'Ketchup', 'Mustard', 'Mayonnaise', 'Soy sauce', 'Canned tomatoes', 'Black beans', 'Chickpeas',
+    'Oats', 'Almonds', 'Walnuts', 'Blueberries', 'Grapes', 'Watermelon', 'Pineapple', 'Mango', 'Tofu',
+    'Parmesan', 'Mozzarella', 'Cream cheese', 'Sour cream', 'Basil', 'Cilantro', 'Ginger', 'Cinnamon',
+    'Vanilla extract', 'Baking soda', 'Charcoal', 'Batteries', 'Light bulbs', 'Trash bags', 'Sponges',
+    'Diapers', 'Baby wipes', 'Dog food', 'Cat litter', 'Sunscreen', 'Bandages', 'Vitamins',
+)
+ITEM_WEIGHTS = tuple(1 / rank for rank in range(1, len(ITEM_NAMES) + 1))
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load synthetic users, shopping lists and items for benchmarking.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--lists', type=int, default=20, help='Lists per user.')
+        parser.add_argument('--items', type=int, default=50, help='Average items per list.')
+        parser.add_argument('--prefix', default='bench', help='Prefix of the generated user emails.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, so runs are reproducible.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, users, lists, items, prefix, seed, batch_size, **options):
+        rng = random.Random(seed)
+        password = make_password(None)
+
+        with transaction.atomic():
+            new_users = User.objects.bulk_create(
+                [
+                    User(email=f'{prefix}{i}@example.com', username=f'{prefix}{i}', password=password)
+                    for i in range(users)
+                ],
+                batch_size=batch_size,
+            )
+
+            list_count = item_count = 0
+            for user in new_users:
+                shopping_lists, list_items = self._build_lists(
+                    rng, user, lists, items, ChangeCounter.objects.stamp(user.id)
+                )
+                ShoppingList.objects.bulk_create(shopping_lists, batch_size=batch_size)
+                for shopping_list, entries in zip(shopping_lists, list_items):
+                    for item in entries:
+                        item.list = shopping_list
+                created = Item.objects.bulk_create(
+                    [item for entries in list_items for item in entries], batch_size=batch_size
+                )
+                ItemName.objects.record(user.id, [item.name for item in created])
+                list_count += len(shopping_lists)
+                item_count += len(created)
+
+            ShoppingList.objects.filter(user__in=new_users).update_search_document()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(new_users)} users, {list_count} lists and {item_count} items'
+        ))
+
+    # Users are new, so their slugs are allocated without looking at the database.
+    @staticmethod
+    def _build_lists(rng, user, lists, items, stamp):
+        shopping_lists = []
+        list_items = []
+        list_names = [rng.choice(LIST_NAMES) for _ in range(lists)]
+        for name, slug in zip(list_names, allocate_slugs(ShoppingList.objects.none(), list_names)):
+            item_names = rng.choices(ITEM_NAMES, ITEM_WEIGHTS, k=max(1, round(rng.gauss(items, items / 3))))
+            entries = [
+                Item(
+                    name=item_name,
+                    slug=item_slug,
+                    quantity=rng.randint(1, 6),
+                    price=Decimal(rng.randint(25, 2500)) / 100,
+                    is_purchased=rng.random() < 0.3,
+                    **stamp,
+                )
+                for item_name, item_slug in zip(item_names, allocate_slugs(Item.objects.none(), item_names))
+            ]
+
+            shopping_list = ShoppingList(
+                name=name,
+                slug=slug,
+                description=rng.choice(DESCRIPTIONS),
+                user=user,
+                **stamp,
+            )
+            for field, value in Item.sum_totals(entries).items():
+                setattr(shopping_list, field, value)
+
+            shopping_lists.append(shopping_list)
+            list_items.append(entries)
+        return shopping_lists, list_items
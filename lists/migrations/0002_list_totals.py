@@ -0,0 +1,63 @@
+# Generated by Django 5.1.3 on 2026-10-18 03:31
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    ShoppingList = apps.get_model('lists', 'ShoppingList')
+    item_price = F('items__price') * F('items__quantity')
+    purchased = Q(items__is_purchased=True)
+    zero = Value(Decimal(0), output_field=DecimalField())
+
+    queryset = ShoppingList.objects.order_by('pk').annotate(
+        items_total=Count('items'),
+        items_purchased=Count('items', filter=purchased),
+        price_total=Coalesce(Sum(item_price), zero),
+        price_purchased=Coalesce(Sum(item_price, filter=purchased), zero),
+    )
+
+    last_pk = 0
+    while batch := list(queryset.filter(pk__gt=last_pk)[:1000]):
+        for shopping_list in batch:
+            shopping_list.item_count = shopping_list.items_total
+            shopping_list.purchased_count = shopping_list.items_purchased
+            shopping_list.total_cost = shopping_list.price_total
+            shopping_list.purchased_cost = shopping_list.price_purchased
+        ShoppingList.objects.bulk_update(
+            batch, ['item_count', 'purchased_count', 'total_cost', 'purchased_cost']
+        )
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Item count'),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='purchased_cost',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=12, verbose_name='Purchased cost'),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='purchased_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Purchased count'),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=12, verbose_name='Total cost'),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.1.3 on 2026-10-18 03:32
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_search_document(apps, schema_editor):
+    ShoppingList = apps.get_model('lists', 'ShoppingList')
+    Item = apps.get_model('lists', 'Item')
+    item_names = (
+        Item.objects
+        .filter(list=OuterRef('pk'))
+        .order_by()
+        .values('list')
+        .annotate(names=StringAgg('name', ' '))
+        .values('names')
+    )
+    document = (
+        SearchVector('name', weight='A')
+        + SearchVector('description', weight='B')
+        + SearchVector(Subquery(item_names), weight='C')
+    )
+
+    pks = ShoppingList.objects.order_by('pk').values_list('pk', flat=True)
+    last_pk = 0
+    while batch := list(pks.filter(pk__gt=last_pk)[:1000]):
+        ShoppingList.objects.filter(pk__in=batch).update(search_document=document)
+        last_pk = batch[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0002_list_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='search_document',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Search document'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='item_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_document'], name='shoppinglist_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='shoppinglist_name_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['description'], name='shoppinglist_desc_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(backfill_search_document, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 03:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0003_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='version',
+            field=models.PositiveBigIntegerField(default=1, editable=False, verbose_name='Version'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.1.3 on 2026-10-18 04:10
+
+import math
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.utils import timezone
+
+
+# Frozen copies of AUTOCOMPLETE['HALF_LIFE_DAYS'] and lists.models.NAME_SCORE_EPOCH as of this migration.
+HALF_LIFE_DAYS = 30
+SCORE_EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+
+# Items carry no timestamps, so every existing name counts as used now, once per item.
+def backfill_item_names(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Item = apps.get_model('lists', 'Item')
+    ItemName = apps.get_model('lists', 'ItemName')
+    now = timezone.now()
+    base_score = (now - SCORE_EPOCH).total_seconds() / (HALF_LIFE_DAYS * 86400)
+
+    pks = User.objects.order_by('pk').values_list('pk', flat=True)
+    last_pk = 0
+    while batch := list(pks.filter(pk__gt=last_pk)[:1000]):
+        uses = Counter()
+        spelling = {}
+        rows = (
+            Item.objects
+            .filter(list__user_id__in=batch)
+            .order_by()
+            .values_list('list__user_id', 'name')
+            .annotate(uses=Count('id'))
+        )
+        for user_id, name, count in rows:
+            key = (user_id, ' '.join(name.split()).lower())
+            if key[1]:
+                uses[key] += count
+                spelling[key] = ' '.join(name.split())
+        ItemName.objects.bulk_create(
+            [
+                ItemName(
+                    user_id=user_id, key=key, name=spelling[user_id, key], use_count=count,
+                    score=base_score + math.log2(count), last_used_at=now,
+                )
+                for (user_id, key), count in uses.items()
+            ],
+            batch_size=1000,
+        )
+        last_pk = batch[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0004_list_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ItemName',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(editable=False, max_length=100, verbose_name='Lookup key')),
+                ('name', models.CharField(max_length=100, verbose_name='Item name')),
+                ('use_count', models.PositiveIntegerField(default=0, verbose_name='Use count')),
+                ('score', models.FloatField(default=0, verbose_name='Score')),
+                ('last_used_at', models.DateTimeField(verbose_name='Last used at')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_names', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Item name',
+                'verbose_name_plural': 'Item names',
+                'constraints': [models.UniqueConstraint(fields=('user', 'key'), name='itemname_user_key_uniq', opclasses=['int8_ops', 'text_pattern_ops'])],
+            },
+        ),
+        migrations.RunPython(backfill_item_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.1.3 on 2026-10-18 04:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Existing lists and items are stamped with sequence 1, so every counter of a user who has lists starts there.
+def backfill_change_counters(apps, schema_editor):
+    ShoppingList = apps.get_model('lists', 'ShoppingList')
+    ChangeCounter = apps.get_model('lists', 'ChangeCounter')
+
+    user_ids = ShoppingList.objects.order_by('user_id').values_list('user_id', flat=True).distinct()
+    last_user_id = 0
+    while batch := list(user_ids.filter(user_id__gt=last_user_id)[:1000]):
+        ChangeCounter.objects.bulk_create([ChangeCounter(user_id=user_id, value=1) for user_id in batch])
+        last_user_id = batch[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_otp_store'),
+        ('lists', '0005_item_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='User')),
+                ('value', models.PositiveBigIntegerField(default=0, verbose_name='Value')),
+            ],
+            options={
+                'verbose_name': 'Change counter',
+                'verbose_name_plural': 'Change counters',
+            },
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('list', 'List'), ('item', 'Item')], max_length=4, verbose_name='Kind')),
+                ('slug', models.SlugField(db_index=False, max_length=150, verbose_name='Slug')),
+                ('change_seq', models.PositiveBigIntegerField(verbose_name='Change sequence')),
+                ('deleted_at', models.DateTimeField(verbose_name='Deleted at')),
+            ],
+            options={
+                'verbose_name': 'Tombstone',
+                'verbose_name_plural': 'Tombstones',
+            },
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='change_seq',
+            field=models.PositiveBigIntegerField(default=1, editable=False, verbose_name='Change sequence'),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Updated at'),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='change_seq',
+            field=models.PositiveBigIntegerField(default=1, editable=False, verbose_name='Change sequence'),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Updated at'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['list', 'change_seq'], name='item_list_seq_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(fields=['user', 'change_seq'], name='shoppinglist_user_seq_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='User'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['user', 'change_seq'], name='tombstone_user_seq_idx'),
+        ),
+        migrations.AlterField(
+            model_name='item',
+            name='change_seq',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Change sequence'),
+        ),
+        migrations.AlterField(
+            model_name='shoppinglist',
+            name='change_seq',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Change sequence'),
+        ),
+        migrations.RunPython(backfill_change_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,133 @@
+# Generated by Django 5.1.3 on 2026-10-18 04:31
+
+import itertools
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+from django.utils.text import slugify
+
+
+def rescope(rows):
+    """
+    Reallocate the slugs of one owner's (id, name, slug) rows, in id order, and yield (id, old slug, new slug) for
+    those that change. Slugs without a suffix are kept, so only suffixes added for other owners' rows go away.
+    """
+    taken = {slug for _, name, slug in rows if slug == slugify(name)}
+    next_suffix = {}
+    for pk, name, old_slug in rows:
+        base = slugify(name)
+        if old_slug == base:
+            continue
+        slug = base
+        while slug in taken:
+            next_suffix[base] = next_suffix.get(base, 1) + 1
+            slug = f'{base}-{next_suffix[base]}'
+        taken.add(slug)
+        if slug != old_slug:
+            yield pk, old_slug, slug
+
+
+# Slugs were unique across all users. Shorten the suffixes that are no longer needed, and record the renames as
+# changes so that synced clients drop the old slugs: a renamed list is tombstoned and its items are sent again.
+def rescope_slugs(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    ShoppingList = apps.get_model('lists', 'ShoppingList')
+    Item = apps.get_model('lists', 'Item')
+    ChangeCounter = apps.get_model('lists', 'ChangeCounter')
+    Tombstone = apps.get_model('lists', 'Tombstone')
+    now = timezone.now()
+
+    pks = User.objects.order_by('pk').values_list('pk', flat=True)
+    last_pk = 0
+    while batch := list(pks.filter(pk__gt=last_pk)[:500]):
+        last_pk = batch[-1]
+        lists = {}
+        renamed_lists = {}
+        rows = ShoppingList.objects.filter(user_id__in=batch).order_by('user_id', 'id')
+        for user_id, user_rows in itertools.groupby(rows.values_list('user_id', 'id', 'name', 'slug'), lambda r: r[0]):
+            user_rows = [row[1:] for row in user_rows]
+            lists.update((pk, [user_id, slug]) for pk, _, slug in user_rows)
+            for pk, old_slug, slug in rescope(user_rows):
+                renamed_lists[pk] = old_slug
+                lists[pk][1] = slug
+
+        renamed_items = {}
+        rows = Item.objects.filter(list_id__in=lists).order_by('list_id', 'id')
+        for list_id, list_rows in itertools.groupby(rows.values_list('list_id', 'id', 'name', 'slug'), lambda r: r[0]):
+            for pk, old_slug, slug in rescope([row[1:] for row in list_rows]):
+                renamed_items[pk] = (list_id, old_slug, slug)
+        changed_lists = set(renamed_lists) | {list_id for list_id, _, _ in renamed_items.values()}
+        if not changed_lists:
+            continue
+
+        users = {lists[list_id][0] for list_id in changed_lists}
+        ChangeCounter.objects.bulk_create([ChangeCounter(user_id=user_id) for user_id in users], ignore_conflicts=True)
+        ChangeCounter.objects.filter(user_id__in=users).update(value=F('value') + 1)
+        seqs = dict(ChangeCounter.objects.filter(user_id__in=users).values_list('user_id', 'value'))
+
+        ShoppingList.objects.bulk_update(
+            [
+                ShoppingList(id=pk, slug=lists[pk][1], change_seq=seqs[lists[pk][0]], updated_at=now)
+                for pk in changed_lists
+            ],
+            ['slug', 'change_seq', 'updated_at'],
+            batch_size=1000,
+        )
+        tombstones = [
+            Tombstone(user_id=lists[pk][0], kind='list', slug=old_slug, change_seq=seqs[lists[pk][0]], deleted_at=now)
+            for pk, old_slug in renamed_lists.items()
+        ]
+
+        items = []
+        for pk, (list_id, old_slug, slug) in renamed_items.items():
+            user_id, list_slug = lists[list_id]
+            items.append(Item(id=pk, slug=slug, change_seq=seqs[user_id], updated_at=now))
+            if list_id not in renamed_lists:
+                tombstones.append(Tombstone(
+                    user_id=user_id, kind='item', slug=old_slug, list_slug=list_slug, change_seq=seqs[user_id],
+                    deleted_at=now,
+                ))
+        Item.objects.bulk_update(items, ['slug', 'change_seq', 'updated_at'], batch_size=1000)
+        # Items of a renamed list are known to clients by the old list slug, so they are all sent again.
+        for list_id in renamed_lists:
+            Item.objects.filter(list_id=list_id).exclude(id__in=renamed_items).update(
+                change_seq=seqs[lists[list_id][0]], updated_at=now
+            )
+        Tombstone.objects.bulk_create(tombstones, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0006_change_tracking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tombstone',
+            name='list_slug',
+            field=models.SlugField(blank=True, db_index=False, default='', max_length=150, verbose_name='List slug'),
+        ),
+        migrations.AlterField(
+            model_name='item',
+            name='slug',
+            field=models.SlugField(db_index=False, editable=False, max_length=150, verbose_name='Slug'),
+        ),
+        migrations.AlterField(
+            model_name='shoppinglist',
+            name='slug',
+            field=models.SlugField(db_index=False, editable=False, max_length=150, verbose_name='Slug'),
+        ),
+        migrations.RunPython(rescope_slugs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='item',
+            constraint=models.UniqueConstraint(fields=('list', 'slug'), name='item_list_slug_uniq', opclasses=['int8_ops', 'text_pattern_ops']),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglist',
+            constraint=models.UniqueConstraint(fields=('user', 'slug'), name='shoppinglist_user_slug_uniq', opclasses=['int8_ops', 'text_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.3 on 2026-10-18 04:43
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0007_scope_slugs_per_owner'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='shoppinglist',
+            name='purchased_cost',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=24, verbose_name='Purchased cost'),
+        ),
+        migrations.AlterField(
+            model_name='shoppinglist',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), editable=False, max_digits=24, verbose_name='Total cost'),
+        ),
+    ]
@@ -1,95 +1,470 @@
+import math
+import re
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
 from decimal import Decimal
 
-from django.db import models
-from django.db.models import Sum, F
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import connection, models, transaction
+from django.db.models import Sum, F, Count, Q, Value, DecimalField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
 from accounts.models import User
 
 
+TOTAL_FIELDS = ('item_count', 'purchased_count', 'total_cost', 'purchased_cost')
+DERIVED_FIELDS = TOTAL_FIELDS + ('search_document', 'version')
+NAME_SCORE_EPOCH = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def slug_matches(slug, name):
+    base = slugify(name)
+    return bool(slug) and (slug == base or re.fullmatch(rf'{re.escape(base)}-\d+', slug) is not None)
+
+
+def name_key(name):
+    return ' '.join(name.split()).lower()
+
+
+# A name's score is log2 of the sum of 2 ** (t / half-life) over the times t it was used, counted from a fixed
+# epoch. Recent uses outweigh old ones, yet stored scores keep their order as time passes and never need decaying.
+def usage_score(used_at, uses=1):
+    half_life = settings.AUTOCOMPLETE['HALF_LIFE_DAYS'] * 86400
+    return (used_at - NAME_SCORE_EPOCH).total_seconds() / half_life + math.log2(uses)
+
+
+# Slugs are unique per owner: per user for lists and per list for items. `queryset` holds the rows of the owner, and
+# the slugs taken by them are read in one query. Callers hold the lock on the user's change counter (see
+# ChangeCounterManager.stamp and .lock), so concurrent creates allocate one after the other instead of colliding.
+def allocate_slugs(queryset, names):
+    bases = [slugify(name) for name in names]
+    matches = Q()
+    for base in set(bases):
+        matches |= Q(slug=base) | Q(slug__startswith=f'{base}-')
+    taken = set(queryset.filter(matches).values_list('slug', flat=True)) if bases else set()
+
+    slugs = []
+    next_suffix = {}
+    for base in bases:
+        slug = base
+        while slug in taken:
+            next_suffix[base] = next_suffix.get(base, 1) + 1
+            slug = f'{base}-{next_suffix[base]}'
+        taken.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+class ShoppingListQuerySet(models.QuerySet):
+    def with_totals(self):
+        item_price = F('items__price') * F('items__quantity')
+        purchased = Q(items__is_purchased=True)
+        pending = Q(items__is_purchased=False)
+        zero = Value(Decimal(0), output_field=DecimalField())
+
+        return self.annotate(
+            price_total=Coalesce(Sum(item_price), zero),
+            price_purchased=Coalesce(Sum(item_price, filter=purchased), zero),
+            price_pending=Coalesce(Sum(item_price, filter=pending), zero),
+            items_total=Count('items'),
+            items_purchased=Count('items', filter=purchased),
+            items_pending=Count('items', filter=pending),
+        )
+
+    def adjust_totals(self, added=None, removed=None, **fields):
+        deltas = dict.fromkeys(TOTAL_FIELDS, 0)
+        for field, value in (added or {}).items():
+            deltas[field] += value
+        for field, value in (removed or {}).items():
+            deltas[field] -= value
+
+        changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        return self.update(version=F('version') + 1, **changes, **fields)
+
+    def update_search_document(self, **fields):
+        item_names = (
+            Item.objects
+            .filter(list=OuterRef('pk'))
+            .order_by()
+            .values('list')
+            .annotate(names=StringAgg('name', ' '))
+            .values('names')
+        )
+        return self.update(
+            version=F('version') + 1,
+            search_document=(
+                SearchVector('name', weight='A')
+                + SearchVector('description', weight='B')
+                + SearchVector(Subquery(item_names), weight='C')
+            ),
+            **fields,
+        )
+
+
 class ShoppingList(models.Model):
     name = models.CharField(max_length=100, verbose_name=_('List name'))
-    slug = models.SlugField(max_length=150, unique=True, editable=False, verbose_name=_('Slug'))
+    slug = models.SlugField(max_length=150, db_index=False, editable=False, verbose_name=_('Slug'))
     description = models.TextField(null=True, blank=True, verbose_name=_('Description'))
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lists', verbose_name=_('User'))
+    item_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('Item count'))
+    purchased_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('Purchased count'))
+    # Wide enough for up to 2 ** 31 items at the largest valid price and quantity, so adjusting never overflows.
+    total_cost = models.DecimalField(
+        max_digits=24, decimal_places=2, default=Decimal(0), editable=False, verbose_name=_('Total cost')
+    )
+    purchased_cost = models.DecimalField(
+        max_digits=24, decimal_places=2, default=Decimal(0), editable=False, verbose_name=_('Purchased cost')
+    )
+    search_document = SearchVectorField(null=True, editable=False, verbose_name=_('Search document'))
+    version = models.PositiveBigIntegerField(default=1, editable=False, verbose_name=_('Version'))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_('Updated at'))
+    change_seq = models.PositiveBigIntegerField(default=0, editable=False, verbose_name=_('Change sequence'))
+
+    objects = ShoppingListQuerySet.as_manager()
 
     @property
     def total_price(self):
-        return (
-                self.items
-                .annotate(total_item_price=F('price') * F('quantity'))
-                .aggregate(total=Sum('total_item_price'))
-                ['total'] or Decimal(0)
-        )
+        return self.total_cost
 
     @property
     def total_price_purchased(self):
-        return (
-            self.items
-            .filter(is_purchased=True)
-            .annotate(total_item_price=F('price') * F('quantity'))
-            .aggregate(total=Sum('total_item_price'))
-            ['total'] or Decimal(0)
-        )
+        return self.purchased_cost
 
     @property
     def total_price_pending(self):
-        return (
-            self.items
-            .filter(is_purchased=False)
-            .annotate(total_item_price=F('price') * F('quantity'))
-            .aggregate(total=Sum('total_item_price'))
-            ['total'] or Decimal(0)
-        )
+        return self.total_cost - self.purchased_cost
 
     @property
     def total_items(self):
-        return self.items.count()
+        return self.item_count
 
     @property
     def purchased_items(self):
-        return self.items.filter(is_purchased=True).count()
+        return self.purchased_count
 
     @property
     def pending_items(self):
-        return self.items.filter(is_purchased=False).count()
+        return self.item_count - self.purchased_count
 
     def __str__(self):
         return self.name
 
     def save(self, *args, **kwargs):
-        if not self.slug or self.slug != slugify(self.name):
-            self.slug = slugify(self.name)
-        return super().save(*args, **kwargs)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in DERIVED_FIELDS
+            ]
+        if slug_matches(self.slug, self.name):
+            return super().save(*args, **kwargs)
+        with transaction.atomic(savepoint=False):
+            ChangeCounter.objects.lock(self.user_id)
+            siblings = ShoppingList.objects.filter(user_id=self.user_id).exclude(pk=self.pk)
+            self.slug = allocate_slugs(siblings, [self.name])[0]
+            return super().save(*args, **kwargs)
 
     class Meta:
         ordering = ['-id']
+        indexes = [
+            GinIndex(fields=['search_document'], name='shoppinglist_search_idx'),
+            GinIndex(fields=['name'], name='shoppinglist_name_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['description'], name='shoppinglist_desc_trgm_idx', opclasses=['gin_trgm_ops']),
+            models.Index(fields=['user', 'change_seq'], name='shoppinglist_user_seq_idx'),
+        ]
+        constraints = [
+            # text_pattern_ops lets slug allocation scan the suffixes of a name with the unique index.
+            models.UniqueConstraint(
+                fields=['user', 'slug'], name='shoppinglist_user_slug_uniq', opclasses=['int8_ops', 'text_pattern_ops']
+            ),
+        ]
         verbose_name = _('List')
         verbose_name_plural = _('Lists')
 
 
+class ItemManager(models.Manager):
+    # Taking the user id from `seq` locks the change counter before the item, in the same order as the other write
+    # paths (see ChangeCounterManager.stamp).
+    set_purchased_sql = '''
+        WITH seq AS (
+            INSERT INTO {counter_table} AS counter (user_id, value) VALUES (%(user_id)s, 1)
+            ON CONFLICT (user_id) DO UPDATE SET value = counter.value + 1
+            RETURNING user_id, value
+        ), target AS (
+            SELECT item.id, item.is_purchased AS was_purchased, item.price * item.quantity AS total_price
+            FROM {item_table} item
+            JOIN {list_table} list ON list.id = item.list_id
+            WHERE item.slug = %(slug)s AND list.user_id = (SELECT user_id FROM seq)
+              AND (%(list_slug)s::text IS NULL OR list.slug = %(list_slug)s)
+            FOR UPDATE OF item
+        ), item AS (
+            UPDATE {item_table} item
+            SET is_purchased = %(is_purchased)s, change_seq = seq.value, updated_at = now()
+            FROM target, seq
+            WHERE item.id = target.id AND (SELECT count(*) FROM target) = 1
+            RETURNING item.id, item.name, item.slug, item.price, item.quantity, item.is_purchased, item.list_id,
+                      item.change_seq, target.was_purchased, target.total_price
+        ), list AS (
+            UPDATE {list_table} list
+            SET purchased_count = list.purchased_count + delta.purchased,
+                purchased_cost = list.purchased_cost + delta.purchased * delta.total_price,
+                version = list.version + abs(delta.purchased),
+                change_seq = delta.change_seq,
+                updated_at = now()
+            FROM (
+                SELECT list_id, total_price, change_seq,
+                       CASE WHEN is_purchased = was_purchased THEN 0 WHEN is_purchased THEN 1 ELSE -1 END AS purchased
+                FROM item
+            ) delta
+            WHERE list.id = delta.list_id
+            RETURNING list.slug, list.item_count, list.purchased_count, list.total_cost, list.purchased_cost
+        )
+        SELECT item.id, item.name, item.slug, item.price, item.quantity, item.is_purchased, item.list_id, list.slug,
+               list.item_count, list.purchased_count, list.total_cost, list.purchased_cost
+        FROM item, list
+    '''
+
+    # Without `list_slug`, the slug must be used in only one of the user's lists; nothing is updated otherwise.
+    def set_purchased(self, slug, user_id, is_purchased, list_slug=None):
+        sql = self.set_purchased_sql.format(
+            item_table=connection.ops.quote_name(self.model._meta.db_table),
+            list_table=connection.ops.quote_name(ShoppingList._meta.db_table),
+            counter_table=connection.ops.quote_name(ChangeCounter._meta.db_table),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql, {'slug': slug, 'user_id': user_id, 'is_purchased': is_purchased, 'list_slug': list_slug}
+            )
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+        item_id, name, slug, price, quantity, is_purchased, list_id, list_slug, *totals = row
+        return self.model(
+            id=item_id, name=name, slug=slug, price=price, quantity=quantity, is_purchased=is_purchased,
+            list=ShoppingList(id=list_id, slug=list_slug, **dict(zip(TOTAL_FIELDS, totals))),
+        )
+
+
 class Item(models.Model):
     name = models.CharField(max_length=100, verbose_name=_('Item name'))
-    slug = models.SlugField(max_length=150, unique=True, editable=False, verbose_name=_('Slug'))
+    slug = models.SlugField(max_length=150, db_index=False, editable=False, verbose_name=_('Slug'))
     quantity = models.IntegerField(verbose_name=_('Quantity'))
     price = models.DecimalField(max_digits=5, decimal_places=2, verbose_name=_('Price'))
     is_purchased = models.BooleanField(default=False, verbose_name=_('Purchased Status'))
     list = models.ForeignKey(ShoppingList, on_delete=models.CASCADE, related_name='items', verbose_name=_('List'))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_('Updated at'))
+    change_seq = models.PositiveBigIntegerField(default=0, editable=False, verbose_name=_('Change sequence'))
+
+    objects = ItemManager()
 
     @property
     def total_price(self):
         return self.price * self.quantity
 
+    def totals(self):
+        total_price = self.total_price
+        return {
+            'item_count': 1,
+            'purchased_count': int(self.is_purchased),
+            'total_cost': total_price,
+            'purchased_cost': total_price if self.is_purchased else Decimal(0),
+        }
+
+    @staticmethod
+    def sum_totals(items):
+        combined = dict.fromkeys(TOTAL_FIELDS, 0)
+        for item in items:
+            for field, value in item.totals().items():
+                combined[field] += value
+        return combined
+
     def __str__(self):
         return self.name
 
     def save(self, *args, **kwargs):
-        if not self.slug or self.slug != self.name:
-            self.slug = slugify(self.name)
-        return super().save(*args, **kwargs)
+        if slug_matches(self.slug, self.name):
+            return super().save(*args, **kwargs)
+        with transaction.atomic(savepoint=False):
+            ChangeCounter.objects.lock(self.list.user_id)
+            siblings = Item.objects.filter(list_id=self.list_id).exclude(pk=self.pk)
+            self.slug = allocate_slugs(siblings, [self.name])[0]
+            return super().save(*args, **kwargs)
 
     class Meta:
         ordering = ['is_purchased', '-id']
+        indexes = [
+            GinIndex(fields=['name'], name='item_name_trgm_idx', opclasses=['gin_trgm_ops']),
+            models.Index(fields=['list', 'change_seq'], name='item_list_seq_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['list', 'slug'], name='item_list_slug_uniq', opclasses=['int8_ops', 'text_pattern_ops']
+            ),
+        ]
         verbose_name = _('Item')
         verbose_name_plural = _('Items')
+
+
+class ItemNameManager(models.Manager):
+    # Keys are sorted so that concurrent writers lock the rows in the same order.
+    record_sql = '''
+        INSERT INTO {table} AS used (user_id, key, name, use_count, score, last_used_at)
+        SELECT %(user_id)s, new.key, new.name, new.uses, new.score, %(used_at)s
+        FROM unnest(%(keys)s::text[], %(names)s::text[], %(uses)s::integer[], %(scores)s::float8[])
+            AS new(key, name, uses, score)
+        ORDER BY new.key
+        ON CONFLICT (user_id, key) DO UPDATE
+        SET name = EXCLUDED.name,
+            use_count = used.use_count + EXCLUDED.use_count,
+            score = greatest(used.score, EXCLUDED.score)
+                    + ln(1 + power(2, -least(abs(used.score - EXCLUDED.score), 64))) / ln(2),
+            last_used_at = greatest(used.last_used_at, EXCLUDED.last_used_at)
+    '''
+
+    def record(self, user_id, names, used_at=None):
+        uses = Counter()
+        spelling = {}
+        for name in names:
+            key = name_key(name)
+            if key:
+                uses[key] += 1
+                spelling[key] = ' '.join(name.split())
+        if not uses:
+            return
+
+        used_at = used_at or timezone.now()
+        keys = sorted(uses)
+        with connection.cursor() as cursor:
+            cursor.execute(self.record_sql.format(table=connection.ops.quote_name(self.model._meta.db_table)), {
+                'user_id': user_id,
+                'used_at': used_at,
+                'keys': keys,
+                'names': [spelling[key] for key in keys],
+                'uses': [uses[key] for key in keys],
+                'scores': [usage_score(used_at, uses[key]) for key in keys],
+            })
+
+    def complete(self, user_id, prefix, limit):
+        key = name_key(prefix)
+        if key and prefix[-1].isspace():
+            key += ' '
+        return (
+            self.filter(user_id=user_id, key__startswith=key)
+            .order_by('-score', 'key')
+            .values_list('name', flat=True)[:limit]
+        )
+
+
+class ItemName(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='item_names', verbose_name=_('User'))
+    key = models.CharField(max_length=100, editable=False, verbose_name=_('Lookup key'))
+    name = models.CharField(max_length=100, verbose_name=_('Item name'))
+    use_count = models.PositiveIntegerField(default=0, verbose_name=_('Use count'))
+    score = models.FloatField(default=0, verbose_name=_('Score'))
+    last_used_at = models.DateTimeField(verbose_name=_('Last used at'))
+
+    objects = ItemNameManager()
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        constraints = [
+            # text_pattern_ops lets the unique index also serve prefix matches on the key.
+            models.UniqueConstraint(
+                fields=['user', 'key'], name='itemname_user_key_uniq', opclasses=['int8_ops', 'text_pattern_ops']
+            ),
+        ]
+        verbose_name = _('Item name')
+        verbose_name_plural = _('Item names')
+
+
+class ChangeCounterManager(models.Manager):
+    stamp_sql = '''
+        INSERT INTO {table} AS counter (user_id, value) VALUES (%s, 1)
+        ON CONFLICT (user_id) DO UPDATE SET value = counter.value + 1
+        RETURNING value
+    '''
+
+    def stamp(self, user_id):
+        """
+        Advance the user's change sequence and return the fields that mark lists and items as changed by it. Call
+        it in the transaction of the write, before locking any list or item: the counter row stays locked until
+        commit, so the changes of a user commit in sequence order and `changes?since=` never skips one.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(self.stamp_sql.format(table=connection.ops.quote_name(self.model._meta.db_table)), [user_id])
+            (value,) = cursor.fetchone()
+        return {'change_seq': value, 'updated_at': timezone.now()}
+
+    lock_sql = '''
+        INSERT INTO {table} AS counter (user_id, value) VALUES (%s, 0)
+        ON CONFLICT (user_id) DO UPDATE SET value = counter.value
+    '''
+
+    def lock(self, user_id):
+        """
+        Lock the user's change counter until the end of the transaction without advancing it, for writes that
+        allocate slugs outside the paths that call `stamp`.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(self.lock_sql.format(table=connection.ops.quote_name(self.model._meta.db_table)), [user_id])
+
+    def current(self, user_id):
+        return self.filter(user_id=user_id).values_list('value', flat=True).first() or 0
+
+
+class ChangeCounter(models.Model):
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='+', verbose_name=_('User')
+    )
+    value = models.PositiveBigIntegerField(default=0, verbose_name=_('Value'))
+
+    objects = ChangeCounterManager()
+
+    class Meta:
+        verbose_name = _('Change counter')
+        verbose_name_plural = _('Change counters')
+
+
+class TombstoneManager(models.Manager):
+    def record(self, user_id, kind, slugs, stamp, list_slug=''):
+        return self.bulk_create(
+            self.model(
+                user_id=user_id, kind=kind, slug=slug, list_slug=list_slug, change_seq=stamp['change_seq'],
+                deleted_at=stamp['updated_at'],
+            )
+            for slug in slugs
+        )
+
+
+class Tombstone(models.Model):
+    class Kind(models.TextChoices):
+        LIST = 'list', _('List')
+        ITEM = 'item', _('Item')
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name=_('User'))
+    kind = models.CharField(max_length=4, choices=Kind.choices, verbose_name=_('Kind'))
+    slug = models.SlugField(max_length=150, db_index=False, verbose_name=_('Slug'))
+    # Item slugs are unique within their list only. Empty for items deleted while slugs were unique across lists.
+    list_slug = models.SlugField(max_length=150, blank=True, default='', db_index=False, verbose_name=_('List slug'))
+    change_seq = models.PositiveBigIntegerField(verbose_name=_('Change sequence'))
+    deleted_at = models.DateTimeField(verbose_name=_('Deleted at'))
+
+    objects = TombstoneManager()
+
+    def __str__(self):
+        return f'{self.kind} {self.slug}'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'change_seq'], name='tombstone_user_seq_idx'),
+        ]
+        verbose_name = _('Tombstone')
+        verbose_name_plural = _('Tombstones')
@@ -1,6 +1,22 @@
+import codecs
+import os
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import F
+from django.utils.functional import cached_property
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from lists.models import ShoppingList, Item, allocate_slugs
+
 
-from lists.models import ShoppingList, Item
+class ItemListSerializer(serializers.ListSerializer):
+    def create(self, validated_data):
+        # Every item goes to the list passed to save().
+        siblings = Item.objects.filter(list=validated_data[0]['list'])
+        slugs = allocate_slugs(siblings, [attrs['name'] for attrs in validated_data])
+        return Item.objects.bulk_create(Item(slug=slug, **attrs) for slug, attrs in zip(slugs, validated_data))
 
 
 class ItemSerializer(serializers.ModelSerializer):
@@ -8,6 +24,29 @@ class ItemSerializer(serializers.ModelSerializer):
         model = Item
         fields = ('name', 'slug', 'price', 'quantity', 'total_price', 'is_purchased')
         read_only_fields = ('total_price', 'slug')
+        list_serializer_class = ItemListSerializer
+
+
+class PurchaseStateSerializer(serializers.Serializer):
+    is_purchased = serializers.BooleanField()
+
+
+class ItemPurchaseSerializer(PurchaseStateSerializer):
+    slug = serializers.SlugField()
+
+
+class ListTotalsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ShoppingList
+        fields = (
+            'total_price', 'total_price_purchased', 'total_price_pending', 'total_items', 'purchased_items',
+            'pending_items'
+        )
+
+
+class PurchaseStateResponseSerializer(serializers.Serializer):
+    item = ItemSerializer(read_only=True)
+    list = ListTotalsSerializer(read_only=True)
 
 
 class ListSerializer(serializers.ModelSerializer):
@@ -24,3 +63,250 @@ class ListSerializer(serializers.ModelSerializer):
             'total_items', 'total_price', 'purchased_items', 'pending_items', 'total_price_purchased',
             'total_price_pending', 'items', 'slug'
         )
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    search = serializers.CharField(required=False, allow_blank=True, default='')
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=100, default=20)
+    offset = serializers.IntegerField(required=False, min_value=0, default=0)
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(required=False, allow_blank=True, trim_whitespace=False, max_length=100, default='')
+    limit = serializers.IntegerField(
+        required=False, min_value=1, max_value=settings.AUTOCOMPLETE['MAX_RESULTS'], default=10
+    )
+
+
+# Read-only counterpart of a ModelSerializer that renders `.values()` rows; properties are computed in SQL.
+class ValuesSerializer:
+    passthrough_fields = (serializers.ReadOnlyField, serializers.CharField, serializers.IntegerField,
+                          serializers.BooleanField)
+
+    def __init__(self, serializer_class, **expressions):
+        self.serializer_class = serializer_class
+        self.expressions = expressions
+
+    @cached_property
+    def mappers(self):
+        mappers = []
+        for name, field in self.serializer_class().fields.items():
+            if isinstance(field, serializers.BaseSerializer):
+                mappers.append((name, None, True))
+            else:
+                mappers.append((name, self.get_converter(field), False))
+        return mappers
+
+    def get_converter(self, field):
+        if isinstance(field, self.passthrough_fields):
+            return None
+        if (
+            isinstance(field, serializers.DecimalField)
+            and getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+            and not field.localize
+            and not field.normalize_output
+        ):
+            # Database values already carry the column's scale, so quantizing them is a no-op.
+            exponent = -field.decimal_places
+
+            def convert(value, to_representation=field.to_representation):
+                if value.as_tuple().exponent == exponent:
+                    return format(value, 'f')
+                return to_representation(value)
+
+            return convert
+        return field.to_representation
+
+    @cached_property
+    def field_names(self):
+        return tuple(name for name, _, _ in self.mappers)
+
+    def only(self, field_names):
+        subset = ValuesSerializer(self.serializer_class, **self.expressions)
+        subset.mappers = [mapper for mapper in self.mappers if mapper[0] in field_names]
+        return subset
+
+    def values(self, queryset, *extra):
+        columns = [name for name, _, nested in self.mappers if not nested and name not in self.expressions]
+        expressions = {name: self.expressions[name] for name in self.field_names if name in self.expressions}
+        return queryset.values(*extra, *columns, **expressions)
+
+    def to_representation(self, row, **nested):
+        payload = {}
+        for name, convert, is_nested in self.mappers:
+            if is_nested:
+                payload[name] = nested[name]
+            else:
+                value = row[name]
+                payload[name] = value if convert is None or value is None else convert(value)
+        return payload
+
+
+item_values = ValuesSerializer(ItemSerializer, total_price=F('price') * F('quantity'))
+list_values = ValuesSerializer(
+    ListSerializer,
+    total_price=F('total_cost'),
+    total_price_purchased=F('purchased_cost'),
+    total_price_pending=F('total_cost') - F('purchased_cost'),
+    total_items=F('item_count'),
+    purchased_items=F('purchased_count'),
+    pending_items=F('item_count') - F('purchased_count'),
+)
+
+
+def _list_item_rows(rows, values):
+    if rows and 'items' in values.field_names:
+        return item_values.values(Item.objects.filter(list_id__in=[row['id'] for row in rows]), 'list_id')
+    return None
+
+
+def _attach_items(rows, values, item_rows):
+    items = defaultdict(list)
+    for row in item_rows:
+        items[row['list_id']].append(item_values.to_representation(row))
+    return [values.to_representation(row, items=items[row['id']]) for row in rows]
+
+
+def list_payloads(rows, values=list_values):
+    item_rows = _list_item_rows(rows, values)
+    return _attach_items(rows, values, () if item_rows is None else item_rows)
+
+
+async def alist_payloads(rows, values=list_values):
+    item_rows = _list_item_rows(rows, values)
+    return _attach_items(rows, values, () if item_rows is None else [row async for row in item_rows])
+
+
+class ListFieldsQuerySerializer(serializers.Serializer):
+    fields = serializers.CharField(
+        required=False, help_text='Comma-separated list fields to return. Items are only embedded when listed.'
+    )
+    include = serializers.ChoiceField(
+        choices=['items'], required=False, help_text='Embed the items even if `fields` does not list them.'
+    )
+
+    def validate_fields(self, value):
+        names = {name.strip() for name in value.split(',') if name.strip()}
+        unknown = names - set(list_values.field_names)
+        if unknown:
+            raise serializers.ValidationError(f'Unknown fields: {", ".join(sorted(unknown))}.')
+        return names
+
+    def validate(self, attrs):
+        names = attrs.get('fields', set(list_values.field_names))
+        if attrs.get('include') == 'items':
+            names = names | {'items'}
+        attrs['values'] = list_values.only(names)
+        return attrs
+
+
+class ChangesQuerySerializer(serializers.Serializer):
+    since = serializers.IntegerField(
+        required=False, min_value=0, default=0,
+        help_text='`seq` of the previous sync; 0 returns every list and item.',
+    )
+
+
+class SyncItemSerializer(ItemSerializer):
+    list = serializers.SlugField(read_only=True, help_text='Slug of the list the item belongs to.')
+
+    class Meta(ItemSerializer.Meta):
+        fields = ('list',) + ItemSerializer.Meta.fields
+
+
+class DeletedItemSerializer(serializers.Serializer):
+    list = serializers.CharField(
+        allow_blank=True, help_text='Slug of the list; empty for items deleted before slugs were scoped per list.'
+    )
+    slug = serializers.SlugField()
+
+
+class DeletionsSerializer(serializers.Serializer):
+    lists = serializers.ListField(child=serializers.SlugField())
+    items = DeletedItemSerializer(many=True)
+
+
+class ChangesSerializer(serializers.Serializer):
+    seq = serializers.IntegerField(help_text='Pass as `since` on the next sync.')
+    lists = ListSerializer(many=True, help_text='Lists created or changed since `since`, without their items.')
+    items = SyncItemSerializer(many=True)
+    deleted = DeletionsSerializer(help_text='Slugs deleted since `since`; apply these before the upserts.')
+
+
+class ItemFilterSerializer(serializers.Serializer):
+    is_purchased = serializers.BooleanField(required=False, allow_null=True, default=None)
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=['create', 'patch', 'delete'])
+    type = serializers.ChoiceField(choices=['list', 'item'])
+    slug = serializers.SlugField(required=False, help_text='List or item to patch or delete.')
+    list = serializers.SlugField(required=False, help_text='List of the item, for item operations.')
+    data = serializers.DictField(
+        required=False, default=dict, help_text='Fields as accepted by the matching list or item endpoint.'
+    )
+
+    def validate(self, attrs):
+        if attrs['op'] != 'create' and 'slug' not in attrs:
+            raise serializers.ValidationError({'slug': 'This field is required to patch or delete.'})
+        if attrs['type'] == 'item' and 'list' not in attrs:
+            raise serializers.ValidationError({'list': 'This field is required for item operations.'})
+        return attrs
+
+
+class BatchSerializer(serializers.Serializer):
+    max_operations = 500
+
+    mode = serializers.ChoiceField(
+        choices=['atomic', 'best_effort'], required=False, default='atomic',
+        help_text='`atomic` applies every operation or none; `best_effort` skips the ones that fail.',
+    )
+    operations = BatchOperationSerializer(many=True, allow_empty=False, max_length=max_operations)
+
+
+class BatchResultSerializer(serializers.Serializer):
+    status = serializers.IntegerField(help_text='HTTP status the operation would have had on its own endpoint.')
+    data = serializers.DictField(required=False)
+    errors = serializers.DictField(required=False)
+
+
+class BatchReportSerializer(serializers.Serializer):
+    committed = serializers.BooleanField()
+    results = BatchResultSerializer(many=True, help_text='One result per operation, in order.')
+
+
+class ImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    file_format = serializers.ChoiceField(
+        choices=['ndjson', 'csv'], required=False, help_text='Defaults to the extension of the uploaded file.'
+    )
+
+    extensions = {'.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv'}
+
+    # Rows are imported in chunks that commit one by one, so the encoding is checked before the first one.
+    def validate_file(self, upload):
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        try:
+            for chunk in upload.chunks():
+                decoder.decode(chunk)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            raise serializers.ValidationError('The file is not valid UTF-8.')
+        upload.seek(0)
+        return upload
+
+    def validate(self, attrs):
+        if 'file_format' not in attrs:
+            extension = os.path.splitext(attrs['file'].name)[1].lower()
+            if extension not in self.extensions:
+                raise serializers.ValidationError({'file_format': 'Could not infer the format from the file name.'})
+            attrs['file_format'] = self.extensions[extension]
+        return attrs
+
+
+class ImportReportSerializer(serializers.Serializer):
+    rows = serializers.IntegerField()
+    lists_created = serializers.IntegerField()
+    items_created = serializers.IntegerField()
+    error_count = serializers.IntegerField()
+    errors = serializers.ListField(child=serializers.DictField())
@@ -1,3 +1,1655 @@
-from django.test import TestCase
+import asyncio
+import csv
+import functools
+import json
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connections, router, transaction
+from django.test import AsyncRequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APITransactionTestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts import urls as accounts_urls
+from accounts.authentication import user_cache
+from accounts.models import User
+from lists import async_views, serializers, urls as lists_urls
+from lists.caching import invalidate_user_responses, list_count_cache_key, response_cache_stats
+from lists.events import get_event_broker
+from lists.export import EXPORTERS, export_ndjson
+from lists.importer import ListImporter
+from lists.management.commands import benchmark
+from lists.models import ShoppingList, Item, ItemName
+
+
+class ListTestCase(APITestCase):
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        self.user = User.objects.create(email='user@example.com', username='user')
+        self.client.force_authenticate(self.user)
+
+    def create_list(self, name, items=0, purchased=0, user=None):
+        shopping_list = ShoppingList.objects.create(name=name, user=user or self.user)
+        for i in range(items):
+            item = Item.objects.create(
+                name=f'{name} item {i}',
+                quantity=2,
+                price=Decimal('1.50'),
+                is_purchased=i < purchased,
+                list=shopping_list,
+            )
+            ShoppingList.objects.filter(pk=shopping_list.pk).adjust_totals(added=item.totals())
+        ShoppingList.objects.filter(pk=shopping_list.pk).update_search_document()
+        invalidate_user_responses(shopping_list.user_id)
+        shopping_list.refresh_from_db()
+        return shopping_list
+
+    def login_admin(self):
+        admin = User.objects.create(email='admin@example.com', username='admin', is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+
+
+class ListTotalsTests(ListTestCase):
+    def test_totals(self):
+        shopping_list = self.create_list('weekly', items=3, purchased=1)
+
+        response = self.client.get(reverse('list_detail', args=[shopping_list.slug]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_price'], Decimal('9.00'))
+        self.assertEqual(response.data['total_price_purchased'], Decimal('3.00'))
+        self.assertEqual(response.data['total_price_pending'], Decimal('6.00'))
+        self.assertEqual(response.data['total_items'], 3)
+        self.assertEqual(response.data['purchased_items'], 1)
+        self.assertEqual(response.data['pending_items'], 2)
+        self.assertEqual(len(response.data['items']), 3)
+
+    def test_empty_list_totals(self):
+        shopping_list = self.create_list('empty')
+
+        response = self.client.get(reverse('list_detail', args=[shopping_list.slug]))
+
+        self.assertEqual(response.data['total_price'], Decimal(0))
+        self.assertEqual(response.data['total_items'], 0)
+        self.assertEqual(response.data['items'], [])
+
+    def test_list_query_count_is_constant(self):
+        for i in range(2):
+            self.create_list(f'list {i}', items=3, purchased=1)
+        with self.assertNumQueries(4):
+            self.client.get(reverse('list_create'))
+
+        for i in range(2, 5):
+            self.create_list(f'list {i}', items=5, purchased=2)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('list_create'))
+
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(response.data['results'][0]['total_items'], 5)
+
+    def test_retrieve_query_count_is_constant(self):
+        small = self.create_list('small', items=1)
+        large = self.create_list('large', items=20, purchased=5)
+
+        with self.assertNumQueries(3):
+            self.client.get(reverse('list_detail', args=[small.slug]))
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('list_detail', args=[large.slug]))
+
+        self.assertEqual(response.data['purchased_items'], 5)
+
+    def test_create_query_count_is_constant(self):
+        for i in range(5):
+            self.create_list(f'list {i}', items=2)
+
+        with self.assertNumQueries(8):
+            response = self.client.post(reverse('list_create'), {'name': 'new list'})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['total_price'], Decimal(0))
+        self.assertEqual(response.data['total_items'], 0)
+
+
+class StoredTotalsTests(ListTestCase):
+    def assertTotals(self, shopping_list, item_count, purchased_count, total_cost, purchased_cost):
+        shopping_list.refresh_from_db()
+        self.assertEqual(shopping_list.item_count, item_count)
+        self.assertEqual(shopping_list.purchased_count, purchased_count)
+        self.assertEqual(shopping_list.total_cost, Decimal(total_cost))
+        self.assertEqual(shopping_list.purchased_cost, Decimal(purchased_cost))
+
+    def test_create_item_adds_to_totals(self):
+        shopping_list = self.create_list('weekly', items=1)
+
+        response = self.client.post(
+            reverse('items', args=[shopping_list.slug]),
+            {'name': 'milk', 'price': '2.00', 'quantity': 3, 'is_purchased': True},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTotals(shopping_list, 2, 1, '9.00', '6.00')
+
+    def test_update_item_applies_delta(self):
+        shopping_list = self.create_list('weekly', items=2)
+        item = shopping_list.items.first()
+
+        self.client.patch(reverse('item_detail', args=[item.slug]), {'is_purchased': True})
+        self.assertTotals(shopping_list, 2, 1, '6.00', '3.00')
+
+        self.client.patch(reverse('item_detail', args=[item.slug]), {'quantity': 4})
+        self.assertTotals(shopping_list, 2, 1, '9.00', '6.00')
+
+    def test_delete_item_removes_from_totals(self):
+        shopping_list = self.create_list('weekly', items=2, purchased=1)
+        item = shopping_list.items.get(is_purchased=True)
+
+        response = self.client.delete(reverse('item_detail', args=[item.slug]))
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertTotals(shopping_list, 1, 0, '3.00', '0.00')
+
+    def test_other_users_items_are_not_found(self):
+        other = User.objects.create(email='other@example.com', username='other')
+        shopping_list = self.create_list('theirs', items=1, user=other)
+        item = shopping_list.items.first()
+
+        response = self.client.delete(reverse('item_detail', args=[item.slug]))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTotals(shopping_list, 1, 0, '3.00', '0.00')
+
+    def test_largest_valid_items_fit_the_totals(self):
+        shopping_list = self.create_list('weekly')
+        url = reverse('items', args=[shopping_list.slug])
+        for name in ('gold', 'silver'):
+            response = self.client.post(url, {'name': name, 'price': '999.99', 'quantity': 2 ** 31 - 1})
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertTotals(shopping_list, 2, 0, '4294924344327.06', '0.00')
+        response = self.client.get(reverse('list_detail', args=[shopping_list.slug]))
+        self.assertEqual(response.data['total_price'], Decimal('4294924344327.06'))
+
+    def test_list_update_keeps_totals(self):
+        shopping_list = self.create_list('weekly', items=2)
+        stale = ShoppingList.objects.get(pk=shopping_list.pk)
+        ShoppingList.objects.filter(pk=shopping_list.pk).adjust_totals(added={'item_count': 1})
+
+        stale.description = 'changed'
+        stale.save()
+
+        self.assertTotals(shopping_list, 3, 0, '6.00', '0.00')
+
+    def test_reconcile_fixes_drift(self):
+        shopping_list = self.create_list('weekly', items=3, purchased=2)
+        untouched = self.create_list('monthly', items=1)
+        ShoppingList.objects.filter(pk=shopping_list.pk).update(item_count=0, total_cost=100)
+
+        out = StringIO()
+        call_command('reconcile_list_totals', '--dry-run', stdout=out)
+        self.assertIn('Found 1 drifted of 2 lists', out.getvalue())
+        self.assertTotals(shopping_list, 0, 2, '100.00', '6.00')
+
+        call_command('reconcile_list_totals', '--batch-size', '1', stdout=out)
+        self.assertIn('Fixed 1 drifted of 2 lists', out.getvalue())
+        self.assertTotals(shopping_list, 3, 2, '9.00', '6.00')
+        self.assertTotals(untouched, 1, 0, '3.00', '0.00')
+
+
+class SearchTests(ListTestCase):
+    def search(self, **params):
+        return self.client.get(reverse('search'), params)
+
+    def test_matches_item_names(self):
+        shopping_list = self.create_list('weekly')
+        self.client.post(
+            reverse('items', args=[shopping_list.slug]), {'name': 'avocado', 'price': '1.00', 'quantity': 1}
+        )
+
+        response = self.search(search='avocado')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{'name': 'weekly', 'slug': 'weekly'}])
+
+    def test_document_follows_item_changes(self):
+        shopping_list = self.create_list('weekly')
+        self.client.post(
+            reverse('items', args=[shopping_list.slug]), {'name': 'avocado', 'price': '1.00', 'quantity': 1}
+        )
+        self.client.patch(reverse('item_detail', args=['avocado']), {'name': 'pineapple'})
+
+        self.assertEqual(self.search(search='avocado').data, [])
+        self.assertEqual(len(self.search(search='pineapple').data), 1)
+
+        self.client.delete(reverse('item_detail', args=['pineapple']))
+        self.assertEqual(self.search(search='pineapple').data, [])
+
+    def test_finds_lists_and_items_created_in_admin(self):
+        self.login_admin()
+        self.client.post(reverse('admin:lists_shoppinglist_add'), {'name': 'picnic', 'user': self.user.pk})
+        shopping_list = ShoppingList.objects.get(slug='picnic')
+        self.client.post(
+            reverse('admin:lists_item_add'),
+            {'name': 'avocado', 'price': '1.00', 'quantity': 1, 'list': shopping_list.pk},
+        )
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.search(search='picnic').data, [{'name': 'picnic', 'slug': 'picnic'}])
+        self.assertEqual(self.search(search='avocado').data, [{'name': 'picnic', 'slug': 'picnic'}])
+        shopping_list.refresh_from_db()
+        self.assertEqual((shopping_list.item_count, shopping_list.total_cost), (1, Decimal('1.00')))
+
+    def test_matches_misspelled_names(self):
+        self.create_list('groceries')
+
+        response = self.search(search='grocerys')
+
+        self.assertEqual([result['slug'] for result in response.data], ['groceries'])
+
+    def test_ranks_name_matches_first_and_paginates(self):
+        self.create_list('party snacks')
+        item_match = self.create_list('weekend')
+        Item.objects.create(name='snacks', quantity=1, price=1, list=item_match)
+        ShoppingList.objects.filter(pk=item_match.pk).update_search_document()
+
+        response = self.search(search='snacks')
+        self.assertEqual([result['slug'] for result in response.data], ['party-snacks', 'weekend'])
+
+        response = self.search(search='snacks', limit=1, offset=1)
+        self.assertEqual([result['slug'] for result in response.data], ['weekend'])
+
+    def test_only_searches_own_lists(self):
+        other = User.objects.create(email='other@example.com', username='other')
+        self.create_list('groceries', user=other)
+
+        self.assertEqual(self.search(search='groceries').data, [])
+
+    def test_invalid_limit(self):
+        response = self.search(search='groceries', limit=0)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AutocompleteTests(ListTestCase):
+    def complete(self, **params):
+        return self.client.get(reverse('autocomplete'), params)
+
+    def test_suggests_names_from_item_writes(self):
+        shopping_list = self.create_list('weekly')
+        self.client.post(
+            reverse('items', args=[shopping_list.slug]),
+            [
+                {'name': 'Milk', 'price': '1.00', 'quantity': 1},
+                {'name': 'Mint  tea', 'price': '2.00', 'quantity': 1},
+            ],
+            format='json',
+        )
+        self.client.delete(reverse('item_detail', args=['milk']))
+        self.client.post(reverse('items', args=[shopping_list.slug]), {'name': 'milk', 'price': '1.00', 'quantity': 1})
+        self.client.patch(reverse('item_detail', args=['mint-tea']), {'name': 'Mints'})
+
+        self.assertEqual(self.complete(q='MI').data, ['milk', 'Mints', 'Mint tea'])
+        self.assertEqual(self.complete(q='mint ').data, ['Mint tea'])
+        self.assertEqual(self.complete(q='m', limit=1).data, ['milk'])
+        self.assertEqual(ItemName.objects.get(user=self.user, key='milk').use_count, 2)
+
+    def test_ranks_by_frequency_and_recency(self):
+        now = timezone.now()
+        half_life = timedelta(days=settings.AUTOCOMPLETE['HALF_LIFE_DAYS'])
+        ItemName.objects.record(self.user.id, ['Bread'] * 4, used_at=now - 3 * half_life)
+        ItemName.objects.record(self.user.id, ['Butter'], used_at=now)
+        ItemName.objects.record(self.user.id, ['Bananas'] * 4, used_at=now - half_life)
+
+        self.assertEqual(self.complete(q='b').data, ['Bananas', 'Butter', 'Bread'])
+
+        ItemName.objects.record(self.user.id, ['bread'] * 4, used_at=now)
+        invalidate_user_responses(self.user.id)
+        self.assertEqual(self.complete(q='b').data[0], 'bread')
+
+    def test_only_suggests_own_names(self):
+        other = User.objects.create(email='other@example.com', username='other')
+        ItemName.objects.record(other.id, ['Milk'])
+
+        self.assertEqual(self.complete(q='mi').data, [])
+
+    def test_invalid_limit(self):
+        response = self.complete(q='mi', limit=settings.AUTOCOMPLETE['MAX_RESULTS'] + 1)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ChangesTests(ListTestCase):
+    def sync(self, since=0):
+        response = self.client.get(reverse('changes'), {'since': since})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def setUp(self):
+        super().setUp()
+        self.client.post(reverse('list_create'), {'name': 'Groceries'})
+        self.client.post(
+            reverse('items', args=['groceries']),
+            [{'name': 'milk', 'price': '1.00', 'quantity': 1}, {'name': 'bread', 'price': '2.50', 'quantity': 1}],
+            format='json',
+        )
+        self.client.post(reverse('list_create'), {'name': 'Hardware'})
+
+    def test_admin_writes_are_synced(self):
+        seq = self.sync()['seq']
+        milk = Item.objects.get(slug='milk')
+        self.login_admin()
+
+        self.client.post(
+            reverse('admin:lists_item_change', args=[milk.pk]), {'name': 'oat milk', 'price': '1.00', 'quantity': 1}
+        )
+        self.client.post(reverse('admin:lists_item_delete', args=[Item.objects.get(slug='bread').pk]), {'post': 'yes'})
+        hardware = ShoppingList.objects.get(slug='hardware')
+        self.client.post(reverse('admin:lists_shoppinglist_delete', args=[hardware.pk]), {'post': 'yes'})
+
+        self.client.force_authenticate(self.user)
+        changes = self.sync(seq)
+        self.assertEqual([item['slug'] for item in changes['items']], ['oat-milk'])
+        self.assertEqual(changes['lists'][0]['total_items'], 1)
+        self.assertEqual(changes['deleted'], {
+            'lists': ['hardware'],
+            'items': [{'list': 'groceries', 'slug': 'milk'}, {'list': 'groceries', 'slug': 'bread'}],
+        })
+
+    def test_full_then_incremental_sync(self):
+        changes = self.sync()
+        self.assertEqual([shopping_list['slug'] for shopping_list in changes['lists']], ['groceries', 'hardware'])
+        self.assertEqual({(item['list'], item['slug']) for item in changes['items']},
+                         {('groceries', 'milk'), ('groceries', 'bread')})
+        self.assertNotIn('items', changes['lists'][0])
+
+        self.client.put(reverse('item_purchase', args=['milk']), {'is_purchased': True}, format='json')
+        changes = self.sync(changes['seq'])
+
+        self.assertEqual([shopping_list['slug'] for shopping_list in changes['lists']], ['groceries'])
+        self.assertEqual(changes['lists'][0]['purchased_items'], 1)
+        self.assertEqual([(item['slug'], item['is_purchased']) for item in changes['items']], [('milk', True)])
+        self.assertEqual(changes['deleted'], {'lists': [], 'items': []})
+        self.assertEqual(self.sync(changes['seq'])['lists'], [])
+
+    def test_deletes_and_renames_leave_tombstones(self):
+        seq = self.sync()['seq']
+
+        self.client.delete(reverse('item_detail', args=['bread']))
+        self.client.delete(reverse('list_detail', args=['hardware']))
+        self.client.patch(reverse('list_detail', args=['groceries']), {'name': 'Weekly'}, format='json')
+        changes = self.sync(seq)
+
+        self.assertEqual(
+            changes['deleted'], {'lists': ['hardware', 'groceries'], 'items': [{'list': 'groceries', 'slug': 'bread'}]}
+        )
+        self.assertEqual([shopping_list['slug'] for shopping_list in changes['lists']], ['weekly'])
+        self.assertEqual([(item['list'], item['slug']) for item in changes['items']], [('weekly', 'milk')])
+
+    def test_failed_writes_do_not_advance_items(self):
+        seq = self.sync()['seq']
+
+        self.client.patch(reverse('item_detail', args=['milk']), {'quantity': 'x'}, format='json')
+        self.client.delete(reverse('item_detail', args=['missing']))
+
+        changes = self.sync(seq)
+        self.assertEqual((changes['lists'], changes['items']), ([], []))
+
+    def test_imports_are_synced(self):
+        seq = self.sync()['seq']
+        lines = StringIO(
+            json.dumps({'type': 'list', 'slug': 'party', 'name': 'Party'}) + '\n'
+            + json.dumps({'type': 'item', 'list': 'party', 'name': 'Balloon', 'price': '0.10', 'quantity': 1}) + '\n'
+        )
+        ListImporter(self.user.id).run(lines, 'ndjson')
+        invalidate_user_responses(self.user.id)
+
+        changes = self.sync(seq)
+        self.assertEqual([shopping_list['slug'] for shopping_list in changes['lists']], ['party'])
+        self.assertEqual([item['slug'] for item in changes['items']], ['balloon'])
+
+    def test_query_count_does_not_grow_with_account_size(self):
+        seq = self.sync()['seq']
+        for i in range(3):
+            self.create_list(f'list {i}', items=3)
+
+        with self.assertNumQueries(4):
+            self.sync(seq)
+
+    def test_invalid_since(self):
+        response = self.client.get(reverse('changes'), {'since': -1})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BatchTests(ListTestCase):
+    def batch(self, operations, mode='atomic'):
+        return self.client.post(reverse('batch'), {'mode': mode, 'operations': operations}, format='json')
+
+    def setUp(self):
+        super().setUp()
+        self.groceries = self.create_list('Groceries', items=2)
+
+    def test_mixed_operations(self):
+        response = self.batch([
+            {'op': 'create', 'type': 'list', 'data': {'name': 'Party'}},
+            {'op': 'create', 'type': 'item', 'list': 'party', 'data': {'name': 'Cake', 'price': '5.00', 'quantity': 2}},
+            {'op': 'patch', 'type': 'item', 'list': 'groceries', 'slug': 'groceries-item-0',
+             'data': {'is_purchased': True}},
+            {'op': 'delete', 'type': 'item', 'list': 'groceries', 'slug': 'groceries-item-1'},
+            {'op': 'patch', 'type': 'list', 'slug': 'groceries', 'data': {'name': 'Weekly'}},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['committed'])
+        self.assertEqual([result['status'] for result in response.data['results']], [201, 201, 200, 204, 200])
+        self.assertEqual(response.data['results'][4]['data']['slug'], 'weekly')
+        self.assertEqual(response.data['results'][4]['data']['purchased_items'], 1)
+
+        party = ShoppingList.objects.get(slug='party')
+        self.assertEqual((party.item_count, party.total_cost), (1, Decimal('10.00')))
+        weekly = ShoppingList.objects.get(slug='weekly')
+        self.assertEqual((weekly.item_count, weekly.purchased_count), (1, 1))
+        self.assertIn('cake', party.search_document)
+        self.assertEqual(list(ItemName.objects.complete(self.user.id, 'ca', 5)), ['Cake'])
+
+        changes = self.client.get(reverse('changes'), {'since': 0}).data
+        self.assertEqual(changes['deleted'], {
+            'lists': ['groceries'], 'items': [{'list': 'groceries', 'slug': 'groceries-item-1'}],
+        })
+
+    def test_atomic_rolls_back_on_failure(self):
+        response = self.batch([
+            {'op': 'create', 'type': 'list', 'data': {'name': 'Party'}},
+            {'op': 'patch', 'type': 'item', 'list': 'groceries', 'slug': 'groceries-item-0', 'data': {'quantity': 'x'}},
+            {'op': 'delete', 'type': 'list', 'slug': 'groceries'},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(response.data['committed'])
+        self.assertEqual([result['status'] for result in response.data['results']], [424, 400, 424])
+        self.assertIn('quantity', response.data['results'][1]['errors'])
+        self.assertEqual(list(ShoppingList.objects.values_list('slug', flat=True)), ['groceries'])
+
+    def test_best_effort_skips_failures(self):
+        response = self.batch([
+            {'op': 'delete', 'type': 'item', 'list': 'groceries', 'slug': 'missing'},
+            {'op': 'create', 'type': 'item', 'list': 'groceries', 'data': {'name': 'Groceries item 0'}},
+            {'op': 'patch', 'type': 'list', 'slug': 'groceries', 'data': {'name': ''}},
+            {'op': 'create', 'type': 'item', 'list': 'groceries',
+             'data': {'name': 'Milk', 'price': '1.00', 'quantity': 1}},
+        ], mode='best_effort')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['committed'])
+        self.assertEqual([result['status'] for result in response.data['results']], [404, 400, 400, 201])
+        groceries = ShoppingList.objects.get(slug='groceries')
+        self.assertEqual((groceries.name, groceries.item_count), ('Groceries', 3))
+
+    def test_other_users_lists_are_not_found(self):
+        other = User.objects.create(email='other@example.com', username='other')
+        self.create_list('Private', items=1, user=other)
+
+        response = self.batch([
+            {'op': 'delete', 'type': 'list', 'slug': 'private'},
+            {'op': 'patch', 'type': 'item', 'list': 'private', 'slug': 'private-item-0', 'data': {'quantity': 5}},
+        ], mode='best_effort')
+
+        self.assertEqual([result['status'] for result in response.data['results']], [404, 404])
+        self.assertTrue(ShoppingList.objects.filter(slug='private').exists())
+
+    def test_invalid_operations(self):
+        response = self.batch([{'op': 'patch', 'type': 'list', 'data': {}}, {'op': 'create', 'type': 'item'}])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('slug', response.data['operations'][0])
+        self.assertIn('list', response.data['operations'][1])
+        self.assertEqual(self.batch([]).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_lists_are_resolved_once(self):
+        operations = [
+            {'op': 'patch', 'type': 'item', 'list': 'groceries', 'slug': f'groceries-item-{i % 2}',
+             'data': {'quantity': i + 1}}
+            for i in range(10)
+        ]
+        with self.assertNumQueries(7):
+            self.batch(operations[:1])
+        with self.assertNumQueries(7 + 9 * 2):
+            self.batch(operations)
+
+
+class CursorPaginationTests(ListTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(12):
+            self.create_list(f'list {i}', items=1)
+
+    def get_page(self, url=None):
+        if url is None:
+            return self.client.get(reverse('list_create'), {'pagination': 'cursor'})
+        return self.client.get(url)
+
+    def test_walks_all_pages_newest_first(self):
+        names = []
+        url = None
+        while True:
+            response = self.get_page(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['list_count'], 12)
+            names += [result['name'] for result in response.data['results']]
+            url = response.data['links']['next']
+            if url is None:
+                break
+
+        self.assertEqual(names, [f'list {i}' for i in reversed(range(12))])
+
+    def test_previous_link(self):
+        first = self.get_page()
+        second = self.get_page(first.data['links']['next'])
+
+        previous = self.get_page(second.data['links']['previous'])
+
+        self.assertEqual(previous.data['results'], first.data['results'])
+
+    def test_deep_pages_skip_count(self):
+        first = self.get_page()
+        second = self.get_page(first.data['links']['next'])
+
+        with self.assertNumQueries(3):
+            self.get_page(second.data['links']['next'])
+
+    def test_count_cache_follows_list_writes(self):
+        self.get_page()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('list_create'), {'name': 'new list'})
+        self.assertEqual(self.get_page().data['list_count'], 13)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('list_detail', args=['new-list']))
+        self.assertEqual(self.get_page().data['list_count'], 12)
+
+    def test_count_cache_is_cleared_after_commit(self):
+        self.get_page()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(reverse('list_create'), {'name': 'new list'})
+            # A concurrent read before the commit still sees, and caches, the old count.
+            self.assertEqual(cache.get(list_count_cache_key(self.user.id)), 12)
+        for callback in callbacks:
+            callback()
+
+        self.assertIsNone(cache.get(list_count_cache_key(self.user.id)))
+
+    def test_page_number_pagination_is_default(self):
+        response = self.client.get(reverse('list_create'), {'page': 2})
+
+        self.assertEqual(response.data['list_count'], 12)
+        self.assertEqual(len(response.data['results']), 5)
+
+
+class BulkItemTests(ListTestCase):
+    def setUp(self):
+        super().setUp()
+        self.shopping_list = self.create_list('weekly')
+        self.url = reverse('items', args=[self.shopping_list.slug])
+
+    def test_bulk_create(self):
+        payload = [
+            {'name': 'milk', 'price': '1.00', 'quantity': 2},
+            {'name': 'bread', 'price': '2.50', 'quantity': 1, 'is_purchased': True},
+        ]
+
+        with self.assertNumQueries(9):
+            response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['slug'] for item in response.data], ['milk', 'bread'])
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(self.shopping_list.item_count, 2)
+        self.assertEqual(self.shopping_list.purchased_count, 1)
+        self.assertEqual(self.shopping_list.total_cost, Decimal('4.50'))
+
+    def test_bulk_create_reports_errors_per_item(self):
+        Item.objects.create(name='milk', quantity=1, price=1, list=self.shopping_list)
+        payload = [
+            {'name': 'bread', 'price': '2.50', 'quantity': 1},
+            {'name': 'milk', 'price': 'x', 'quantity': 2},
+            {'name': '', 'price': '1.00', 'quantity': 2},
+            {'name': 'eggs', 'quantity': 2},
+        ]
+
+        response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('price', response.data[1])
+        self.assertIn('name', response.data[2])
+        self.assertIn('price', response.data[3])
+        self.assertEqual(Item.objects.count(), 1)
+
+    def test_bulk_create_suffixes_repeated_names(self):
+        Item.objects.create(name='milk', quantity=1, price=1, list=self.shopping_list)
+        payload = [
+            {'name': 'milk', 'price': '1.00', 'quantity': 2},
+            {'name': 'bread', 'price': '2.50', 'quantity': 1},
+            {'name': 'Bread', 'price': '1.00', 'quantity': 2},
+        ]
+
+        response = self.client.post(self.url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['slug'] for item in response.data], ['milk-2', 'bread', 'bread-2'])
+
+    def test_bulk_create_rejects_empty_array(self):
+        response = self.client.post(self.url, [], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_purchase(self):
+        shopping_list = self.create_list('party', items=3, purchased=1)
+        items = list(shopping_list.items.order_by('id'))
+        payload = [
+            {'slug': items[0].slug, 'is_purchased': False},
+            {'slug': items[1].slug, 'is_purchased': True},
+            {'slug': items[2].slug, 'is_purchased': True},
+        ]
+
+        with self.assertNumQueries(7):
+            response = self.client.patch(reverse('items', args=[shopping_list.slug]), payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['is_purchased'] for item in response.data], [False, True, True])
+        self.assertEqual(
+            list(shopping_list.items.order_by('id').values_list('is_purchased', flat=True)), [False, True, True]
+        )
+        shopping_list.refresh_from_db()
+        self.assertEqual(shopping_list.purchased_count, 2)
+        self.assertEqual(shopping_list.purchased_cost, Decimal('6.00'))
+
+    def test_bulk_purchase_is_all_or_nothing(self):
+        shopping_list = self.create_list('party', items=2)
+        other_list = self.create_list('other', items=1)
+        payload = [
+            {'slug': shopping_list.items.first().slug, 'is_purchased': True},
+            {'slug': other_list.items.first().slug, 'is_purchased': True},
+            {'slug': 'missing', 'is_purchased': True},
+        ]
+
+        response = self.client.patch(reverse('items', args=[shopping_list.slug]), payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('slug', response.data[1])
+        self.assertIn('slug', response.data[2])
+        self.assertFalse(Item.objects.filter(is_purchased=True).exists())
+
+
+class PurchaseStateTests(ListTestCase):
+    def setUp(self):
+        super().setUp()
+        self.shopping_list = self.create_list('weekly', items=2)
+        self.item = self.shopping_list.items.order_by('id').first()
+        self.url = reverse('item_purchase', args=[self.item.slug])
+
+    def test_marks_item_purchased_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.put(self.url, {'is_purchased': True})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['item']['slug'], self.item.slug)
+        self.assertTrue(response.data['item']['is_purchased'])
+        self.assertEqual(response.data['item']['total_price'], Decimal('3.00'))
+        self.assertEqual(response.data['list']['purchased_items'], 1)
+        self.assertEqual(response.data['list']['pending_items'], 1)
+        self.assertEqual(response.data['list']['total_price_purchased'], Decimal('3.00'))
+        self.assertEqual(response.data['list']['total_price_pending'], Decimal('3.00'))
+
+        self.item.refresh_from_db()
+        self.assertTrue(self.item.is_purchased)
+
+    def test_repeating_the_same_state_is_a_no_op(self):
+        self.client.put(self.url, {'is_purchased': True})
+        response = self.client.put(self.url, {'is_purchased': True})
+
+        self.assertEqual(response.data['list']['purchased_items'], 1)
+
+        response = self.client.put(self.url, {'is_purchased': False})
+
+        self.assertEqual(response.data['list']['purchased_items'], 0)
+        self.assertEqual(response.data['list']['total_price_purchased'], Decimal('0.00'))
+
+    def test_other_users_items_are_not_found(self):
+        other = User.objects.create(email='other@example.com', username='other')
+        item = self.create_list('theirs', items=1, user=other).items.first()
+
+        response = self.client.put(reverse('item_purchase', args=[item.slug]), {'is_purchased': True})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        item.refresh_from_db()
+        self.assertFalse(item.is_purchased)
+
+    def test_requires_state(self):
+        response = self.client.put(self.url, {}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_nested_route_marks_item_purchased_in_one_query(self):
+        other_list = self.create_list('monthly')
+        Item.objects.create(name=self.item.name, quantity=1, price=1, list=other_list)
+        url = reverse('list_item_purchase', args=[self.shopping_list.slug, self.item.slug])
+
+        with self.assertNumQueries(1):
+            response = self.client.put(url, {'is_purchased': True})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['list']['purchased_items'], 1)
+        self.assertEqual(Item.objects.filter(is_purchased=True).get().pk, self.item.pk)
+
+    def test_ambiguous_slug_conflicts(self):
+        other_list = self.create_list('monthly')
+        Item.objects.create(name=self.item.name, quantity=1, price=1, list=other_list)
+
+        response = self.client.put(self.url, {'is_purchased': True})
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Item.objects.filter(is_purchased=True).exists())
+
+
+class SlugScopeTests(ListTestCase):
+    def test_list_slugs_are_unique_per_user(self):
+        other = User.objects.create(email='other@example.com', username='other')
+        self.create_list('Groceries', user=other)
+
+        response = self.client.post(reverse('list_create'), {'name': 'Groceries'})
+        self.assertEqual(response.data['slug'], 'groceries')
+
+        response = self.client.post(reverse('list_create'), {'name': 'groceries'})
+        self.assertEqual(response.data['slug'], 'groceries-2')
+
+    def test_item_slugs_are_unique_per_list(self):
+        weekly = self.create_list('weekly', items=1)
+        monthly = self.create_list('monthly')
+        url = reverse('items', args=[monthly.slug])
+
+        response = self.client.post(url, {'name': 'weekly item 0', 'price': '1.00', 'quantity': 1})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['slug'], 'weekly-item-0')
+
+        response = self.client.post(url, {'name': 'Weekly item 0', 'price': '1.00', 'quantity': 1})
+        self.assertEqual(response.data['slug'], 'weekly-item-0-2')
+        self.assertEqual(weekly.items.get().slug, 'weekly-item-0')
+
+    def test_suffixes_skip_taken_slugs(self):
+        self.create_list('weekly')
+        self.create_list('weekly')
+        self.create_list('weekly plan')
+        ShoppingList.objects.filter(slug='weekly').delete()
+
+        self.assertEqual(self.create_list('weekly').slug, 'weekly')
+        self.assertEqual(self.create_list('weekly').slug, 'weekly-3')
+
+    def test_nested_routes_address_items_of_one_list(self):
+        weekly = self.create_list('weekly', items=1)
+        monthly = self.create_list('monthly')
+        Item.objects.create(name='weekly item 0', quantity=1, price=1, list=monthly)
+
+        response = self.client.patch(
+            reverse('list_item_detail', args=['monthly', 'weekly-item-0']), {'quantity': 5}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(monthly.items.get().quantity, 5)
+        self.assertEqual(weekly.items.get().quantity, 2)
+
+        response = self.client.delete(reverse('list_item_detail', args=['weekly', 'weekly-item-0']))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(weekly.items.exists())
+        self.assertTrue(monthly.items.exists())
+
+    def test_legacy_route_conflicts_when_ambiguous(self):
+        self.create_list('weekly', items=1)
+        monthly = self.create_list('monthly')
+        Item.objects.create(name='weekly item 0', quantity=1, price=1, list=monthly)
+
+        response = self.client.patch(reverse('item_detail', args=['weekly-item-0']), {'quantity': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        response = self.client.delete(reverse('item_detail', args=['weekly-item-0']))
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Item.objects.count(), 2)
+
+        monthly.items.all().delete()
+        response = self.client.patch(reverse('item_detail', args=['weekly-item-0']), {'quantity': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ConcurrentSlugTests(APITransactionTestCase):
+    def test_concurrent_saves_allocate_distinct_slugs(self):
+        user = User.objects.create(email='user@example.com', username='user')
+        saved, release = threading.Event(), threading.Event()
+
+        def save_and_wait():
+            try:
+                with transaction.atomic():
+                    ShoppingList.objects.create(name='Groceries', user=user)
+                    saved.set()
+                    release.wait(5)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=save_and_wait)
+        thread.start()
+        saved.wait(5)
+        threading.Timer(0.2, release.set).start()
+        # Waits for the other transaction on the change counter lock instead of racing it for the same slug.
+        shopping_list = ShoppingList.objects.create(name='Groceries', user=user)
+        thread.join()
+
+        self.assertEqual(shopping_list.slug, 'groceries-2')
+
+
+class ConditionalGetTests(ListTestCase):
+    def setUp(self):
+        super().setUp()
+        self.shopping_list = self.create_list('weekly', items=2)
+        self.detail_url = reverse('list_detail', args=[self.shopping_list.slug])
+        self.index_url = reverse('list_create')
+
+    def assertNotModified(self, url, etag):
+        caches['responses'].clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def assertModified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        return response['ETag']
+
+    def test_detail_not_modified(self):
+        etag = self.client.get(self.detail_url)['ETag']
+
+        self.assertNotModified(self.detail_url, etag)
+
+    def test_detail_changes_with_items(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        item = self.shopping_list.items.first()
+
+        self.client.put(reverse('item_purchase', args=[item.slug]), {'is_purchased': True})
+        etag = self.assertModified(self.detail_url, etag)
+
+        self.client.post(reverse('items', args=[self.shopping_list.slug]), {'name': 'milk', 'price': 1, 'quantity': 1})
+        etag = self.assertModified(self.detail_url, etag)
+
+        self.client.delete(reverse('item_detail', args=['milk']))
+        etag = self.assertModified(self.detail_url, etag)
+
+        self.client.patch(self.detail_url, {'description': 'changed'})
+        self.assertModified(self.detail_url, etag)
+
+    def test_admin_item_edit_changes_etags(self):
+        detail_etag = self.client.get(self.detail_url)['ETag']
+        index_etag = self.client.get(self.index_url)['ETag']
+        item = self.shopping_list.items.order_by('id').first()
+
+        self.login_admin()
+        response = self.client.post(
+            reverse('admin:lists_item_change', args=[item.pk]),
+            {'name': item.name, 'price': '1.50', 'quantity': 4, 'is_purchased': 'on'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['total_price'], response.data['purchased_items']), (Decimal('9.00'), 1))
+        self.assertModified(self.index_url, index_etag)
+
+    def test_index_not_modified(self):
+        etag = self.client.get(self.index_url)['ETag']
+
+        self.assertNotModified(self.index_url, etag)
+
+    def test_index_changes_with_lists_and_items(self):
+        etag = self.client.get(self.index_url)['ETag']
+
+        self.client.post(reverse('list_create'), {'name': 'party'})
+        etag = self.assertModified(self.index_url, etag)
+
+        self.client.patch(reverse('item_detail', args=[self.shopping_list.items.first().slug]), {'quantity': 9})
+        etag = self.assertModified(self.index_url, etag)
+
+        self.client.delete(reverse('list_detail', args=['party']))
+        self.assertModified(self.index_url, etag)
+
+    def test_missing_list_is_not_found(self):
+        response = self.client.get(reverse('list_detail', args=['missing']), HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ResponseCacheTests(ListTestCase):
+    def setUp(self):
+        super().setUp()
+        self.shopping_list = self.create_list('weekly', items=2)
+        self.detail_url = reverse('list_detail', args=[self.shopping_list.slug])
+
+    def test_repeat_reads_skip_the_database(self):
+        for url, params in (
+            (self.detail_url, {}),
+            (reverse('list_create'), {'page_size': 2}),
+            (reverse('search'), {'search': 'weekly'}),
+        ):
+            first = self.client.get(url, params)
+            with self.assertNumQueries(0):
+                second = self.client.get(url, params)
+            self.assertEqual(second.status_code, status.HTTP_200_OK)
+            self.assertEqual(second.json(), first.json())
+
+    def test_cached_etag_answers_not_modified(self):
+        etag = self.client.get(self.detail_url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_query_params_are_part_of_the_key(self):
+        self.create_list('monthly')
+
+        self.assertEqual(len(self.client.get(reverse('list_create'), {'page_size': 1}).data['results']), 1)
+        self.assertEqual(len(self.client.get(reverse('list_create'), {'page_size': 2}).data['results']), 2)
+
+    def test_item_writes_invalidate(self):
+        self.client.get(self.detail_url)
+        item = self.shopping_list.items.first()
+
+        self.client.put(reverse('item_purchase', args=[item.slug]), {'is_purchased': True})
+
+        self.assertEqual(self.client.get(self.detail_url).data['purchased_items'], 1)
+
+    def test_list_writes_invalidate(self):
+        self.client.get(self.detail_url)
+
+        self.client.patch(self.detail_url, {'description': 'changed'})
+
+        self.assertEqual(self.client.get(self.detail_url).data['description'], 'changed')
+
+    def test_users_are_isolated(self):
+        other = User.objects.create(email='other@example.com', username='other')
+        self.client.get(reverse('list_create'))
+
+        self.client.force_authenticate(other)
+        response = self.client.get(reverse('list_create'))
+
+        self.assertEqual(response.data['results'], [])
+
+    def test_admin_writes_invalidate(self):
+        admin = User.objects.create(email='admin@example.com', username='admin', is_staff=True, is_superuser=True)
+        self.client.get(self.detail_url)
+
+        self.client.force_login(admin)
+        self.client.post(
+            reverse('admin:lists_shoppinglist_change', args=[self.shopping_list.pk]),
+            {'name': 'weekly', 'description': 'from admin', 'user': self.user.pk},
+        )
+
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(self.detail_url).data['description'], 'from admin')
+
+    def test_stats(self):
+        self.client.get(self.detail_url)
+        self.client.get(self.detail_url)
+        staff = User.objects.create(email='staff@example.com', username='staff', is_staff=True)
+
+        self.client.force_authenticate(staff)
+        response = self.client.get(reverse('cache_stats'))
+
+        self.assertEqual(response.data, response_cache_stats.snapshot())
+        self.assertGreaterEqual(response.data['hits'], 1)
+        self.assertGreaterEqual(response.data['misses'], 1)
+
+    def test_stats_are_staff_only(self):
+        response = self.client.get(reverse('cache_stats'))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ReplicaRoutingTests(APITransactionTestCase):
+    """
+    Routes between two aliases of the local test database: 'default' as the primary and 'replica'. Data is
+    committed so that both connections see it.
+    """
+
+    replica = 'replica'
+
+    @classmethod
+    def setUpClass(cls):
+        # A second connection to the test database, standing in for a read replica. It is registered for this class
+        # only, as a mirror of 'default' so that it is not flushed separately.
+        connections.settings[cls.replica] = {
+            **connections['default'].settings_dict,
+            'TEST': {**connections['default'].settings_dict['TEST'], 'MIRROR': 'default'},
+        }
+        cls.databases = {'default', cls.replica}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        # The test runner only closes the pool of 'default' before dropping the test database.
+        connections[cls.replica].close()
+        connections[cls.replica].close_pool()
+        del connections[cls.replica]
+        del connections.settings[cls.replica]
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        user_cache.clear()
+        self.enterContext(override_settings(DATABASE_REPLICAS={'ALIASES': [self.replica], 'STICKY_SECONDS': 5}))
+        self.user = User.objects.create(email='user@example.com', username='user')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        ShoppingList.objects.create(name='Groceries', user=self.user)
+
+    def queries_by_alias(self, method, path, data=None):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[self.replica]) as replica:
+            response = getattr(self.client, method)(path, data, format='json')
+        return response, len(primary), len(replica)
+
+    def test_reads_go_to_the_replica(self):
+        response, primary, replica = self.queries_by_alias('get', reverse('list_detail', args=['groceries']))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        response, _, replica = self.queries_by_alias(
+            'post', reverse('items', args=['groceries']), {'name': 'Milk', 'price': '1.00', 'quantity': 1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replica, 0)
+
+        response, primary, replica = self.queries_by_alias('get', reverse('items', args=['groceries']))
+        self.assertEqual([item['slug'] for item in response.data['results']], ['milk'])
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        other = User.objects.create(email='other@example.com', username='other')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(other)}')
+        _, primary, replica = self.queries_by_alias('get', reverse('list_create'))
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_failed_writes_do_not_pin(self):
+        response, _, _ = self.queries_by_alias('post', reverse('items', args=['groceries']), {'name': ''})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        _, primary, replica = self.queries_by_alias('get', reverse('list_detail', args=['groceries']))
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_reads_outside_requests_use_the_primary(self):
+        with CaptureQueriesContext(connections[self.replica]) as replica:
+            ShoppingList.objects.get(slug='groceries')
+
+        self.assertEqual(len(replica), 0)
+        self.assertFalse(router.allow_migrate(self.replica, 'lists'))
+
+
+@skipUnless(settings.DATABASES['default']['OPTIONS'].get('pool'), 'database pool disabled')
+class DatabasePoolStatsTests(ListTestCase):
+    def test_stats(self):
+        self.client.force_authenticate(User.objects.create(email='staff@example.com', username='staff', is_staff=True))
+
+        response = self.client.get(reverse('db_pool_stats'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = response.data['default']
+        self.assertEqual(stats['max_size'], settings.DATABASE_POOL['MAX_SIZE'])
+        self.assertGreaterEqual(stats['requests'], 1)
+        self.assertGreaterEqual(stats['in_use'], 1)
+        self.assertEqual(stats['utilization'], round(stats['in_use'] / stats['max_size'], 3))
+
+    def test_stats_are_staff_only(self):
+        response = self.client.get(reverse('db_pool_stats'))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BenchmarkCommandTests(ListTestCase):
+    def test_seed_and_benchmark(self):
+        call_command('seed_benchmark_data', '--users', '2', '--lists', '3', '--items', '5', stdout=StringIO())
+
+        shopping_lists = ShoppingList.objects.filter(user__email='bench0@example.com')
+        self.assertEqual(shopping_lists.count(), 3)
+        for shopping_list in shopping_lists:
+            self.assertEqual(shopping_list.item_count, shopping_list.items.count())
+            self.assertIsNotNone(shopping_list.search_document)
+        self.assertTrue(ItemName.objects.filter(user__email='bench0@example.com').exists())
+
+        out = StringIO()
+        command = benchmark.Command()
+        call_command(command, '--iterations', '2', stdout=out)
+        report = json.loads(out.getvalue())
+
+        self.assertIn('GET lists/', report['endpoints'])
+        self.assertIn('POST verify/', report['endpoints'])
+        self.assertEqual(report['endpoints']['GET autocomplete/']['queries'], 1)
+        self.assertEqual(report['endpoints']['GET list/<slug>/']['queries'], 3)
+        self.assertEqual(ShoppingList.objects.filter(user__email='bench0@example.com').count(), 3)
+
+        url_names = {
+            pattern.name for module in (lists_urls, accounts_urls) for pattern in module.urlpatterns
+        } - benchmark.UNBENCHMARKED_URLS
+        self.assertEqual(url_names - command.benchmarked_urls, set())
+
+
+class RequestTimingTests(ListTestCase):
+    @override_settings(REQUEST_TIMING={'HEADER': True})
+    def test_server_timing_header(self):
+        self.create_list('Groceries', items=3)
+
+        with self.assertLogs('utils.request_timing', 'INFO') as logs:
+            response = self.client.get(reverse('list_create'))
+
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'view;dur=', 'serialize;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+        self.assertIn('desc="4 queries"', timing)
+        record = json.loads(logs.records[0].getMessage().split(' ', 1)[1])
+        self.assertEqual(record['queries'], 4)
+        self.assertEqual(record['status'], 200)
+
+    @override_settings(REQUEST_TIMING={'SLOW_REQUEST_MS': 0, 'SLOW_QUERIES': 2})
+    def test_slow_request_logs_queries_and_view(self):
+        shopping_list = self.create_list('Groceries', items=3)
+
+        with self.assertLogs('utils.request_timing', 'WARNING') as logs:
+            self.client.get(reverse('list_detail', args=[shopping_list.slug]))
+
+        record = json.loads(logs.records[0].getMessage().split(' ', 2)[2])
+        self.assertEqual(record['view'], 'lists.views.ListViewSet.retrieve')
+        self.assertEqual(len(record['slowest_queries']), 2)
+        self.assertIn('SELECT', record['slowest_queries'][0]['sql'])
+
+    @override_settings(REQUEST_TIMING={'HEADER': True})
+    async def test_server_timing_under_asgi(self):
+        with self.assertLogs('utils.request_timing', 'INFO'):
+            response = await self.async_client.get(reverse('list_create'))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries", view;dur=[\d.]+')
+
+    @override_settings(REQUEST_TIMING={})
+    def test_header_is_opt_in(self):
+        with self.assertLogs('utils.request_timing', 'INFO'):
+            response = self.client.get(reverse('list_create'))
+
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(REQUEST_TIMING={'ENABLED': False})
+    def test_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('list_create')))
+
+
+class ValuesSerializerTests(ListTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_list('Groceries', items=4, purchased=2)
+        self.create_list('Empty')
+        described = self.create_list('Fête de la musique', items=1)
+        described.description = 'Crème brûlée & "quotes"'
+        described.save()
+        Item.objects.create(name='Odd price', quantity=7, price=Decimal('0.05'), is_purchased=True, list=described)
+        Item.objects.create(name='Round price', quantity=3, price=Decimal('10'), list=described)
+        ShoppingList.objects.all().update(total_cost=Decimal('123.40'), purchased_cost=Decimal('0.35'))
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_payloads_match_list_serializer(self):
+        queryset = ShoppingList.objects.filter(user=self.user)
+        expected = serializers.ListSerializer(queryset.prefetch_related('items'), many=True).data
+
+        rows = list(serializers.list_values.values(queryset, 'id'))
+        self.assertEqual(self.render(serializers.list_payloads(rows)), self.render(expected))
+
+    def test_endpoints_match_list_serializer(self):
+        for shopping_list in ShoppingList.objects.filter(user=self.user):
+            response = self.client.get(reverse('list_detail', args=[shopping_list.slug]))
+            self.assertEqual(response.content, self.render(serializers.ListSerializer(shopping_list).data))
+
+        response = self.client.get(reverse('list_create'), {'page_size': 10})
+        expected = serializers.ListSerializer(ShoppingList.objects.filter(user=self.user), many=True).data
+        self.assertEqual(response.content, self.render({
+            'links': {'next': None, 'previous': None}, 'list_count': 3, 'results': expected
+        }))
+
+
+class SparseFieldsetTests(ListTestCase):
+    def test_fields_limit_list_payload_and_queries(self):
+        self.create_list('Groceries', items=3)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('list_create'), {'fields': 'name,total_items'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [{'name': 'Groceries', 'total_items': 3}])
+
+    def test_include_items(self):
+        shopping_list = self.create_list('Groceries', items=2)
+
+        response = self.client.get(
+            reverse('list_detail', args=[shopping_list.slug]), {'fields': 'slug', 'include': 'items'}
+        )
+
+        self.assertEqual(list(response.data), ['slug', 'items'])
+        self.assertEqual(len(response.data['items']), 2)
+
+    def test_default_includes_everything(self):
+        shopping_list = self.create_list('Groceries', items=1)
+
+        response = self.client.get(reverse('list_detail', args=[shopping_list.slug]))
+
+        self.assertEqual(tuple(response.data), serializers.list_values.field_names)
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('list_create'), {'fields': 'name,user'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', response.data)
+
+
+class ItemPaginationTests(ListTestCase):
+    def test_items_are_paginated(self):
+        shopping_list = self.create_list('Groceries', items=25)
+
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('items', args=[shopping_list.slug]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['item_count'], 25)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIsNotNone(response.data['links']['next'])
+
+        response = self.client.get(response.data['links']['next'])
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_filter_by_purchase_state(self):
+        shopping_list = self.create_list('Groceries', items=5, purchased=2)
+
+        purchased = self.client.get(reverse('items', args=[shopping_list.slug]), {'is_purchased': 'true'})
+        pending = self.client.get(reverse('items', args=[shopping_list.slug]), {'is_purchased': 'false'})
+
+        self.assertEqual(purchased.data['item_count'], 2)
+        self.assertTrue(all(item['is_purchased'] for item in purchased.data['results']))
+        self.assertEqual(pending.data['item_count'], 3)
+
+    def test_other_users_list_is_not_found(self):
+        other = User.objects.create(email='other@example.com', username='other')
+        shopping_list = self.create_list('Theirs', items=1, user=other)
+
+        response = self.client.get(reverse('items', args=[shopping_list.slug]))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ExportTests(ListTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_list('Groceries', items=3, purchased=1)
+        self.create_list('Empty')
+        other = User.objects.create(email='other@example.com', username='other')
+        self.create_list('Theirs', items=2, user=other)
+
+    def export(self, **params):
+        response = self.client.get(reverse('export'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response, content = self.export()
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([r['type'] for r in records], ['list', 'list', 'item', 'item', 'item'])
+        self.assertEqual([r['name'] for r in records[:2]], ['Groceries', 'Empty'])
+        self.assertEqual(records[0]['total_items'], 3)
+        self.assertNotIn('items', records[0])
+        self.assertEqual(records[2]['list'], 'groceries')
+        self.assertEqual(records[2]['price'], '1.50')
+
+    def test_csv(self):
+        response, content = self.export(format='csv')
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment', response['Content-Disposition'])
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[0]['list_slug'], 'groceries')
+        self.assertEqual(rows[0]['total_price'], '3.00')
+        self.assertEqual(rows[3]['list_slug'], 'empty')
+        self.assertEqual(rows[3]['item_slug'], '')
+
+    def test_streams_in_chunks(self):
+        chunks = list(export_ndjson(self.user.id, chunk_size=2))
+
+        self.assertEqual([chunk.count('\n') for chunk in chunks], [2, 2, 1])
+
+    async def test_streams_under_asgi(self):
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        with mock.patch.dict(EXPORTERS, ndjson=functools.partial(export_ndjson, chunk_size=2)):
+            response = await self.async_client.get(reverse('export'), headers=headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+
+        self.assertEqual([chunk.count(b'\n') for chunk in chunks], [2, 2, 1])
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+
+        response = self.client.get(reverse('export'), {'format': 'csv'})
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertTrue(response.content.startswith(b'detail'))
+
+
+class ImportTests(ListTestCase):
+    def upload(self, name, content, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                reverse('import'), {'file': SimpleUploadedFile(name, content), **data}, format='multipart'
+            )
+
+    def test_round_trip_through_export(self):
+        self.create_list('Groceries', items=3, purchased=1)
+        self.create_list('Empty')
+        exported = b''.join(self.client.get(reverse('export')).streaming_content).decode()
+        other = User.objects.create(email='other@example.com', username='other')
+        self.client.force_authenticate(other)
+
+        response = self.upload('lists.ndjson', exported.encode())
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['lists_created'], 2)
+        self.assertEqual(response.data['items_created'], 3)
+        imported = ShoppingList.objects.get(user=other, name='Groceries')
+        self.assertEqual(imported.slug, 'groceries')
+        self.assertEqual((imported.item_count, imported.purchased_count), (3, 1))
+        self.assertEqual(imported.total_cost, Decimal('9.00'))
+        self.assertIsNotNone(imported.search_document)
+        self.assertEqual(
+            sorted(imported.items.values_list('slug', flat=True)),
+            ['groceries-item-0', 'groceries-item-1', 'groceries-item-2'],
+        )
+
+    def test_csv_rows_are_validated(self):
+        content = (
+            'list_name,list_description,item_name,price,quantity,is_purchased\n'
+            'Party,,Chips,2.50,3,false\n'
+            'Party,,Chips,1.999,1,false\n'
+            'Party,,Soda,abc,x,maybe\n'
+            'Party,,Soda,1.00,2,yes\n'
+            ',,Cake,1.00,1,false\n'
+        )
+
+        response = self.upload('party.csv', content.encode())
+
+        self.assertEqual(response.data['rows'], 5)
+        self.assertEqual(response.data['items_created'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3, 5, 5])
+        self.assertEqual(set(response.data['errors'][1]['errors']), {'price', 'quantity', 'is_purchased'})
+        shopping_list = ShoppingList.objects.get(user=self.user, name='Party')
+        self.assertEqual(sorted(shopping_list.items.values_list('slug', flat=True)), ['chips', 'soda'])
+        self.assertEqual(shopping_list.purchased_count, 1)
+
+    def test_imports_in_chunks_and_merges_into_existing_lists(self):
+        existing = self.create_list('Party', items=1)
+        content = ''.join(
+            json.dumps({'type': 'item', 'list': 'party', 'name': 'Balloon', 'price': '0.10', 'quantity': 1}) + '\n'
+            for _ in range(5)
+        )
+        lines = StringIO(json.dumps({'type': 'list', 'slug': 'party', 'name': 'Party'}) + '\n' + content)
+
+        progress = []
+        report = ListImporter(self.user.id, chunk_size=2, on_progress=lambda r: progress.append(r.rows)).run(
+            lines, 'ndjson'
+        )
+
+        self.assertEqual(progress, [2, 4, 6])
+        self.assertEqual(report.lists_created, 0)
+        existing.refresh_from_db()
+        self.assertEqual(existing.item_count, 6)
+        self.assertEqual(
+            sorted(existing.items.filter(name='Balloon').values_list('slug', flat=True)),
+            ['balloon', 'balloon-2', 'balloon-3', 'balloon-4', 'balloon-5'],
+        )
+        response = self.client.patch(reverse('item_detail', args=['balloon-2']), {'quantity': 2}, format='json')
+        self.assertEqual(response.data['slug'], 'balloon-2')
+
+    def test_format_must_be_known(self):
+        response = self.upload('lists.txt', b'hello')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_malformed_ndjson_rows_are_reported(self):
+        records = [
+            {'type': 'list', 'name': 'Party', 'description': ['snacks']},
+            {'type': 'list', 'name': {'en': 'Party'}},
+            {'type': 'item', 'list': ['party'], 'name': 'Chips', 'price': '1.00', 'quantity': 1},
+            {'type': 'list', 'name': 'Snacks'},
+            {'type': 'item', 'list': 'Snacks', 'name': 'Chips\x00', 'price': '1.00', 'quantity': 1},
+            {'type': 'item', 'list': 'Snacks', 'name': ['Chips'], 'price': [1], 'quantity': True},
+            {'type': 'item', 'list': 'Snacks', 'name': 'Nuts', 'price': 2.5, 'quantity': 2},
+        ]
+        content = ''.join(json.dumps(record) + '\n' for record in records)
+
+        response = self.upload('lists.ndjson', content.encode())
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['lists_created'], response.data['items_created']), (1, 1))
+        self.assertEqual(
+            [(error['row'], set(error['errors'])) for error in response.data['errors']],
+            [(1, {'description'}), (2, {'name'}), (3, {'list'}), (5, {'name'}), (6, {'name', 'price', 'quantity'})],
+        )
+        self.assertEqual(ShoppingList.objects.get(user=self.user).total_cost, Decimal('5.00'))
+
+    def test_upload_must_be_utf8(self):
+        content = json.dumps({'type': 'list', 'name': 'Café'}, ensure_ascii=False).encode('latin-1')
+
+        response = self.upload('lists.ndjson', content)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('file', response.data)
+        self.assertFalse(ShoppingList.objects.exists())
+
+
+class AsyncViewTests(ListTestCase):
+    def setUp(self):
+        super().setUp()
+        self.shopping_list = self.create_list('Groceries', items=3, purchased=1)
+        self.create_list('Hardware', items=2)
+        self.factory = AsyncRequestFactory()
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    def call(self, view, method, path, data=None, headers=None, **kwargs):
+        request = getattr(self.factory, method)(
+            path, data, content_type='application/json', headers={**self.headers, **(headers or {})}
+        )
+        response = async_to_sync(view.as_view())(request, **kwargs)
+        return response.render() if hasattr(response, 'render') else response
+
+    def assertSamePayload(self, view, path, **kwargs):
+        caches['responses'].clear()
+        response = self.call(view, 'get', path, **kwargs)
+        caches['responses'].clear()
+        expected = self.client.get(path)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response.get('ETag'), expected.get('ETag'))
+
+    def test_reads_match_sync_views(self):
+        slug = self.shopping_list.slug
+        self.assertSamePayload(async_views.ListIndexView, reverse('list_create'))
+        self.assertSamePayload(async_views.ListIndexView, reverse('list_create') + '?fields=name,total_items')
+        self.assertSamePayload(async_views.ListIndexView, reverse('list_create') + '?pagination=cursor&page_size=1')
+        self.assertSamePayload(async_views.ListDetailView, reverse('list_detail', args=[slug]), slug=slug)
+        self.assertSamePayload(
+            async_views.ListItemsView, reverse('items', args=[slug]) + '?is_purchased=false&page_size=1', slug=slug
+        )
+        self.assertSamePayload(async_views.SearchView, reverse('search') + '?search=groceries')
+        ItemName.objects.record(self.user.id, ['Granola', 'Grapes'])
+        self.assertSamePayload(async_views.AutocompleteView, reverse('autocomplete') + '?q=gr')
+
+    def test_reads_combine_etag_and_count_queries(self):
+        user_cache.set(self.user.pk, self.user)
+        with self.assertNumQueries(2):
+            self.call(async_views.ListIndexView, 'get', reverse('list_create') + '?fields=name')
+        with self.assertNumQueries(2):
+            response = self.call(
+                async_views.ListItemsView, 'get', reverse('items', args=[self.shopping_list.slug]),
+                slug=self.shopping_list.slug,
+            )
+        self.assertEqual(response.data['item_count'], 3)
+
+    def test_conditional_and_error_responses(self):
+        slug = self.shopping_list.slug
+        etag = self.call(async_views.ListDetailView, 'get', reverse('list_detail', args=[slug]), slug=slug)['ETag']
+        caches['responses'].clear()
+
+        response = self.call(
+            async_views.ListDetailView, 'get', reverse('list_detail', args=[slug]), headers={'If-None-Match': etag},
+            slug=slug,
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.call(async_views.ListDetailView, 'get', reverse('list_detail', args=['missing']), slug='missing')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        response = self.call(async_views.ListIndexView, 'get', reverse('list_create'), headers={'Authorization': ''})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_writes_run_on_sync_views(self):
+        response = self.call(async_views.ListIndexView, 'post', reverse('list_create'), {'name': 'Party'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        slug = self.shopping_list.slug
+        response = self.call(
+            async_views.ListItemsView, 'post', reverse('items', args=[slug]),
+            {'name': 'milk', 'price': '1.00', 'quantity': 2}, slug=slug,
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(self.shopping_list.item_count, 4)
+        self.assertTrue(ShoppingList.objects.filter(user=self.user, name='Party').exists())
+
+
+class ListEventsTests(ListTestCase):
+    def setUp(self):
+        super().setUp()
+        self.shopping_list = self.create_list('Groceries')
+
+    async def open_stream(self):
+        stream = async_views.event_stream(self.user.id)
+        self.assertEqual(await anext(stream), 'retry: 3000\n\n')
+        return stream
+
+    async def next_event(self, stream):
+        event, data = (await asyncio.wait_for(anext(stream), 1)).strip().split('\n')
+        return event.removeprefix('event: '), json.loads(data.removeprefix('data: '))
+
+    # Runs on the thread that owns the test connection, so the on_commit callbacks are captured.
+    @sync_to_async
+    def write(self, method, path, data=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(path, data, format='json')
+        return response.status_code
+
+    async def test_streams_committed_writes(self):
+        stream = await self.open_stream()
+        items = reverse('items', args=['groceries'])
+
+        self.assertEqual(await self.write('post', items, {'name': 'milk', 'price': '1.00', 'quantity': 1}), 201)
+        self.assertEqual(await self.write('put', reverse('item_purchase', args=['milk']), {'is_purchased': True}), 200)
+        self.assertEqual(await self.write('delete', reverse('item_detail', args=['milk'])), 204)
+        response = await self.write('patch', reverse('list_detail', args=['groceries']), {'description': 'x'})
+        self.assertEqual(response, 200)
+
+        event, data = await self.next_event(stream)
+        self.assertEqual((event, data['list'], data['items'][0]['name']), ('item.created', 'groceries', 'milk'))
+        event, data = await self.next_event(stream)
+        self.assertEqual((event, data['items'][0]['is_purchased']), ('item.updated', True))
+        self.assertEqual(
+            await self.next_event(stream), ('item.deleted', {'list': 'groceries', 'items': [{'slug': 'milk'}]})
+        )
+        event, data = await self.next_event(stream)
+        self.assertEqual((event, data['data']['description']), ('list.updated', 'x'))
+
+        await stream.aclose()
+        self.assertEqual(get_event_broker().subscriber_count(self.user.id), 0)
+
+    async def test_failed_writes_are_not_streamed(self):
+        stream = await self.open_stream()
+
+        self.assertEqual(await self.write('post', reverse('items', args=['groceries']), {'name': 'milk'}), 400)
+        self.assertEqual(await self.write('post', reverse('list_create'), {'name': 'Party'}), 201)
+
+        self.assertEqual((await self.next_event(stream))[0], 'list.created')
+        await stream.aclose()
+
+    @override_settings(LIST_EVENTS={**settings.LIST_EVENTS, 'HEARTBEAT': 0.05})
+    async def test_other_users_changes_are_not_streamed(self):
+        stream = await self.open_stream()
+
+        get_event_broker().publish(self.user.id + 1, 'list.deleted', '{}')
+
+        self.assertEqual(await asyncio.wait_for(anext(stream), 1), ': keepalive\n\n')
+        await stream.aclose()
+
+    @override_settings(LIST_EVENTS={**settings.LIST_EVENTS, 'OPTIONS': {'max_queued': 2}})
+    async def test_slow_subscribers_are_reset(self):
+        stream = await self.open_stream()
+
+        broker = get_event_broker()
+        for i in range(3):
+            broker.publish(self.user.id, 'list.updated', json.dumps({'list': f'list-{i}'}))
+
+        self.assertEqual(await self.next_event(stream), ('reset', {}))
+        broker.publish(self.user.id, 'list.updated', json.dumps({'list': 'list-3'}))
+        self.assertEqual(await self.next_event(stream), ('list.updated', {'list': 'list-3'}))
+        await stream.aclose()
+
+    async def test_view_requires_authentication(self):
+        request = AsyncRequestFactory().get('/shopping/events/', headers={'Accept': 'text/event-stream'})
+
+        response = await async_views.ListEventsView.as_view()(request)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertTrue(response.render().content.startswith(b'event: error\ndata: '))
+
+        request = AsyncRequestFactory().get(
+            '/shopping/events/', headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        )
+        response = await async_views.ListEventsView.as_view()(request)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        await response.streaming_content.aclose()
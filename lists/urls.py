@@ -1,14 +1,44 @@
+from django.conf import settings
 from django.urls import path
 
 from lists import views
 
+if settings.ASYNC_API:
+    from lists import async_views
+
+    list_index = async_views.ListIndexView.as_view()
+    list_detail = async_views.ListDetailView.as_view()
+    list_items = async_views.ListItemsView.as_view()
+    search = async_views.SearchView.as_view()
+    autocomplete = async_views.AutocompleteView.as_view()
+    # Streams stay open, so they are only served by the event loop.
+    streaming = [path('events/', async_views.ListEventsView.as_view(), name='list_events')]
+else:
+    list_index = views.ListViewSet.as_view({'get': 'list', 'post': 'create'})
+    list_detail = views.ListViewSet.as_view({'get': 'retrieve', 'patch': 'partial_update', 'delete': 'destroy'})
+    list_items = views.ItemViewSet.as_view({'get': 'list', 'post': 'create', 'patch': 'bulk_partial_update'})
+    search = views.SearchView.as_view()
+    autocomplete = views.AutocompleteView.as_view()
+    streaming = []
+
 urlpatterns = [
-    path('lists/', views.ListViewSet.as_view({'get': 'list', 'post': 'create'}), name='list_create'),
-    path('search/', views.SearchView.as_view(), name='search'),
-    path('item/<slug:slug>/', views.ItemViewSet.as_view({'patch': 'partial_update', 'delete': 'destroy'}),
+    path('lists/', list_index, name='list_create'),
+    path('search/', search, name='search'),
+    path('autocomplete/', autocomplete, name='autocomplete'),
+    path('changes/', views.ChangesView.as_view(), name='changes'),
+    path('export/', views.ExportView.as_view(), name='export'),
+    path('import/', views.ImportView.as_view(), name='import'),
+    path('batch/', views.BatchView.as_view(), name='batch'),
+    path('cache-stats/', views.CacheStatsView.as_view(), name='cache_stats'),
+    path('db-pool-stats/', views.DatabasePoolStatsView.as_view(), name='db_pool_stats'),
+    path('item/<slug:slug>/', views.LegacyItemViewSet.as_view({'patch': 'partial_update', 'delete': 'destroy'}),
          name='item_detail'),
-    path('list/<slug:slug>/',
-         views.ListViewSet.as_view({'get': 'retrieve', 'patch': 'partial_update', 'delete': 'destroy'}),
-         name='list_detail'),
-    path('list/<slug:slug>/items/', views.ItemViewSet.as_view({'post': 'create'}), name='items'),
+    path('item/<slug:slug>/purchase/', views.LegacyItemViewSet.as_view({'put': 'purchase'}), name='item_purchase'),
+    path('list/<slug:slug>/', list_detail, name='list_detail'),
+    path('list/<slug:slug>/items/', list_items, name='items'),
+    path('list/<slug:list_slug>/items/<slug:slug>/',
+         views.ItemViewSet.as_view({'patch': 'partial_update', 'delete': 'destroy'}), name='list_item_detail'),
+    path('list/<slug:list_slug>/items/<slug:slug>/purchase/', views.ItemViewSet.as_view({'put': 'purchase'}),
+         name='list_item_purchase'),
+    *streaming,
 ]
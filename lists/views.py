@@ -1,23 +1,93 @@
-from django.contrib.postgres.search import TrigramSimilarity, SearchVector, SearchQuery, SearchRank
-from django.db.models import Q
+import io
+
+from django.contrib.postgres.search import TrigramSimilarity, SearchQuery, SearchRank
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Q, F, Exists, OuterRef, Subquery, Case, When, Value, Count, Sum
 from django.db.models.functions import Greatest
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from drf_spectacular.utils import extend_schema
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from rest_framework import permissions, status
 from rest_framework import viewsets
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import APIException
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+from rest_framework.parsers import MultiPartParser
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from lists import serializers
-from lists.models import ShoppingList, Item
+from lists.batch import BatchRunner
+from lists.caching import (
+    cache_response, invalidate_list_count, invalidate_user_responses, list_count_cache_key, response_cache_stats,
+)
+from lists.events import publish_change
+from lists.export import EXPORTERS, aiter_chunks
+from lists.importer import ListImporter
+from lists.models import ShoppingList, Item, ItemName, ChangeCounter, Tombstone
+from lists.renderers import NDJSONRenderer, CSVRenderer
+from utils.async_views import AsyncPaginationMixin
+from utils.db_pool import pool_stats
+
+
+class ListPagination(AsyncPaginationMixin, PageNumberPagination):
+    page_size = 5
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_paginated_response(self, data):
+        return Response({
+            'links': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link()
+            },
+            'list_count': self.page.paginator.count,
+            'results': data
+        })
+
+
+class ItemPagination(AsyncPaginationMixin, PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_paginated_response(self, data):
+        return Response({
+            'links': {
+                'next': self.get_next_link(),
+                'previous': self.get_previous_link()
+            },
+            'item_count': self.page.paginator.count,
+            'results': data
+        })
+
+
+LIST_COUNT_CACHE_TIMEOUT = 300
+
 
+class AmbiguousItemSlug(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'More than one of your lists has an item with this slug; use list/<list>/items/<slug>/.'
+    default_code = 'ambiguous_slug'
 
-class ListPagination(PageNumberPagination):
+
+class ListCursorPagination(CursorPagination):
     page_size = 5
     page_size_query_param = 'page_size'
     max_page_size = 100
+    ordering = '-id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_queryset = queryset
+        self.count_cache_key = list_count_cache_key(request.user.id)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_list_count(self):
+        return cache.get_or_set(self.count_cache_key, self.count_queryset.count, LIST_COUNT_CACHE_TIMEOUT)
 
     def get_paginated_response(self, data):
         return Response({
@@ -25,36 +95,140 @@ class ListPagination(PageNumberPagination):
                 'next': self.get_next_link(),
                 'previous': self.get_previous_link()
             },
-            'list_count': self.page.paginator.count,
+            'list_count': self.get_list_count(),
             'results': data
         })
 
 
+LIST_INDEX_STATE = {'count': Count('id'), 'ids': Sum('id'), 'versions': Sum('version')}
+LIST_INDEX_ETAG = 'W/"lists-{count}-{ids}-{versions}"'
+LIST_DETAIL_ETAG = 'W/"list-{}-{}"'
+
+
+def list_index_etag(request, *args, **kwargs):
+    state = ShoppingList.objects.filter(user_id=request.user.id).aggregate(**LIST_INDEX_STATE)
+    return LIST_INDEX_ETAG.format(**state)
+
+
+def list_detail_etag(request, slug=None):
+    version = ShoppingList.objects.filter(user_id=request.user.id, slug=slug).values_list('pk', 'version').first()
+    return LIST_DETAIL_ETAG.format(*version) if version else None
+
+
+SYNC_LIST_VALUES = serializers.list_values.only(set(serializers.list_values.field_names) - {'items'})
+
+
+def changes_since(user_id, since):
+    # The sequence is read first. Changes committed while the queries below run have a higher sequence and are sent
+    # again on the next sync, so none are missed even though the queries do not share a snapshot.
+    seq = ChangeCounter.objects.current(user_id)
+    lists = ShoppingList.objects.filter(user_id=user_id, change_seq__gt=since).order_by('change_seq', 'id')
+    items = Item.objects.filter(list__user_id=user_id, change_seq__gt=since).order_by('change_seq', 'id')
+    tombstones = Tombstone.objects.filter(user_id=user_id, change_seq__gt=since).order_by('change_seq', 'id')
+
+    deleted = {'lists': [], 'items': []}
+    for kind, slug, list_slug in tombstones.values_list('kind', 'slug', 'list_slug'):
+        if kind == Tombstone.Kind.LIST:
+            deleted['lists'].append(slug)
+        else:
+            deleted['items'].append({'list': list_slug, 'slug': slug})
+    return {
+        'seq': seq,
+        'lists': serializers.list_payloads(list(SYNC_LIST_VALUES.values(lists, 'id')), SYNC_LIST_VALUES),
+        'items': [
+            {'list': row['list__slug'], **serializers.item_values.to_representation(row)}
+            for row in serializers.item_values.values(items, 'list__slug')
+        ],
+        'deleted': deleted,
+    }
+
+
+def search_queryset(user_id, search_term):
+    search_query = SearchQuery(search_term)
+    matching_items = Item.objects.filter(list=OuterRef('pk'), name__trigram_similar=search_term)
+    item_similarity = (
+        Item.objects
+        .filter(list=OuterRef('pk'))
+        .annotate(similarity=TrigramSimilarity('name', search_term))
+        .order_by('-similarity')
+        .values('similarity')[:1]
+    )
+
+    return (
+        ShoppingList.objects
+        .filter(
+            Q(search_document=search_query)
+            | Q(name__trigram_similar=search_term)
+            | Q(description__trigram_similar=search_term)
+            | Exists(matching_items),
+            user_id=user_id,
+        )
+        .annotate(
+            rank=SearchRank(F('search_document'), search_query),
+            similarity=Greatest(
+                TrigramSimilarity('name', search_term),
+                TrigramSimilarity('description', search_term),
+                Subquery(item_similarity),
+            ),
+        )
+        .order_by('-rank', '-similarity', '-id')
+        .values('name', 'slug')
+    )
+
+
 class ListViewSet(viewsets.ViewSet):
     permission_classes = (permissions.IsAuthenticated,)
     pagination_class = ListPagination
+    cursor_pagination_class = ListCursorPagination
+
+    def get_queryset(self):
+        return (
+            ShoppingList.objects
+            .filter(user_id=self.request.user.id)
+            .defer('search_document')
+            .prefetch_related('items')
+        )
+
+    def get_paginator(self):
+        if self.request.query_params.get('pagination') == 'cursor':
+            return self.cursor_pagination_class()
+        return self.pagination_class()
 
     @extend_schema(
         operation_id='listShoppingLists',
         request=None,
+        parameters=[
+            OpenApiParameter(
+                'pagination', str, enum=['page', 'cursor'],
+                description='Use `cursor` for keyset pagination with opaque next/previous links.'
+            ),
+            serializers.ListFieldsQuerySerializer,
+        ],
         responses={
             200: serializers.ListSerializer(many=True),
+            304: 'Not Modified - No shopping list changed since the given ETag',
             401: 'Unauthorized - User is not authenticated',
         },
         summary='Retrieve a list of shopping lists',
-        description='Returns a paginated list of shopping lists for the authenticated user.'
+        description='Returns a paginated list of shopping lists for the authenticated user. `fields` and `include` '
+                    'limit the returned fields and whether items are embedded. Supports conditional requests '
+                    'through ETag and If-None-Match.'
     )
+    @cache_response('lists')
+    @method_decorator(condition(etag_func=list_index_etag))
     def list(self, request):
-        queryset = ShoppingList.objects.filter(user=request.user)
+        params = serializers.ListFieldsQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        values = params.validated_data['values']
+        queryset = values.values(ShoppingList.objects.filter(user_id=request.user.id), 'id')
 
-        paginator = self.pagination_class()
+        paginator = self.get_paginator()
         page = paginator.paginate_queryset(queryset, request)
         if page is not None:
-            serializer = serializers.ListSerializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
+            return paginator.get_paginated_response(serializers.list_payloads(page, values))
 
-        serializer = serializers.ListSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(serializers.list_payloads(list(queryset), values))
 
     @extend_schema(
         operation_id='createShoppingList',
@@ -70,7 +244,12 @@ class ListViewSet(viewsets.ViewSet):
         serializer = serializers.ListSerializer(data=request.data)
 
         if serializer.is_valid():
-            serializer.save(user=request.user)
+            with transaction.atomic():
+                instance = serializer.save(user_id=request.user.id, **ChangeCounter.objects.stamp(request.user.id))
+                ShoppingList.objects.filter(pk=instance.pk).update_search_document()
+                invalidate_list_count(request.user.id)
+                invalidate_user_responses(request.user.id)
+                publish_change(request.user.id, 'list.created', instance.slug, data=serializer.data)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -78,17 +257,29 @@ class ListViewSet(viewsets.ViewSet):
     @extend_schema(
         operation_id='retrieveShoppingList',
         request=None,
+        parameters=[serializers.ListFieldsQuerySerializer],
         responses={
             200: serializers.ListSerializer,
+            304: 'Not Modified - Shopping list unchanged since the given ETag',
             404: 'Shopping list not found',
         },
         summary='Retrieve a specific shopping list',
-        description='Returns the details of a shopping list identified by its slug.'
+        description='Returns the details of a shopping list identified by its slug. `fields` and `include` limit '
+                    'the returned fields and whether items are embedded. Supports conditional requests through '
+                    'ETag and If-None-Match.'
     )
+    @cache_response('list_detail')
+    @method_decorator(condition(etag_func=list_detail_etag))
     def retrieve(self, request, slug=None):
-        queryset = get_object_or_404(ShoppingList, slug=slug, user=request.user)
-        serializer = serializers.ListSerializer(queryset)
-        return Response(serializer.data)
+        params = serializers.ListFieldsQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        values = params.validated_data['values']
+        queryset = ShoppingList.objects.filter(user_id=request.user.id, slug=slug)
+        row = values.values(queryset, 'id').first()
+        if row is None:
+            raise Http404
+        return Response(serializers.list_payloads([row], values)[0])
 
     @extend_schema(
         operation_id='partialUpdateShoppingList',
@@ -102,11 +293,20 @@ class ListViewSet(viewsets.ViewSet):
         description='Updates specific fields of a shopping list identified by its slug.'
     )
     def partial_update(self, request, slug=None):
-        queryset = get_object_or_404(ShoppingList, user=request.user, slug=slug)
+        queryset = get_object_or_404(self.get_queryset(), slug=slug)
         serializer = serializers.ListSerializer(queryset, data=request.data, partial=True)
 
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                stamp = ChangeCounter.objects.stamp(request.user.id)
+                instance = serializer.save(**stamp)
+                ShoppingList.objects.filter(pk=instance.pk).update_search_document()
+                if instance.slug != slug:
+                    # Synced clients know the list and its items by the old slug.
+                    Tombstone.objects.record(request.user.id, Tombstone.Kind.LIST, [slug], stamp)
+                    Item.objects.filter(list=instance).update(**stamp)
+                invalidate_user_responses(request.user.id)
+                publish_change(request.user.id, 'list.updated', slug, data=serializer.data)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -121,15 +321,69 @@ class ListViewSet(viewsets.ViewSet):
         summary='Delete a shopping list',
         description='Deletes a shopping list identified by its slug.'
     )
+    @transaction.atomic
     def destroy(self, request, slug=None):
-        queryset = get_object_or_404(ShoppingList, user=request.user, slug=slug)
+        stamp = ChangeCounter.objects.stamp(request.user.id)
+        queryset = get_object_or_404(ShoppingList, user_id=request.user.id, slug=slug)
         queryset.delete()
+        Tombstone.objects.record(request.user.id, Tombstone.Kind.LIST, [slug], stamp)
+        invalidate_list_count(request.user.id)
+        invalidate_user_responses(request.user.id)
+        publish_change(request.user.id, 'list.deleted', slug)
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class ItemViewSet(viewsets.ViewSet):
     permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = ItemPagination
+    max_bulk_items = 500
+
+    # Item slugs are unique within their list. The item/<slug>/ routes, which predate that, still find an item whose
+    # slug is used in only one of the user's lists.
+    @staticmethod
+    def get_item(queryset, request, slug, list_slug):
+        queryset = queryset.filter(slug=slug, list__user_id=request.user.id)
+        if list_slug is not None:
+            return get_object_or_404(queryset, list__slug=list_slug)
+        items = list(queryset[:2])
+        if not items:
+            raise Http404
+        if len(items) > 1:
+            raise AmbiguousItemSlug
+        return items[0]
+
+    @extend_schema(
+        operation_id='listItems',
+        request=None,
+        parameters=[serializers.ItemFilterSerializer],
+        responses={
+            200: serializers.ItemSerializer(many=True),
+            304: 'Not Modified - Shopping list unchanged since the given ETag',
+            400: 'Invalid query parameters',
+            404: 'Shopping list not found',
+        },
+        summary='Retrieve the items of a shopping list',
+        description='Returns a paginated page of the items of a shopping list, optionally filtered by purchase state. '
+                    'Supports conditional requests through ETag and If-None-Match.'
+    )
+    @cache_response('items')
+    @method_decorator(condition(etag_func=list_detail_etag))
+    def list(self, request, slug=None):
+        params = serializers.ItemFilterSerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        list_id = get_object_or_404(
+            ShoppingList.objects.values_list('id', flat=True), slug=slug, user_id=request.user.id
+        )
+        queryset = Item.objects.filter(list_id=list_id)
+        if params.validated_data['is_purchased'] is not None:
+            queryset = queryset.filter(is_purchased=params.validated_data['is_purchased'])
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(serializers.item_values.values(queryset), request)
+        return paginator.get_paginated_response([serializers.item_values.to_representation(row) for row in page])
 
     @extend_schema(
         operation_id='createItem',
@@ -138,19 +392,98 @@ class ItemViewSet(viewsets.ViewSet):
             201: serializers.ItemSerializer,
             400: 'Invalid input data',
         },
-        summary='Create a new item',
-        description='Creates a new item for the specified shopping list.'
+        summary='Create one or more items',
+        description='Creates a new item for the specified shopping list. An array of items is inserted in one batch, '
+                    'with validation errors reported per item.'
     )
     def create(self, request, slug=None):
-        list_instance = get_object_or_404(ShoppingList, slug=slug, user=request.user)
-        serializer = serializers.ItemSerializer(data=request.data)
+        list_instance = get_object_or_404(ShoppingList, slug=slug, user_id=request.user.id)
+        many = isinstance(request.data, list)
+        if many:
+            serializer = serializers.ItemSerializer(
+                data=request.data, many=True, allow_empty=False, max_length=self.max_bulk_items
+            )
+        else:
+            serializer = serializers.ItemSerializer(data=request.data)
 
         if serializer.is_valid():
-            serializer.save(list=list_instance)
+            with transaction.atomic():
+                stamp = ChangeCounter.objects.stamp(request.user.id)
+                saved = serializer.save(list=list_instance, **stamp)
+                items = saved if isinstance(saved, list) else [saved]
+                shopping_list = ShoppingList.objects.filter(pk=list_instance.pk)
+                shopping_list.adjust_totals(added=Item.sum_totals(items), **stamp)
+                shopping_list.update_search_document()
+                ItemName.objects.record(request.user.id, [item.name for item in items])
+                invalidate_user_responses(request.user.id)
+                published = serializer.data if many else [serializer.data]
+                publish_change(request.user.id, 'item.created', slug, items=published)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @extend_schema(
+        operation_id='bulkUpdateItemPurchaseState',
+        request=serializers.ItemPurchaseSerializer(many=True),
+        responses={
+            200: serializers.ItemSerializer(many=True),
+            400: 'Invalid input data',
+            404: 'Shopping list not found',
+        },
+        summary='Mark many items purchased or pending',
+        description='Sets the purchase state of several items of a shopping list in one transaction. Nothing is '
+                    'updated if any entry is invalid.'
+    )
+    @transaction.atomic
+    def bulk_partial_update(self, request, slug=None):
+        list_instance = get_object_or_404(ShoppingList, slug=slug, user_id=request.user.id)
+        serializer = serializers.ItemPurchaseSerializer(
+            data=request.data, many=True, allow_empty=False, max_length=self.max_bulk_items
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        stamp = ChangeCounter.objects.stamp(request.user.id)
+        changes = serializer.validated_data
+        items = {
+            item.slug: item for item in
+            Item.objects.select_for_update().filter(list=list_instance, slug__in=[c['slug'] for c in changes])
+        }
+
+        errors = []
+        seen = set()
+        for change in changes:
+            if change['slug'] not in items:
+                errors.append({'slug': ['Item not found in this list.']})
+            elif change['slug'] in seen:
+                errors.append({'slug': ['Item is listed more than once.']})
+            else:
+                errors.append({})
+            seen.add(change['slug'])
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        changed = [items[c['slug']] for c in changes if items[c['slug']].is_purchased != c['is_purchased']]
+        if changed:
+            removed = Item.sum_totals(changed)
+            for item in changed:
+                item.is_purchased = not item.is_purchased
+
+            purchased = [item.pk for item in changed if item.is_purchased]
+            Item.objects.filter(pk__in=[item.pk for item in changed]).update(
+                is_purchased=Case(When(pk__in=purchased, then=Value(True)), default=Value(False)), **stamp
+            )
+            ShoppingList.objects.filter(pk=list_instance.pk).adjust_totals(
+                added=Item.sum_totals(changed), removed=removed, **stamp
+            )
+            invalidate_user_responses(request.user.id)
+            publish_change(
+                request.user.id, 'item.updated', slug, items=serializers.ItemSerializer(changed, many=True).data
+            )
+
+        serializer = serializers.ItemSerializer([items[c['slug']] for c in changes], many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     @extend_schema(
         operation_id='partialUpdateItem',
         request=serializers.ItemSerializer,
@@ -162,16 +495,59 @@ class ItemViewSet(viewsets.ViewSet):
         summary='Partially update an item',
         description='Updates specific fields of an item identified by its slug.'
     )
-    def partial_update(self, request, slug=None):
-        queryset = get_object_or_404(Item, slug=slug)
+    @transaction.atomic
+    def partial_update(self, request, slug=None, list_slug=None):
+        stamp = ChangeCounter.objects.stamp(request.user.id)
+        queryset = self.get_item(
+            Item.objects.select_related('list').select_for_update(of=('self',)), request, slug, list_slug
+        )
+        removed = queryset.totals()
+        old_name = queryset.name
         serializer = serializers.ItemSerializer(queryset, request.data, partial=True)
 
         if serializer.is_valid():
-            serializer.save()
+            item = serializer.save(**stamp)
+            shopping_list = ShoppingList.objects.filter(pk=item.list_id)
+            shopping_list.adjust_totals(added=item.totals(), removed=removed, **stamp)
+            if item.name != old_name:
+                shopping_list.update_search_document()
+                ItemName.objects.record(request.user.id, [item.name])
+            if item.slug != slug:
+                Tombstone.objects.record(request.user.id, Tombstone.Kind.ITEM, [slug], stamp, item.list.slug)
+            invalidate_user_responses(request.user.id)
+            publish_change(request.user.id, 'item.updated', item.list.slug, items=[serializer.data])
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @extend_schema(
+        operation_id='setItemPurchaseState',
+        request=serializers.PurchaseStateSerializer,
+        responses={
+            200: serializers.PurchaseStateResponseSerializer,
+            400: 'Invalid input data',
+            404: 'Item not found',
+        },
+        summary='Mark an item purchased or pending',
+        description='Sets the purchase state of an item in a single statement and returns the item together with '
+                    'the updated totals of its list.'
+    )
+    def purchase(self, request, slug=None, list_slug=None):
+        serializer = serializers.PurchaseStateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        item = Item.objects.set_purchased(slug, request.user.id, serializer.validated_data['is_purchased'], list_slug)
+        if item is None:
+            if list_slug is None and Item.objects.filter(slug=slug, list__user_id=request.user.id).count() > 1:
+                raise AmbiguousItemSlug
+            raise Http404
+        invalidate_user_responses(request.user.id)
+
+        serializer = serializers.PurchaseStateResponseSerializer({'item': item, 'list': item.list})
+        publish_change(request.user.id, 'item.updated', item.list.slug, items=[serializer.data['item']])
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
     @extend_schema(
         operation_id='deleteItem',
         request=None,
@@ -182,18 +558,74 @@ class ItemViewSet(viewsets.ViewSet):
         summary='Delete an item',
         description='Deletes an item identified by its slug.'
     )
-    def destroy(self, request, slug=None):
-        queryset = get_object_or_404(Item, slug=slug)
+    @transaction.atomic
+    def destroy(self, request, slug=None, list_slug=None):
+        stamp = ChangeCounter.objects.stamp(request.user.id)
+        queryset = self.get_item(
+            Item.objects.select_related('list').select_for_update(of=('self',)), request, slug, list_slug
+        )
+        shopping_list = ShoppingList.objects.filter(pk=queryset.list_id)
+        shopping_list.adjust_totals(removed=queryset.totals(), **stamp)
         queryset.delete()
+        Tombstone.objects.record(request.user.id, Tombstone.Kind.ITEM, [slug], stamp, queryset.list.slug)
+        shopping_list.update_search_document()
+        invalidate_user_responses(request.user.id)
+        publish_change(request.user.id, 'item.deleted', queryset.list.slug, items=[{'slug': slug}])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+AMBIGUOUS_SLUG = 'Conflict - More than one list has an item with this slug'
+
+
+# Item slugs are unique per list, so these routes only find an item whose slug is unique across the user's lists.
+@extend_schema_view(
+    partial_update=extend_schema(
+        operation_id='partialUpdateItemBySlug',
+        deprecated=True,
+        request=serializers.ItemSerializer,
+        responses={
+            200: serializers.ItemSerializer,
+            400: 'Invalid input data',
+            404: 'Item not found',
+            409: AMBIGUOUS_SLUG,
+        },
+    ),
+    destroy=extend_schema(
+        operation_id='deleteItemBySlug',
+        deprecated=True,
+        request=None,
+        responses={
+            204: 'No Content - Item deleted successfully',
+            404: 'Item not found',
+            409: AMBIGUOUS_SLUG,
+        },
+    ),
+)
+class LegacyItemViewSet(ItemViewSet):
+    @extend_schema(
+        operation_id='setItemPurchaseStateBySlug',
+        deprecated=True,
+        request=serializers.PurchaseStateSerializer,
+        responses={
+            200: serializers.PurchaseStateResponseSerializer,
+            400: 'Invalid input data',
+            404: 'Item not found',
+            409: AMBIGUOUS_SLUG,
+        },
+        summary='Mark an item purchased or pending',
+        description='Sets the purchase state of an item in a single statement and returns the item together with '
+                    'the updated totals of its list.'
+    )
+    def purchase(self, request, slug=None, list_slug=None):
+        return super().purchase(request, slug)
+
+
 class SearchView(APIView):
     permission_classes = (permissions.IsAuthenticated,)
 
     @extend_schema(
         operation_id='searchShoppingLists',
-        request=serializers.ListSerializer,
+        parameters=[serializers.SearchQuerySerializer],
         responses={
             200: {
                 'type': 'array',
@@ -205,31 +637,222 @@ class SearchView(APIView):
                     },
                 },
             },
+            400: 'Invalid query parameters',
             401: 'Unauthorized - User is not authenticated',
         },
         summary='Search shopping lists',
-        description='Returns a list of shopping lists that match the search term based on name, description, and item names.'
+        description='Returns a ranked page of shopping lists that match the search term based on name, description, '
+                    'and item names.'
     )
+    @cache_response('search')
     def get(self, request: Request):
-        search_term = request.query_params.get('search', '')
+        serializer = serializers.SearchQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        search_vector = SearchVector('name', 'description', 'items__name')
-        search_query = SearchQuery(search_term)
-        search_rank = SearchRank(search_vector, search_query)
+        search_term = serializer.validated_data['search']
+        limit = serializer.validated_data['limit']
+        offset = serializer.validated_data['offset']
+        if not search_term:
+            return Response([])
 
-        similarity_filter = Greatest(
-            TrigramSimilarity('name', search_term),
-            TrigramSimilarity('description', search_term),
-            TrigramSimilarity('items__name', search_term)
-        )
+        queryset = search_queryset(request.user.id, search_term)
+        return Response(list(queryset[offset:offset + limit]))
 
-        queryset = (
-            ShoppingList.objects
-            .annotate(rank=search_rank, similarity=similarity_filter)
-            .filter(Q(user=request.user), Q(rank__gt=0.3) | Q(similarity__gt=0.3))
-            .values('name', 'slug')
-            .distinct()
-            .order_by('-rank', '-similarity')
+
+class AutocompleteView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @extend_schema(
+        operation_id='autocompleteItemNames',
+        parameters=[serializers.AutocompleteQuerySerializer],
+        responses={
+            200: {'type': 'array', 'items': {'type': 'string'}},
+            400: 'Invalid query parameters',
+            401: 'Unauthorized - User is not authenticated',
+        },
+        summary='Autocomplete item names',
+        description='Returns the item names the user has used before that start with the typed prefix, ignoring case '
+                    'and repeated spaces. Names used often and recently come first; an empty prefix returns the top '
+                    'names overall.'
+    )
+    @cache_response('autocomplete')
+    def get(self, request: Request):
+        serializer = serializers.AutocompleteQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        return Response(list(ItemName.objects.complete(request.user.id, data['q'], data['limit'])))
+
+
+class ChangesView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @extend_schema(
+        operation_id='listChanges',
+        parameters=[serializers.ChangesQuerySerializer],
+        responses={
+            200: serializers.ChangesSerializer,
+            400: 'Invalid query parameters',
+            401: 'Unauthorized - User is not authenticated',
+        },
+        summary='Lists and items changed since a sync',
+        description='Returns the lists and items created or changed after sequence `since`, and the slugs of those '
+                    'deleted, so an offline client only downloads what changed. Store the returned `seq` and pass it '
+                    'as `since` next time. Deletions come before upserts: a slug can be deleted and then reused.'
+    )
+    @cache_response('changes')
+    def get(self, request: Request):
+        params = serializers.ChangesQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(changes_since(request.user.id, params.validated_data['since']))
+
+
+class ExportView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    renderer_classes = (NDJSONRenderer, CSVRenderer)
+
+    @extend_schema(
+        operation_id='exportShoppingLists',
+        request=None,
+        parameters=[
+            OpenApiParameter('format', str, enum=list(EXPORTERS), description='Export format, defaults to `ndjson`.'),
+        ],
+        responses={
+            200: 'NDJSON stream of list and item records, or CSV with one row per item',
+            401: 'Unauthorized - User is not authenticated',
+        },
+        summary='Export all shopping lists and items',
+        description='Streams every shopping list and item of the authenticated user. NDJSON emits the lists first, '
+                    'then their items; CSV has one row per item with the list columns repeated.'
+    )
+    def get(self, request: Request):
+        renderer = request.accepted_renderer
+        content = EXPORTERS[renderer.format](request.user.id)
+        if isinstance(request._request, ASGIRequest):
+            content = aiter_chunks(content)
+        response = StreamingHttpResponse(content, content_type=f'{renderer.media_type}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="shopping-lists.{renderer.format}"'
+        return response
+
+
+class ImportView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+    parser_classes = (MultiPartParser,)
+
+    @extend_schema(
+        operation_id='importShoppingLists',
+        request=serializers.ImportSerializer,
+        responses={
+            200: serializers.ImportReportSerializer,
+            400: 'Invalid input data',
+            401: 'Unauthorized - User is not authenticated',
+        },
+        summary='Import shopping lists and items',
+        description='Imports lists and items from an NDJSON or CSV file in the export format. Rows are validated '
+                    'and inserted in chunks; invalid rows are skipped and reported.'
+    )
+    def post(self, request: Request):
+        serializer = serializers.ImportSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        upload = serializer.validated_data['file']
+        lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        report = ListImporter(request.user.id).run(lines, serializer.validated_data['file_format'])
+
+        invalidate_list_count(request.user.id)
+        invalidate_user_responses(request.user.id)
+        return Response(report.as_dict())
+
+
+class BatchView(APIView):
+    permission_classes = (permissions.IsAuthenticated,)
+
+    @extend_schema(
+        operation_id='batchShoppingLists',
+        request=serializers.BatchSerializer,
+        responses={
+            200: serializers.BatchReportSerializer,
+            400: serializers.BatchReportSerializer,
+            401: 'Unauthorized - User is not authenticated',
+        },
+        summary='Apply list and item changes in one request',
+        description='Runs an ordered array of create, patch and delete operations on lists and items in one '
+                    'transaction, validated as on their own endpoints. In `atomic` mode a failed operation rolls '
+                    'back the batch and the others are reported with status 424; in `best_effort` mode failed '
+                    'operations are skipped.'
+    )
+    def post(self, request: Request):
+        serializer = serializers.BatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        runner = BatchRunner(
+            request.user.id, serializer.validated_data['operations'],
+            atomic=serializer.validated_data['mode'] == 'atomic',
         )
+        committed, results = runner.run()
+
+        if committed:
+            if runner.lists_changed:
+                invalidate_list_count(request.user.id)
+            invalidate_user_responses(request.user.id)
+        response_status = status.HTTP_200_OK if committed else status.HTTP_400_BAD_REQUEST
+        return Response({'committed': committed, 'results': results}, status=response_status)
 
-        return Response(list(queryset))
+
+class CacheStatsView(APIView):
+    permission_classes = (permissions.IsAdminUser,)
+
+    @extend_schema(
+        operation_id='responseCacheStats',
+        request=None,
+        responses={
+            200: {
+                'type': 'object',
+                'properties': {
+                    'hits': {'type': 'integer'},
+                    'misses': {'type': 'integer'},
+                },
+            },
+            403: 'Forbidden - Staff only',
+        },
+        summary='Response cache counters',
+        description='Returns the hit and miss counters of the shopping list response cache for this process.'
+    )
+    def get(self, request: Request):
+        return Response(response_cache_stats.snapshot())
+
+
+class DatabasePoolStatsView(APIView):
+    permission_classes = (permissions.IsAdminUser,)
+
+    @extend_schema(
+        operation_id='databasePoolStats',
+        request=None,
+        responses={
+            200: {
+                'type': 'object',
+                'additionalProperties': {
+                    'type': 'object',
+                    'properties': {
+                        'size': {'type': 'integer'},
+                        'in_use': {'type': 'integer'},
+                        'utilization': {'type': 'number'},
+                        'waiting': {'type': 'integer'},
+                        'mean_wait_ms': {'type': 'number'},
+                        'timeouts': {'type': 'integer'},
+                    },
+                },
+            },
+            403: 'Forbidden - Staff only',
+        },
+        summary='Database connection pool counters',
+        description='Returns the size, utilization, wait time and error counters of the connection pool of every '
+                    'database alias for this process. Aliases without a pool are omitted.'
+    )
+    def get(self, request: Request):
+        return Response(pool_stats())
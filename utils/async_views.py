@@ -0,0 +1,116 @@
+import inspect
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from rest_framework import exceptions
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView whose handlers are coroutines. Authentication goes through `aauthenticate` when the authenticator has
+    one; negotiation, permissions, exception handling and rendering are DRF's own.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if hasattr(handler, 'sync_view'):
+            return await handler(request, *args, **kwargs)
+
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names and handler is not None:
+                response = handler(request, *args, **kwargs)
+            else:
+                response = self.http_method_not_allowed(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+        request.version, request.versioning_scheme = self.determine_version(request, *args, **kwargs)
+        await self.aperform_authentication(request)
+        self.check_permissions(request)
+        if self.throttle_classes:
+            await sync_to_async(self.check_throttles)(request)
+
+    async def aperform_authentication(self, request):
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, 'aauthenticate'):
+                    user_auth_tuple = await authenticator.aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
+
+def sync_action(viewset, action):
+    """
+    Handler that runs a sync viewset action in a worker thread. Writes stay on the sync views because the async ORM
+    cannot run transactions; the whole request is handed over, so it is authenticated and parsed only once.
+    """
+    handler = getattr(viewset, action)
+    view = viewset.as_view({method: action for method in ('post', 'put', 'patch', 'delete')})
+
+    @wraps(handler)
+    async def delegate(self, request, *args, **kwargs):
+        return await sync_to_async(view)(request, *args, **kwargs)
+
+    delegate.sync_view = view
+    return delegate
+
+
+def schema_of(view_method):
+    """Reuse the OpenAPI annotation of the sync handler an async handler replaces."""
+    def decorator(handler):
+        if hasattr(view_method, 'kwargs'):
+            handler.kwargs = dict(view_method.kwargs)
+        return handler
+
+    return decorator
+
+
+class AsyncPaginationMixin:
+    """
+    Async variant of PageNumberPagination.paginate_queryset for callers that already know the row count, so the
+    page is a single query.
+    """
+
+    async def apaginate_queryset(self, queryset, request, count):
+        page_size = self.get_page_size(request)
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = count
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise exceptions.NotFound(msg)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        self.request = request
+        return [row async for row in self.page.object_list]
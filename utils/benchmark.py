@@ -0,0 +1,78 @@
+import math
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+
+
+class QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.duration += duration
+            self.queries.append((duration, sql))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(latencies):
+    return {
+        'mean_ms': round(statistics.mean(latencies), 3),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+    }
+
+
+def measure(request, iterations, prepare=None):
+    latencies = []
+    query_counts = []
+    sql_times = []
+
+    for i in range(iterations):
+        args = prepare(i) if prepare else (i,)
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            start = time.perf_counter()
+            request(*args)
+            latencies.append((time.perf_counter() - start) * 1000)
+        query_counts.append(timer.count)
+        sql_times.append(timer.duration * 1000)
+
+    return {
+        'iterations': iterations,
+        **summarize(latencies),
+        'queries': round(statistics.mean(query_counts), 2),
+        'sql_ms': round(statistics.mean(sql_times), 3),
+    }
+
+
+def run_threaded(send, jobs, concurrency):
+    """
+    Call send(job) for every job from `concurrency` threads and return (latency_ms, result) pairs. Each thread's
+    connection is closed after every job, as Django does at the end of a request when CONN_MAX_AGE is 0.
+    """
+    def timed(job):
+        start = time.perf_counter()
+        try:
+            result = send(job)
+        finally:
+            connection.close()
+        return (time.perf_counter() - start) * 1000, result
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        return list(executor.map(timed, jobs))
@@ -0,0 +1,34 @@
+from django.db import connections
+
+
+# Counters are per process and cumulative since the pool was opened.
+def pool_stats():
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is None:
+            continue
+
+        raw = pool.get_stats()
+        size = raw.get('pool_size', 0)
+        in_use = size - raw.get('pool_available', 0)
+        requests = raw.get('requests_num', 0)
+        wait_ms = raw.get('requests_wait_ms', 0)
+        stats[alias] = {
+            'min_size': raw.get('pool_min', 0),
+            'max_size': raw.get('pool_max', 0),
+            'size': size,
+            'in_use': in_use,
+            'utilization': round(in_use / raw['pool_max'], 3) if raw.get('pool_max') else 0.0,
+            'waiting': raw.get('requests_waiting', 0),
+            'requests': requests,
+            'requests_queued': raw.get('requests_queued', 0),
+            'wait_ms': wait_ms,
+            'mean_wait_ms': round(wait_ms / requests, 3) if requests else 0.0,
+            'timeouts': raw.get('requests_errors', 0),
+            'connections_opened': raw.get('connections_num', 0),
+            'connection_errors': raw.get('connections_errors', 0),
+            'connections_lost': raw.get('connections_lost', 0),
+            'returned_broken': raw.get('returns_bad', 0),
+        }
+    return stats
@@ -0,0 +1,124 @@
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Routing state of the current request. Like the request timer, it follows the request into sync_to_async threads.
+current_routing = ContextVar('db_routing', default=None)
+
+
+class RequestRouting:
+    def __init__(self, read_only):
+        self.use_replica = read_only
+        self.replica = None
+        self.user_id = None
+
+
+def replica_aliases():
+    return settings.DATABASE_REPLICAS['ALIASES']
+
+
+def _pin_key(user_id):
+    return f'db-primary-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    cache.set(_pin_key(user_id), True, settings.DATABASE_REPLICAS['STICKY_SECONDS'])
+
+
+async def apin_to_primary(user_id):
+    await cache.aset(_pin_key(user_id), True, settings.DATABASE_REPLICAS['STICKY_SECONDS'])
+
+
+def bind_user(user_id):
+    """
+    Ties the current request to a user: reads go to the primary while the user is pinned, and a successful write
+    pins the user. Called once the user is known, before the view reads anything on their behalf.
+    """
+    routing = current_routing.get()
+    if routing is None:
+        return
+    routing.user_id = user_id
+    if routing.use_replica and replica_aliases() and cache.get(_pin_key(user_id)):
+        routing.use_replica = False
+
+
+async def abind_user(user_id):
+    routing = current_routing.get()
+    if routing is None:
+        return
+    routing.user_id = user_id
+    if routing.use_replica and replica_aliases() and await cache.aget(_pin_key(user_id)):
+        routing.use_replica = False
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends reads of safe requests to a replica, picked once per request, and everything else to the primary.
+    Management commands, tasks and transactions opened on the primary always read from the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = current_routing.get()
+        if routing is None or not routing.use_replica:
+            return DEFAULT_DB_ALIAS
+        replicas = replica_aliases()
+        if not replicas or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if routing.replica is None:
+            routing.replica = random.choice(replicas)
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replica_aliases()
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        routing = RequestRouting(request.method in SAFE_METHODS)
+        token = current_routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        if self.wrote(request, response, routing):
+            pin_to_primary(routing.user_id)
+        return response
+
+    async def __acall__(self, request):
+        routing = RequestRouting(request.method in SAFE_METHODS)
+        token = current_routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        if self.wrote(request, response, routing):
+            await apin_to_primary(routing.user_id)
+        return response
+
+    # Replicas can lag behind the primary, so a user who just wrote reads from the primary for a while.
+    @staticmethod
+    def wrote(request, response, routing):
+        return request.method not in SAFE_METHODS and routing.user_id is not None and response.status_code < 400
@@ -0,0 +1,120 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'WORKERS': 2,
+    'BATCH_SIZE': 50,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF': 2.0,
+    'IDLE_TIMEOUT': 30.0,
+}
+
+
+class EmailQueue:
+    def __init__(self):
+        self._pending = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._workers = []
+
+    @property
+    def config(self):
+        return {**DEFAULTS, **getattr(settings, 'EMAIL_QUEUE', {})}
+
+    def enqueue(self, message, on_sent=None, on_failed=None):
+        with self._condition:
+            heapq.heappush(self._pending, (time.monotonic(), next(self._sequence), message, on_sent, on_failed, 0))
+            self._condition.notify()
+        self._ensure_workers()
+
+    def drain(self):
+        connection = get_connection()
+        try:
+            while batch := self._take_batch(wait=False):
+                self._send_batch(batch, connection)
+        finally:
+            connection.close()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._pending)
+
+    def _ensure_workers(self):
+        with self._condition:
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            while len(self._workers) < self.config['WORKERS']:
+                worker = threading.Thread(target=self._work, name='email-queue', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _take_batch(self, wait=True):
+        config = self.config
+        deadline = time.monotonic() + config['IDLE_TIMEOUT']
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if self._pending and self._pending[0][0] <= now:
+                    batch = []
+                    while self._pending and self._pending[0][0] <= now and len(batch) < config['BATCH_SIZE']:
+                        batch.append(heapq.heappop(self._pending))
+                    return batch
+                if not wait or now >= deadline:
+                    return []
+                next_ready = self._pending[0][0] if self._pending else deadline
+                self._condition.wait(min(next_ready, deadline) - now)
+
+    def _work(self):
+        connection = None
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                if connection is not None:
+                    connection.close()
+                    connection = None
+                continue
+
+            if connection is None:
+                connection = get_connection()
+            close_old_connections()
+            try:
+                self._send_batch(batch, connection)
+            except Exception:
+                logger.exception('Email queue worker failed to process a batch')
+            finally:
+                close_old_connections()
+
+    def _send_batch(self, batch, connection):
+        max_attempts = self.config['MAX_ATTEMPTS']
+        for _, _, message, on_sent, on_failed, attempts in batch:
+            attempts += 1
+            try:
+                connection.open()
+                connection.send_messages([message])
+            except Exception:
+                logger.warning('Sending email to %s failed (attempt %s)', message.to, attempts, exc_info=True)
+                connection.close()
+                if attempts < max_attempts:
+                    self._retry(message, on_sent, on_failed, attempts)
+                elif on_failed is not None:
+                    on_failed(attempts)
+            else:
+                if on_sent is not None:
+                    on_sent(attempts)
+
+    def _retry(self, message, on_sent, on_failed, attempts):
+        ready_at = time.monotonic() + self.config['RETRY_BACKOFF'] * 2 ** (attempts - 1)
+        with self._condition:
+            heapq.heappush(self._pending, (ready_at, next(self._sequence), message, on_sent, on_failed, attempts))
+            self._condition.notify()
+
+
+email_queue = EmailQueue()
@@ -0,0 +1,153 @@
+import json
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from utils.benchmark import QueryTimer
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Server-Timing exposes query counts and timings to clients, so it is opt-in.
+    'HEADER': False,
+    'SLOW_REQUEST_MS': 500,
+    'SLOW_QUERIES': 5,
+}
+
+# The timer of the current request. Context variables follow the request into sync_to_async threads, so queries
+# of async views are attributed to the right request even though they run on another thread's connection.
+current_timer = ContextVar('request_timer', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    timer = current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install)
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    @property
+    def config(self):
+        return {**DEFAULTS, **getattr(settings, 'REQUEST_TIMING', {})}
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        config = self.config
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+        timer = QueryTimer()
+        token = current_timer.set(timer)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        return self.finish(request, response, timer, start, config)
+
+    async def __acall__(self, request):
+        config = self.config
+        if not config['ENABLED']:
+            return await self.get_response(request)
+
+        timer = QueryTimer()
+        token = current_timer.set(timer)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        return self.finish(request, response, timer, start, config)
+
+    def finish(self, request, response, timer, start, config):
+        finished = time.perf_counter()
+        view_started = getattr(request, '_timing_view_started', start)
+        view_finished = getattr(request, '_timing_view_finished', finished)
+        timings = {
+            'db': timer.duration * 1000,
+            'view': (view_finished - view_started) * 1000,
+            'serialize': (finished - view_finished) * 1000,
+            'total': (finished - start) * 1000,
+        }
+
+        if config['HEADER']:
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={duration:.2f}' + (f';desc="{timer.count} queries"' if name == 'db' else '')
+                for name, duration in timings.items()
+            )
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': timer.count,
+            **{f'{name}_ms': round(duration, 2) for name, duration in timings.items()},
+        }
+        if timings['total'] >= config['SLOW_REQUEST_MS']:
+            record['view'] = self._view_name(request)
+            record['slowest_queries'] = [
+                {'ms': round(duration * 1000, 2), 'sql': sql}
+                for duration, sql in sorted(timer.queries, key=lambda query: query[0], reverse=True)
+                [:config['SLOW_QUERIES']]
+            ]
+            logger.warning('slow request %s', json.dumps(record))
+        else:
+            logger.info('request %s', json.dumps(record))
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing_view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        request._timing_view_finished = time.perf_counter()
+        return response
+
+    # Installed as process_view/process_template_response when the stack is async, so they cannot delegate to them.
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        request._timing_view_started = time.perf_counter()
+
+    async def aprocess_template_response(self, request, response):
+        request._timing_view_finished = time.perf_counter()
+        return response
+
+    @staticmethod
+    def _view_name(request):
+        match = request.resolver_match
+        if match is None:
+            return None
+        view_class = getattr(match.func, 'cls', getattr(match.func, 'view_class', None))
+        if view_class is None:
+            return match._func_path
+        name = f'{view_class.__module__}.{view_class.__qualname__}'
+        action = (getattr(match.func, 'actions', None) or {}).get(request.method.lower())
+        return f'{name}.{action}' if action else name
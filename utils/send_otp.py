@@ -1,20 +1,24 @@
-from accounts.models import OTPRequest
+from functools import partial
+
 from django.core.mail import EmailMessage
-from django.conf import settings
+from django.db import transaction
+
+from accounts.models import OTPRequest
+from accounts.otp_store import get_otp_store
+from utils.email_queue import email_queue
 
 
-def send_otp(email):
-    otp = OTPRequest.objects.filter(email=email).first()
-    if otp:
-        email = EmailMessage(
-            subject='Code',
-            body=otp.password,
-            to=[email]
-        )
+def send_otp(otp):
+    message = EmailMessage(
+        subject='Code',
+        body=otp.password,
+        to=[otp.email]
+    )
 
-        try:
-            email.send()  # Send the email
-            print("Email sent successfully!")
-        except Exception as e:
-            print(f"Error sending email: {e}")
-            print(f"Code: {otp.password}")
+    store = get_otp_store()
+    transaction.on_commit(partial(
+        email_queue.enqueue,
+        message,
+        on_sent=partial(store.record_delivery, otp, OTPRequest.DeliveryStatus.SENT),
+        on_failed=partial(store.record_delivery, otp, OTPRequest.DeliveryStatus.FAILED),
+    ))